@@ -0,0 +1,239 @@
+"""
+아티스트 디렉터리 - 자유 입력 아티스트명 → Spotify 아티스트 ID 로컬 해석
+정규화 이름 + 한글/영문 별칭 + 트라이그램 퍼지 매칭
+("아이유", "IU", "iu ", "Stray kids" 등 표기가 달라도 같은 ID로 해석)
+"""
+from typing import Dict, Iterable, List, Optional, Set
+from collections import OrderedDict, defaultdict
+import json
+import os
+import re
+import threading
+import unicodedata
+
+from config import (
+    ARTIST_ALIASES,
+    ARTIST_DIRECTORY_PATH,
+    ARTIST_DIRECTORY_MAX_ARTISTS,
+    ARTIST_FUZZY_THRESHOLD,
+)
+from models import SpotifyTrack
+
+
+def normalize_artist_name(name: str) -> str:
+    """아티스트명 정규화 (NFKC, 대소문자/공백/문장부호 무시)"""
+    normalized = unicodedata.normalize("NFKC", name).casefold()
+    return re.sub(r"[\W_]+", "", normalized)
+
+
+def trigrams(text: str) -> Set[str]:
+    """경계 문자를 붙인 트라이그램 집합"""
+    padded = f"^{text}$"
+    if len(padded) < 3:
+        return {padded}
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class ArtistDirectory:
+    """아티스트 별칭 디렉터리 (스레드 안전, JSON 영속화, 아티스트 수 LRU 제한)"""
+
+    def __init__(self, path: Optional[str] = ARTIST_DIRECTORY_PATH, max_artists: int = ARTIST_DIRECTORY_MAX_ARTISTS):
+        self.path = path
+        self.max_artists = max_artists
+        self.names: "OrderedDict[str, str]" = OrderedDict()  # 아티스트 ID → 대표 이름 (최근 사용 순)
+        self.aliases: Dict[str, str] = {}  # 정규화 별칭 → 아티스트 ID
+        self._artist_aliases: Dict[str, Set[str]] = defaultdict(set)  # 아티스트 ID → 정규화 별칭 (삭제용)
+        self._trigram_index: Dict[str, Set[str]] = defaultdict(set)  # 트라이그램 → 정규화 별칭
+        self._alias_groups: Dict[str, List[str]] = {}  # 정규화 별칭 → 같은 그룹의 정규화 별칭
+        self._watched: Set[str] = set()  # 해석을 기다리는 정규화 이름 (아티스트 그래프의 이름 노드)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.version = 0  # 기다리던 이름이 해석 가능해질 때만 증가 (아티스트 그래프의 이름 노드 재해석 시점)
+
+        for group in ARTIST_ALIASES:
+            normalized = [normalize_artist_name(alias) for alias in group]
+            for alias in normalized:
+                self._alias_groups[alias] = normalized
+
+        if path and os.path.exists(path):
+            self.load()
+
+    # --- 학습 ---
+
+    def learn(self, name: str, artist_id: str, canonical_name: Optional[str] = None):
+        """별칭 → 아티스트 ID 등록 (같은 별칭 그룹 전체에 전파)"""
+        alias = normalize_artist_name(name)
+        if not alias or not artist_id:
+            return
+
+        with self._lock:
+            if canonical_name:
+                self.names[artist_id] = canonical_name
+            else:
+                self.names.setdefault(artist_id, name.strip())
+
+            for member in self._alias_groups.get(alias, [alias]):
+                if self.aliases.get(member) != artist_id:
+                    self._set_alias(member, artist_id)
+                    self._dirty = True
+                    if member in self._watched:
+                        self.version += 1
+
+            self.names.move_to_end(artist_id)
+            while len(self.names) > self.max_artists:
+                self._forget(next(iter(self.names)))
+
+    def _set_alias(self, alias: str, artist_id: str):
+        """별칭 등록 (호출자가 잠금 보유)"""
+        previous = self.aliases.get(alias)
+        if previous is not None:
+            self._artist_aliases[previous].discard(alias)
+        self.aliases[alias] = artist_id
+        self._artist_aliases[artist_id].add(alias)
+        for gram in trigrams(alias):
+            self._trigram_index[gram].add(alias)
+
+    def _forget(self, artist_id: str):
+        """가장 오래 쓰지 않은 아티스트와 그 별칭 삭제 (호출자가 잠금 보유)"""
+        self.names.pop(artist_id, None)
+        for alias in self._artist_aliases.pop(artist_id, ()):
+            if self.aliases.get(alias) != artist_id:
+                continue
+            del self.aliases[alias]
+            for gram in trigrams(alias):
+                members = self._trigram_index.get(gram)
+                if members is not None:
+                    members.discard(alias)
+                    if not members:
+                        del self._trigram_index[gram]
+        self._dirty = True
+
+    def watch(self, name: str):
+        """해석을 기다리는 이름 등록 (이 이름의 별칭이 학습되면 version 증가)"""
+        with self._lock:
+            self._watched.add(normalize_artist_name(name))
+
+    def unwatch(self, name: str):
+        """해석을 기다리던 이름 해제 (그래프에서 해석/삭제된 이름 노드)"""
+        with self._lock:
+            self._watched.discard(normalize_artist_name(name))
+
+    def add_track(self, track: SpotifyTrack):
+        """수집 트랙의 아티스트 (ID, 이름) 학습 - TrackStore 구독용"""
+        for artist in track.artists:
+            if normalize_artist_name(artist.name) not in self.aliases:
+                self.learn(artist.name, artist.id, artist.name)
+
+    def add_genres(self, track_id: str, genres: Iterable[str]):
+        """TrackStore 구독 인터페이스 (장르는 사용하지 않음)"""
+        pass
+
+    # --- 해석 ---
+
+    def resolve(self, name: str, fuzzy: bool = True) -> Optional[str]:
+        """
+        아티스트명 → 아티스트 ID (정확 → 별칭 그룹 → 트라이그램 퍼지 순)
+
+        fuzzy=False면 정확/별칭 일치만 (퍼지 후보는 fuzzy_match로 따로 받아 원격 검증)
+        """
+        alias = normalize_artist_name(name)
+        if not alias:
+            return None
+
+        with self._lock:
+            if alias in self.aliases:
+                artist_id = self.aliases[alias]
+                self.names.move_to_end(artist_id)
+                return artist_id
+
+            for member in self._alias_groups.get(alias, []):
+                if member in self.aliases:
+                    artist_id = self.aliases[member]
+                    self.names.move_to_end(artist_id)
+                    return artist_id
+
+        return self.fuzzy_match(name) if fuzzy else None
+
+    def fuzzy_match(self, name: str) -> Optional[str]:
+        """트라이그램 Jaccard 유사도가 ARTIST_FUZZY_THRESHOLD 이상인 가장 가까운 별칭의 아티스트 ID"""
+        alias = normalize_artist_name(name)
+        if not alias:
+            return None
+
+        with self._lock:
+            query_grams = trigrams(alias)
+            overlap = defaultdict(int)
+            for gram in query_grams:
+                for candidate in self._trigram_index.get(gram, ()):
+                    overlap[candidate] += 1
+
+            best_alias, best_score = None, 0.0
+            for candidate, shared in overlap.items():
+                union = len(query_grams) + len(trigrams(candidate)) - shared
+                score = shared / union
+                if score > best_score or (score == best_score and best_alias and candidate < best_alias):
+                    best_alias, best_score = candidate, score
+
+        if best_alias and best_score >= ARTIST_FUZZY_THRESHOLD:
+            return self.aliases[best_alias]
+        return None
+
+    def canonical_name(self, artist_id: str) -> Optional[str]:
+        return self.names.get(artist_id)
+
+    # --- 영속화 ---
+
+    def load(self):
+        """JSON 파일에서 별칭 로드"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"아티스트 디렉터리 로드 오류: {str(e)}")
+            return
+
+        with self._lock:
+            for artist_id, name in data.get("names", {}).items():
+                self.names[artist_id] = name
+            for alias, artist_id in data.get("aliases", {}).items():
+                if artist_id in self.names:
+                    self._set_alias(alias, artist_id)
+            while len(self.names) > self.max_artists:
+                self._forget(next(iter(self.names)))
+
+    def save(self):
+        """변경 사항이 있으면 JSON 파일로 저장"""
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            data = {"names": dict(self.names), "aliases": dict(self.aliases)}
+            self._dirty = False
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp.{os.getpid()}"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+# 싱글톤 인스턴스
+_artist_directory = None
+
+def get_artist_directory() -> ArtistDirectory:
+    """아티스트 디렉터리 싱글톤 인스턴스 반환"""
+    global _artist_directory
+    if _artist_directory is None:
+        _artist_directory = ArtistDirectory()
+    return _artist_directory
+
+
+if __name__ == "__main__":
+    directory = ArtistDirectory(path=None)
+    directory.learn("IU", "3HqSLMAZ3g3d5poNaI7GOU", "IU")
+    directory.learn("Stray Kids", "2dIgFjalVxs4ThymZ67YCE", "Stray Kids")
+    directory.learn("Ariana Grande", "66CXWjxzNUsdJxJ2JdwvnR", "Ariana Grande")
+    for name in ["아이유", "IU", "iu ", "Stray kids", "straykidz", "Ariana Grand", "BTS"]:
+        print(f"{name!r} → {directory.resolve(name)}")
@@ -0,0 +1,312 @@
+"""
+아티스트 유사도 그래프 - 검색 결과 동시 출현 + 페르소나 유사 아티스트로 만든 가중 그래프
+k-hop 이웃 탐색으로 후보 아티스트/트랙을 메모리에서 확장 (검색 호출 없음)
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from collections import defaultdict
+import heapq
+import json
+import os
+import threading
+
+from config import (
+    ARTIST_GRAPH_PATH,
+    ARTIST_GRAPH_MAX_NEIGHBOURS,
+    ARTIST_GRAPH_MAX_TRACKS_PER_ARTIST,
+    ARTIST_GRAPH_COOCCURRENCE_ARTISTS,
+    ARTIST_GRAPH_HOP_DECAY,
+)
+from models import SpotifyTrack
+from artist_directory import ArtistDirectory, get_artist_directory, normalize_artist_name
+
+
+# 엣지 가중치
+FEATURE_WEIGHT = 3.0  # 같은 트랙 피처링
+COOCCURRENCE_WEIGHT = 1.0  # 같은 검색 결과에 함께 등장
+PERSONA_WEIGHT = 5.0  # 페르소나 유사 아티스트
+
+UNRESOLVED_PREFIX = "~"  # 아직 ID를 모르는 아티스트 노드 (정규화 이름)
+
+
+class ArtistGraph:
+    """아티스트 유사도 그래프 (스레드 안전, JSON 영속화)"""
+
+    def __init__(self, directory: ArtistDirectory, path: Optional[str] = ARTIST_GRAPH_PATH):
+        self.directory = directory
+        self.path = path
+        self.edges: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self.artist_tracks: Dict[str, Dict[str, int]] = defaultdict(dict)  # 아티스트 ID → {트랙ID: 인기도}
+        self._track_artists: Dict[str, Set[str]] = defaultdict(set)  # 트랙 ID → 아티스트 ID (제거용)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._pending: Set[str] = set()  # ID를 모르는 이름 노드
+        self._resolved_version = -1  # 마지막으로 이름 노드를 재해석한 디렉터리 버전
+
+        if path and os.path.exists(path):
+            self.load()
+
+    # --- 그래프 구축 ---
+
+    def _add_edge(self, a: str, b: str, weight: float):
+        if a == b:
+            return
+        self.edges[a][b] = self.edges[a].get(b, 0.0) + weight
+        self.edges[b][a] = self.edges[b].get(a, 0.0) + weight
+        for node in (a, b):
+            if node.startswith(UNRESOLVED_PREFIX) and node not in self._pending:
+                self._pending.add(node)
+                self.directory.watch(node[len(UNRESOLVED_PREFIX):])
+        for node in (a, b):
+            # 앞 노드 정리로 엣지가 모두 사라진 노드는 건너뜀 (defaultdict 재생성 방지)
+            if len(self.edges.get(node, ())) > 2 * ARTIST_GRAPH_MAX_NEIGHBOURS:
+                self._prune(node)
+        self._dirty = True
+
+    def _prune(self, node: str):
+        """이웃이 상한의 2배를 넘은 노드에서 약한 엣지부터 양방향 삭제 (상한까지)"""
+        neighbours = self.edges[node]
+        keep = dict(heapq.nlargest(ARTIST_GRAPH_MAX_NEIGHBOURS, neighbours.items(), key=lambda item: item[1]))
+        for neighbour in neighbours.keys() - keep.keys():
+            reverse = self.edges.get(neighbour)
+            if reverse is not None:
+                reverse.pop(node, None)
+                if not reverse:
+                    del self.edges[neighbour]
+                    self._drop_pending(neighbour)
+        self.edges[node] = keep
+
+    def _drop_pending(self, node: str):
+        """이름 노드를 대기 목록에서 제거 (호출자가 잠금 보유)"""
+        if node in self._pending:
+            self._pending.discard(node)
+            self.directory.unwatch(node[len(UNRESOLVED_PREFIX):])
+
+    def _node(self, name: str) -> str:
+        """
+        아티스트명 → 노드 키 (ID를 모르면 정규화 이름)
+
+        정확/별칭 일치만 사용 - 퍼지 오매칭이 가중 엣지로 저장되지 않도록
+        (이름 노드는 디렉터리가 같은 별칭을 학습하면 ID 노드로 병합)
+        """
+        artist_id = self.directory.resolve(name, fuzzy=False)
+        return artist_id or f"{UNRESOLVED_PREFIX}{normalize_artist_name(name)}"
+
+    def add_track(self, track: SpotifyTrack):
+        """수집 트랙 등록 (아티스트별 트랙 + 피처링 엣지) - TrackStore 구독용"""
+        artist_ids = [a.id for a in track.artists if a.id]
+        with self._lock:
+            for artist_id in artist_ids:
+                self._add_artist_track(artist_id, track.id, track.popularity)
+            for i, a in enumerate(artist_ids):
+                for b in artist_ids[i + 1:]:
+                    self._add_edge(a, b, FEATURE_WEIGHT)
+
+    def _add_artist_track(self, artist_id: str, track_id: str, popularity: int):
+        """아티스트 트랙 등록 (호출자가 잠금 보유), ARTIST_GRAPH_MAX_TRACKS_PER_ARTIST 초과 시 인기도 낮은 곡 삭제"""
+        tracks = self.artist_tracks[artist_id]
+        tracks[track_id] = popularity
+        self._track_artists[track_id].add(artist_id)
+        if len(tracks) > ARTIST_GRAPH_MAX_TRACKS_PER_ARTIST:
+            weakest = min(tracks, key=lambda t: (tracks[t], t))
+            self._unlink(artist_id, weakest)
+
+    def _unlink(self, artist_id: str, track_id: str):
+        """아티스트-트랙 연결 삭제 (호출자가 잠금 보유)"""
+        tracks = self.artist_tracks.get(artist_id)
+        if tracks is not None:
+            tracks.pop(track_id, None)
+            if not tracks:
+                del self.artist_tracks[artist_id]
+        artists = self._track_artists.get(track_id)
+        if artists is not None:
+            artists.discard(artist_id)
+            if not artists:
+                del self._track_artists[track_id]
+        self._dirty = True
+
+    def remove_track(self, track_id: str):
+        """카탈로그에서 사라진 트랙 삭제 - TrackStore 구독용"""
+        with self._lock:
+            for artist_id in list(self._track_artists.get(track_id, ())):
+                self._unlink(artist_id, track_id)
+
+    def add_genres(self, track_id: str, genres: Iterable[str]):
+        """TrackStore 구독 인터페이스 (장르는 사용하지 않음)"""
+        pass
+
+    def add_cooccurrence(self, tracks: List[SpotifyTrack]):
+        """같은 검색 결과 상위에 등장한 대표 아티스트끼리 연결 (쌍 수는 상위 아티스트 수로 제한)"""
+        artist_ids = list(dict.fromkeys(t.artists[0].id for t in tracks if t.artists))
+        artist_ids = artist_ids[:ARTIST_GRAPH_COOCCURRENCE_ARTISTS]
+        if len(artist_ids) < 2:
+            return
+        weight = COOCCURRENCE_WEIGHT / (len(artist_ids) - 1)
+        with self._lock:
+            for i, a in enumerate(artist_ids):
+                for b in artist_ids[i + 1:]:
+                    self._add_edge(a, b, weight)
+
+    def add_persona(self, preferred_artists: List[str], similar_artists: List[str]):
+        """선호 아티스트 ↔ 페르소나 유사 아티스트 연결"""
+        sources = [self._node(name) for name in preferred_artists]
+        targets = [self._node(name) for name in similar_artists]
+        with self._lock:
+            for source in sources:
+                for target in targets:
+                    self._add_edge(source, target, PERSONA_WEIGHT)
+
+    def _resolve_pending(self):
+        """
+        디렉터리에서 ID가 확인된 이름 노드를 ID 노드로 병합
+
+        디렉터리가 기다리던 이름의 별칭을 학습했을 때만 재해석 (정확/별칭 일치, 그래프 잠금 밖에서)
+        """
+        version = self.directory.version
+        with self._lock:
+            if not self._pending or version == self._resolved_version:
+                return
+            self._resolved_version = version
+            pending = list(self._pending)
+
+        resolved = {node: self.directory.resolve(node[len(UNRESOLVED_PREFIX):], fuzzy=False) for node in pending}
+
+        with self._lock:
+            for node, artist_id in resolved.items():
+                if not artist_id or node not in self.edges:
+                    continue
+                self._drop_pending(node)
+                for neighbour, weight in self.edges.pop(node).items():
+                    self.edges[neighbour].pop(node, None)
+                    self._add_edge(artist_id, neighbour, weight)
+
+    # --- 탐색 ---
+
+    def neighbours(
+        self,
+        seeds: Iterable[str],
+        hops: int = 2,
+        limit: int = 10
+    ) -> List[Tuple[str, float]]:
+        """
+        시드 아티스트에서 k-hop 이내 이웃 아티스트
+
+        Args:
+            seeds: 시드 아티스트 ID
+            hops: 최대 홉 수
+            limit: 반환할 아티스트 수
+
+        Returns:
+            (아티스트 ID, 점수) 리스트 - 점수는 경로상 정규화 가중치 곱 × 홉 감쇠의 최댓값
+        """
+        seeds = [s for s in seeds if s]
+        self._resolve_pending()
+        with self._lock:
+            best: Dict[str, float] = {seed: 1.0 for seed in seeds}
+            frontier = list(seeds)
+
+            for _ in range(hops):
+                next_frontier = []
+                for node in frontier:
+                    neighbours = self.edges.get(node, {})
+                    total = sum(neighbours.values())
+                    if not total:
+                        continue
+                    for neighbour, weight in neighbours.items():
+                        score = best[node] * (weight / total) * ARTIST_GRAPH_HOP_DECAY
+                        if score > best.get(neighbour, 0.0):
+                            best[neighbour] = score
+                            next_frontier.append(neighbour)
+                frontier = next_frontier
+
+        seed_set = set(seeds)
+        ranked = [
+            (node, score) for node, score in best.items()
+            if node not in seed_set and not node.startswith(UNRESOLVED_PREFIX)
+        ]
+        return heapq.nlargest(limit, ranked, key=lambda item: (item[1], item[0]))
+
+    def candidate_track_ids(
+        self,
+        seeds: Iterable[str],
+        hops: int = 2,
+        artist_limit: int = 10,
+        tracks_per_artist: int = 2
+    ) -> List[str]:
+        """k-hop 이웃 아티스트의 인기 트랙 ID"""
+        track_ids = []
+        neighbours = self.neighbours(seeds, hops, artist_limit)
+        with self._lock:
+            for artist_id, _ in neighbours:
+                tracks = self.artist_tracks.get(artist_id, {})
+                top = heapq.nlargest(tracks_per_artist, tracks.items(), key=lambda item: item[1])
+                track_ids.extend(track_id for track_id, _ in top)
+        return track_ids
+
+    # --- 영속화 ---
+
+    def load(self):
+        """JSON 파일에서 그래프 로드"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"아티스트 그래프 로드 오류: {str(e)}")
+            return
+
+        for node, neighbours in data.get("edges", {}).items():
+            self.edges[node].update(neighbours)
+            if node.startswith(UNRESOLVED_PREFIX):
+                self._pending.add(node)
+                self.directory.watch(node[len(UNRESOLVED_PREFIX):])
+        with self._lock:
+            for artist_id, tracks in data.get("artist_tracks", {}).items():
+                for track_id, popularity in tracks.items():
+                    self._add_artist_track(artist_id, track_id, popularity)
+
+    def save(self):
+        """이웃 수를 ARTIST_GRAPH_MAX_NEIGHBOURS로 잘라 JSON 파일로 저장"""
+        if not self.path or not self._dirty:
+            return
+        with self._lock:
+            edges = {
+                node: dict(heapq.nlargest(
+                    ARTIST_GRAPH_MAX_NEIGHBOURS, neighbours.items(), key=lambda item: item[1]
+                ))
+                for node, neighbours in self.edges.items()
+            }
+            # 내부 dict까지 잠금 안에서 복사 (저장 중 add_track이 바꿔도 안전)
+            artist_tracks = {artist_id: dict(tracks) for artist_id, tracks in self.artist_tracks.items()}
+            data = {"edges": edges, "artist_tracks": artist_tracks}
+            self._dirty = False
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp.{os.getpid()}"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self.edges)
+
+
+# 싱글톤 인스턴스
+_artist_graph = None
+
+def get_artist_graph() -> ArtistGraph:
+    """아티스트 그래프 싱글톤 인스턴스 반환"""
+    global _artist_graph
+    if _artist_graph is None:
+        _artist_graph = ArtistGraph(get_artist_directory())
+    return _artist_graph
+
+
+if __name__ == "__main__":
+    directory = ArtistDirectory(path=None)
+    graph = ArtistGraph(directory, path=None)
+    directory.learn("IU", "iu", "IU")
+    directory.learn("AKMU", "akmu", "AKMU")
+    directory.learn("10CM", "10cm", "10CM")
+    graph.add_persona(["IU"], ["AKMU", "Paul Kim"])
+    graph._add_edge("akmu", "10cm", 2.0)
+    directory.learn("Paul Kim", "paulkim", "Paul Kim")
+    print(graph.neighbours(["iu"], hops=2))
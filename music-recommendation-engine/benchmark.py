@@ -0,0 +1,164 @@
+"""
+부하 테스트 / 프로파일링 - 오프라인 LLM 백엔드 + 로컬 Spotify로 전체 그래프 실행 (네트워크 없음)
+시나리오 프리셋 × 샘플 선호 조합을 반복 실행해 요청 지연 분포, 처리량, 티어별 호출 통계 출력
+
+노드별 첫 토큰까지 시간(TTFT)과 접두사 캐시 적중 토큰/비용 절감은 오프라인 백엔드의 캐시 모사 기준
+
+실행: python benchmark.py --runs 20 --concurrency 4 --llm-latency 0.5 [--prefill-latency 0.2] [--all-llm | --local] [--profile]
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import contextlib
+import cProfile
+import io
+import itertools
+import json
+import os
+import pstats
+import statistics
+import time
+
+from config import SCENARIO_PRESETS, LOCATIONS, DECIBEL_LEVELS
+from llm_cache import LLMResponseCache
+from persona_store import PersonaStore
+from reason_cache import ReasonCache
+from usage_ledger import get_usage_metrics
+from llm_router import LLMRouter, get_llm_router, set_llm_router
+from llm_runtime import get_llm_runtime
+from output_repair import get_repair_metrics
+from offline_llm import StubChatModel, offline_response
+from local_spotify import LocalSpotifyClient
+from compare_fused import SAMPLE_PREFERENCES
+from graph import run_recommendation
+import llm_cache
+import persona_store
+import reason_cache
+import spotify_client
+
+
+# 모든 노드를 LLM 경로로 실행 (오프라인 백엔드의 전체 스키마 부하 측정용)
+ALL_LLM_MODES = {
+    "context_analysis": "llm",
+    "search_query_generator": "llm",
+    "selection": "llm",
+    "quality_validator": "llm",
+}
+LOCAL_MODES = {  # 규칙/컴파일러/솔버 경로 (opt-in 모드)
+    "context_analysis": "rule",
+    "search_query_generator": "compiler",
+    "selection": "solver",
+    "quality_validator": "rule",
+}
+
+
+def scenarios():
+    """(위치, 목표, 소음도, 선호 아티스트, 선호 장르) 순환"""
+    contexts = []
+    for preset in SCENARIO_PRESETS.values():
+        location = preset["location"] if preset["location"] in LOCATIONS else "home"
+        decibel = preset["decibel"] if preset["decibel"] in DECIBEL_LEVELS else "moderate"
+        for artists, genres in SAMPLE_PREFERENCES:
+            contexts.append((location, preset["goal"], decibel, artists, genres))
+    return itertools.cycle(contexts)
+
+
+def setup(llm_latency: float, search_latency: float, keep_cache: bool, prefill_latency: float = 0.0):
+    """오프라인 백엔드 & 로컬 Spotify 연결 (캐시/저장소는 기본적으로 메모리 전용으로 비움)"""
+    set_llm_router(LLMRouter(
+        lambda model, temperature, timeout: StubChatModel(
+            offline_response, latency=llm_latency, model=f"offline:{model}", prefill=prefill_latency
+        )
+    ))
+    spotify_client._spotify_client = LocalSpotifyClient(latency=search_latency)
+    if not keep_cache:
+        llm_cache._llm_cache = LLMResponseCache(":memory:")
+        persona_store._persona_store = PersonaStore(":memory:")
+        reason_cache._reason_cache = ReasonCache(":memory:")
+
+
+def run_once(context, node_modes):
+    location, goal, decibel, artists, genres = context
+    started = time.perf_counter()
+    result = run_recommendation(location, goal, decibel, artists, genres, node_modes=node_modes)
+    return time.perf_counter() - started, result
+
+
+def percentile(values, ratio: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(ratio * len(ordered)))]
+
+
+def print_prompt_cache_table(usage: dict):
+    """노드별 접두사 캐시 적중률 / 평균 TTFT / 비용 (캐시 없을 때 대비 절감률)"""
+    print(f"{'노드':<24}{'호출':>6}{'캐시 입력':>10}{'TTFT':>9}{'비용($)':>11}{'절감':>8}")
+    for node, stat in usage["nodes"].items():
+        saving = 1 - stat["cost"] / stat["cost_without_cache"] if stat["cost_without_cache"] else 0.0
+        ttft = f"{stat['avg_ttft']:.3f}s" if stat["avg_ttft"] is not None else "-"
+        print(f"{node:<24}{stat['calls']:>6}{stat['cached_input_ratio']:>10.1%}{ttft:>9}"
+              f"{stat['cost']:>11.5f}{saving:>8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="오프라인 부하 테스트")
+    parser.add_argument("--runs", type=int, default=20, help="총 요청 수")
+    parser.add_argument("--concurrency", type=int, default=1, help="동시 요청 수")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="LLM 호출당 인위적 지연 (초)")
+    parser.add_argument("--prefill-latency", type=float, default=0.0,
+                        help="캐시되지 않은 입력 1K 토큰당 첫 토큰 지연 (초, 접두사 캐시 효과 측정)")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="검색 호출당 인위적 지연 (초)")
+    parser.add_argument("--all-llm", action="store_true", help="규칙/솔버 대신 모든 노드를 LLM 경로로 실행")
+    parser.add_argument("--local", action="store_true", help="상황/쿼리/선택/검증 노드를 규칙·솔버 경로로 실행")
+    parser.add_argument("--keep-cache", action="store_true", help="LLM 캐시/페르소나 저장소 사용")
+    parser.add_argument("--profile", action="store_true", help="cProfile 누적 시간 상위 25개 출력 (동시성 1)")
+    parser.add_argument("--verbose", action="store_true", help="그래프 실행 로그 출력")
+    args = parser.parse_args()
+
+    setup(args.llm_latency, args.search_latency, args.keep_cache, args.prefill_latency)
+    node_modes = ALL_LLM_MODES if args.all_llm else LOCAL_MODES if args.local else None
+    contexts = list(itertools.islice(scenarios(), args.runs))
+
+    profiler = cProfile.Profile() if args.profile else None
+    concurrency = 1 if profiler else args.concurrency
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+
+    started = time.perf_counter()
+    with output:
+        if profiler:
+            profiler.enable()
+        if concurrency == 1:
+            # cProfile은 호출 스레드만 측정하므로 순차 실행은 메인 스레드에서
+            runs = [run_once(context, node_modes) for context in contexts]
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                runs = list(executor.map(lambda context: run_once(context, node_modes), contexts))
+        if profiler:
+            profiler.disable()
+    elapsed = time.perf_counter() - started
+
+    latencies = [seconds for seconds, _ in runs]
+    valid = sum(1 for _, result in runs if result and result["quality_validation"] and result["quality_validation"].is_valid)
+    failed = sum(1 for _, result in runs if not result)
+
+    print("=" * 60)
+    print(f"요청 {len(runs)}건 (동시성 {concurrency}, LLM 지연 {args.llm_latency}s, 검색 지연 {args.search_latency}s)")
+    print(f"총 소요: {elapsed:.2f}s / 처리량: {len(runs) / elapsed:.2f} req/s")
+    print(f"지연: 평균 {statistics.mean(latencies):.3f}s, p50 {percentile(latencies, 0.5):.3f}s, "
+          f"p95 {percentile(latencies, 0.95):.3f}s, 최대 {max(latencies):.3f}s")
+    print(f"품질 검증 통과: {valid}/{len(runs)}, 실패: {failed}")
+    print(f"추천 이유 캐시: {reason_cache.get_reason_cache().report()}")
+    print(f"구조화 출력 보정: {get_repair_metrics().report()}")
+    print("=" * 60)
+    print(json.dumps(get_llm_router().report(), indent=2, ensure_ascii=False))
+    usage = get_usage_metrics().report()
+    print(json.dumps(usage, indent=2, ensure_ascii=False))
+    print_prompt_cache_table(usage)
+    print(json.dumps(get_llm_runtime().report(), indent=2, ensure_ascii=False))
+
+    if profiler:
+        stream = io.StringIO()
+        pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(25)
+        print(stream.getvalue())
+
+
+if __name__ == "__main__":
+    main()
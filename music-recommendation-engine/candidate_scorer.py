@@ -0,0 +1,286 @@
+"""
+후보 트랙 스코어러 - 검색 결과가 도착하는 대로 상황 적합도를 채점하고
+쿼터 버킷(한국 / 해외 신곡 / 기타)별 크기 제한 힙에 상위 k곡만 유지
+(트랙 객체는 O(k)만 보관, 최근 밀려난 k곡은 중복 판별용 핑거프린트/점수만 남김)
+사용자 최근 추천 곡(블룸 필터)은 채점 단계에서 제외
+"""
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import heapq
+import itertools
+import re
+
+from config import (
+    DECIBEL_MUSIC_PROFILES,
+    GOAL_MUSIC_PROFILES,
+    KOREAN_TRACK_RATIO,
+    RECENT_TRACK_RATIO,
+    RECENT_YEARS,
+    POPULARITY_DISTRIBUTION,
+    CANDIDATE_SCORE_WEIGHTS,
+)
+from models import SpotifyTrack
+from local_search import normalize_genre
+from track_store import get_track_store
+from user_history import RecentTrackFilter, get_user_history
+from track_utils import (
+    get_fingerprint,
+    get_popularity_level,
+    is_korean_track,
+    is_spam_title,
+    parse_release_date,
+)
+
+
+@dataclass
+class ScoringContext:
+    """채점 기준이 되는 사용자 상황"""
+    decibel: str
+    goal: str
+    location: str
+    ai_genres: List[str] = field(default_factory=list)
+    preferred_artist_ids: List[str] = field(default_factory=list)
+    recent_history: Optional[RecentTrackFilter] = None  # 사용자 최근 추천 곡 (제외 대상)
+
+    @classmethod
+    def from_state(cls, state) -> "ScoringContext":
+        return cls(
+            decibel=state["decibel"],
+            goal=state["goal"],
+            location=state["location"],
+            ai_genres=state.get("ai_recommended_genres") or [],
+            preferred_artist_ids=list((state.get("preferred_artist_ids") or {}).values()),
+            recent_history=get_user_history().get(state.get("user_id")),
+        )
+
+    def recently_recommended(self, track: SpotifyTrack) -> bool:
+        return self.recent_history is not None and track.id in self.recent_history
+
+    def __post_init__(self):
+        decibel_profile = DECIBEL_MUSIC_PROFILES[self.decibel]
+        goal_profile = GOAL_MUSIC_PROFILES[self.goal]
+        self.target_genres = {
+            normalize_genre(g) for g in list(self.ai_genres) + goal_profile["suggested_genres"]
+        }
+        self.good_keywords = [k.lower() for k in decibel_profile["volume_keywords"] + goal_profile["mood"]]
+        self.avoid_keywords = [
+            k.lower() for k in decibel_profile["avoid_keywords"] + goal_profile.get("avoid", [])
+        ]
+        self.recent_cutoff = datetime.now() - timedelta(days=RECENT_YEARS * 365)
+
+
+@dataclass
+class TrackFeatures:
+    """트랙 한 곡의 채점용 특성 (피처 테이블 행)"""
+    track: SpotifyTrack
+    is_korean: bool
+    is_recent: bool
+    is_spam: bool
+    is_preferred: bool
+    popularity_level: str
+    context_fit: float
+    score: float
+
+    @property
+    def bucket(self) -> str:
+        if self.is_korean:
+            return "korean"
+        if self.is_recent:
+            return "recent"
+        return "other"
+
+
+def _keyword_hits(text: str, keywords: List[str]) -> int:
+    return sum(1 for keyword in keywords if re.search(rf"\b{re.escape(keyword)}\b", text))
+
+
+def build_features(track: SpotifyTrack, context: ScoringContext) -> TrackFeatures:
+    """트랙 특성 계산 & 상황 적합도 점수"""
+    weights = CANDIDATE_SCORE_WEIGHTS
+    release_date = parse_release_date(track.release_date)
+    genres = {normalize_genre(g) for g in get_track_store().genres_of(track.id)}
+    text = f"{track.name} {track.album_name} {' '.join(genres)}".lower()
+
+    # 소음도/목표 적합도: 장르 일치 + 프로필 키워드 (피해야 할 키워드는 감점)
+    genre_match = 1.0 if genres & context.target_genres else 0.0
+    context_fit = (
+        weights["genre_match"] * genre_match
+        + weights["keyword"] * _keyword_hits(text, context.good_keywords)
+        - weights["avoid_keyword"] * _keyword_hits(text, context.avoid_keywords)
+    )
+
+    is_korean = is_korean_track(track)
+    is_recent = bool(release_date and release_date >= context.recent_cutoff)
+    is_preferred = any(a.id in context.preferred_artist_ids for a in track.artists)
+    popularity_level = get_popularity_level(track.popularity)
+
+    score = (
+        context_fit
+        + weights["korean"] * is_korean
+        + weights["recent"] * is_recent
+        + weights["preferred"] * is_preferred
+        + weights["popularity"] * POPULARITY_DISTRIBUTION[popularity_level]["ratio"]
+        + weights["popularity"] * track.popularity / 100
+    )
+
+    return TrackFeatures(
+        track=track,
+        is_korean=is_korean,
+        is_recent=is_recent,
+        is_spam=is_spam_title(track.name),
+        is_preferred=is_preferred,
+        popularity_level=popularity_level,
+        context_fit=context_fit,
+        score=score,
+    )
+
+
+def build_feature_table(tracks: List[SpotifyTrack], context: ScoringContext) -> Dict[str, TrackFeatures]:
+    """트랙 ID → 특성 테이블"""
+    return {track.id: build_features(track, context) for track in tracks}
+
+
+def prerank_tracks(
+    tracks: List[SpotifyTrack],
+    context: ScoringContext,
+    per_bucket: Dict[str, int]
+) -> List[SpotifyTrack]:
+    """
+    쿼터 버킷(한국 / 신곡 / 기타)별 상위 N곡만 남기는 사전 순위화
+
+    버킷마다 인기도 레벨별 목표 곡 수를 먼저 확보한 뒤 점수 순으로 채워
+    쿼터를 맞출 수 있는 후보가 프롬프트에서 빠지지 않도록 함
+    """
+    features = [f for f in build_feature_table(tracks, context).values() if not f.is_spam]
+    features.sort(key=lambda f: -f.score)
+
+    kept: List[TrackFeatures] = []
+    for bucket, limit in per_bucket.items():
+        members = [f for f in features if f.bucket == bucket]
+        chosen = []
+        for level, spec in POPULARITY_DISTRIBUTION.items():
+            chosen += [f for f in members if f.popularity_level == level][:min(spec["count"], limit)]
+        chosen = chosen[:limit]
+        chosen += [f for f in members if f not in chosen][:limit - len(chosen)]
+        kept += chosen
+
+    kept.sort(key=lambda f: -f.score)
+    return [f.track for f in kept]
+
+
+class CandidateScorer:
+    """스트리밍 상위 k 후보 선택기"""
+
+    def __init__(self, context: ScoringContext, k: int):
+        self.context = context
+        self.k = k
+        korean = round(k * KOREAN_TRACK_RATIO)
+        recent = round(k * RECENT_TRACK_RATIO)
+        self.capacity = {"korean": korean, "recent": recent, "other": k - korean - recent}
+        self._heaps: Dict[str, List[Tuple[float, int, str]]] = {bucket: [] for bucket in self.capacity}
+        self._overflow: List[Tuple[float, int, str]] = []  # 버킷에서 밀려난 곡 (빈 버킷 보충용)
+        self._retained: Dict[str, Tuple[str, float, int, TrackFeatures]] = {}  # 핑거프린트 → 보관 항목
+        # 최근 밀려난 곡 핑거프린트 → (점수, 트랙 ID) - k개까지만 (LRU)
+        self._evicted: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._counter = itertools.count()
+        self.seen = 0
+        self.rejected_spam = 0
+        self.rejected_duplicates = 0
+        self.rejected_recent = 0
+
+    def _remove(self, fingerprint: str):
+        """보관 항목 제거 (버킷 항목이면 같은 버킷의 가장 좋은 overflow 항목을 올려 빈자리 보충)"""
+        bucket, score, seq, _ = self._retained.pop(fingerprint)
+        heap = self._heaps[bucket] if bucket != "overflow" else self._overflow
+        heap.remove((score, seq, fingerprint))
+        heapq.heapify(heap)
+        if bucket == "overflow":
+            return
+
+        candidates = [entry for entry in self._overflow if self._retained[entry[2]][3].bucket == bucket]
+        if not candidates:
+            return
+        best = max(candidates)
+        self._overflow.remove(best)
+        heapq.heapify(self._overflow)
+        heapq.heappush(heap, best)
+        self._retained[best[2]] = (bucket,) + self._retained[best[2]][1:]
+
+    def _forget(self, fingerprint: str, score: float, track_id: str):
+        """밀려난 곡 기록 (최근 k곡만 유지)"""
+        self._evicted[fingerprint] = (score, track_id)
+        self._evicted.move_to_end(fingerprint)
+        while len(self._evicted) > self.k:
+            self._evicted.popitem(last=False)
+
+    def _insert(self, heap: List, capacity: int, entry: Tuple[float, int, str]) -> Optional[Tuple[float, int, str]]:
+        """크기 제한 힙에 삽입, 밀려난 항목 반환"""
+        if capacity <= 0:
+            return entry
+        if len(heap) < capacity:
+            heapq.heappush(heap, entry)
+            return None
+        if entry > heap[0]:
+            return heapq.heappushpop(heap, entry)
+        return entry
+
+    def push(self, track: SpotifyTrack) -> bool:
+        """트랙 한 곡 채점 후 보관 여부 반환"""
+        self.seen += 1
+        if self.context.recently_recommended(track):
+            self.rejected_recent += 1
+            return False
+
+        features = build_features(track, self.context)
+        if features.is_spam:
+            self.rejected_spam += 1
+            return False
+
+        fingerprint = get_fingerprint(track)
+        if fingerprint in self._evicted:
+            # 이미 밀려난 곡의 다른 버전도 더 높은 점수가 아니면 다시 들어오지 않음
+            evicted_score, evicted_id = self._evicted[fingerprint]
+            if evicted_id == track.id:
+                return False
+            self.rejected_duplicates += 1
+            if features.score <= evicted_score:
+                return False
+            del self._evicted[fingerprint]
+        elif fingerprint in self._retained:
+            if self._retained[fingerprint][3].track.id == track.id:
+                return False
+            self.rejected_duplicates += 1
+            if features.score <= self._retained[fingerprint][1]:
+                return False
+            self._remove(fingerprint)
+
+        entry = (features.score, next(self._counter), fingerprint)
+        self._retained[fingerprint] = (features.bucket, entry[0], entry[1], features)
+
+        evicted = self._insert(self._heaps[features.bucket], self.capacity[features.bucket], entry)
+        if evicted is None:
+            return True
+
+        # 버킷에서 밀려난 곡은 overflow 힙으로
+        evicted_fingerprint = evicted[2]
+        self._retained[evicted_fingerprint] = ("overflow",) + self._retained[evicted_fingerprint][1:]
+        dropped = self._insert(self._overflow, self.k, evicted)
+        if dropped is not None:
+            _, score, _, dropped_features = self._retained.pop(dropped[2])
+            self._forget(dropped[2], score, dropped_features.track.id)
+        return dropped is None or dropped[2] != fingerprint
+
+    def result(self) -> List[SpotifyTrack]:
+        """보관된 상위 k곡 (버킷 쿼터 우선, 빈자리는 overflow로 보충, 점수 순)"""
+        entries = [entry for heap in self._heaps.values() for entry in heap]
+        shortfall = self.k - len(entries)
+        if shortfall > 0:
+            entries += heapq.nlargest(shortfall, self._overflow)
+        entries.sort(reverse=True)
+        return [self._retained[fingerprint][3].track for _, _, fingerprint in entries]
+
+    def features(self) -> Dict[str, TrackFeatures]:
+        """보관된 곡의 특성 테이블"""
+        return {item[3].track.id: item[3] for item in self._retained.values()}
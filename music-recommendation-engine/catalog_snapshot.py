@@ -0,0 +1,369 @@
+"""
+카탈로그 스냅샷 - mmap 기반 읽기 전용 바이너리 포맷
+여러 uvicorn 워커가 같은 파일을 페이지 캐시로 공유 (프로세스별 RAM/파싱 비용 없음)
+
+파일 구조 (리틀 엔디언):
+    헤더      magic(4s) version(H) reserved(H) rows(I) string_fields(I)
+    섹션 표   숫자 컬럼 4개 + 문자열 필드별 (offsets, heap) 위치 (Q)
+    숫자 컬럼 release_ordinal(I) duration_ms(I) popularity(B) flags(B)
+    문자열    필드별 offsets(I × rows+1) + UTF-8 heap
+행은 트랙 ID 순으로 정렬되어 있어 find()는 이진 탐색으로 동작
+
+저장은 워커들이 잠금을 잡고 차례로 - 디스크의 최신 스냅샷에 자기 트랙을 병합해 교체 (다른 워커 수집분 유지)
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+from array import array
+import itertools
+import mmap
+import os
+import struct
+import sys
+
+from config import CATALOG_SNAPSHOT_PATH, CATALOG_SNAPSHOT_LOCK_PATH
+from models import SpotifyTrack, SpotifyArtist
+from track_utils import is_korean_track, is_spam_title, parse_release_date
+from process_lock import acquire, release
+
+
+MAGIC = b"MRCS"
+VERSION = 2  # 형식 변경 시 증가 (다른 버전 파일은 읽지 않고 다음 저장 때 새로 작성)
+HEADER = struct.Struct("<4sHHII")
+SECTION = struct.Struct("<Q")
+
+NUMERIC_COLUMNS = [("release_ordinal", "I"), ("duration_ms", "I"), ("popularity", "B"), ("flags", "B")]
+STRING_FIELDS = [
+    "id", "name", "album_name", "release_date", "artist_ids",
+    "artist_names", "genres", "preview_url", "external_url", "artist_genres",
+]
+LIST_SEPARATOR = "\x1f"
+ARTIST_GENRE_SEPARATOR = "\x1e"  # artist_genres: 아티스트별 장르 (아티스트 사이는 LIST_SEPARATOR)
+
+# flags 비트
+FLAG_KOREAN = 1
+FLAG_SPAM = 2
+FLAG_PREVIEW = 4
+
+
+class TrackView:
+    """스냅샷 한 행에 대한 zero-copy 뷰 (필드 접근 시에만 디코딩)"""
+
+    __slots__ = ("_snapshot", "row")
+
+    def __init__(self, snapshot: "CatalogSnapshot", row: int):
+        self._snapshot = snapshot
+        self.row = row
+
+    def _string(self, field: str) -> str:
+        return self._snapshot.string(field, self.row)
+
+    @property
+    def id(self) -> str:
+        return self._string("id")
+
+    @property
+    def name(self) -> str:
+        return self._string("name")
+
+    @property
+    def album_name(self) -> str:
+        return self._string("album_name")
+
+    @property
+    def release_date(self) -> str:
+        return self._string("release_date")
+
+    @property
+    def artist_ids(self) -> List[str]:
+        value = self._string("artist_ids")
+        return value.split(LIST_SEPARATOR) if value else []
+
+    @property
+    def artist_names(self) -> str:
+        """쉼표로 이은 아티스트 이름 (SpotifyTrack.get_artist_names와 같은 형식)"""
+        return ", ".join(self._string("artist_names").split(LIST_SEPARATOR))
+
+    @property
+    def popularity(self) -> int:
+        return self._snapshot.popularity[self.row]
+
+    @property
+    def duration_ms(self) -> int:
+        return self._snapshot.duration_ms[self.row]
+
+    @property
+    def release_ordinal(self) -> int:
+        return self._snapshot.release_ordinal[self.row]
+
+    @property
+    def is_korean(self) -> bool:
+        return bool(self._snapshot.flags[self.row] & FLAG_KOREAN)
+
+    @property
+    def is_spam(self) -> bool:
+        return bool(self._snapshot.flags[self.row] & FLAG_SPAM)
+
+    @property
+    def genres(self) -> List[str]:
+        value = self._string("genres")
+        return value.split(LIST_SEPARATOR) if value else []
+
+    def to_track(self) -> SpotifyTrack:
+        """파이프라인용 SpotifyTrack으로 변환"""
+        artist_ids = self._string("artist_ids").split(LIST_SEPARATOR)
+        artist_names = self._string("artist_names").split(LIST_SEPARATOR)
+        artist_genres = self._string("artist_genres").split(LIST_SEPARATOR)
+        preview_url = self._string("preview_url")
+
+        return SpotifyTrack(
+            id=self.id,
+            name=self.name,
+            artists=[
+                SpotifyArtist(
+                    id=artist_id,
+                    name=artist_name,
+                    genres=genres.split(ARTIST_GENRE_SEPARATOR) if genres else []
+                )
+                for artist_id, artist_name, genres in itertools.zip_longest(
+                    artist_ids, artist_names, artist_genres[:len(artist_ids)], fillvalue=""
+                )
+            ],
+            album_name=self._string("album_name"),
+            release_date=self._string("release_date"),
+            duration_ms=self.duration_ms,
+            popularity=self.popularity,
+            preview_url=preview_url or None,
+            external_url=self._string("external_url")
+        )
+
+
+class CatalogSnapshot:
+    """mmap으로 연 읽기 전용 카탈로그 스냅샷"""
+
+    def __init__(self, path: str = CATALOG_SNAPSHOT_PATH):
+        if sys.byteorder != "little":
+            raise ValueError("카탈로그 스냅샷은 리틀 엔디언 플랫폼만 지원합니다.")
+
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+
+        self._views = []
+        magic, version, _, rows, field_count = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"지원하지 않는 스냅샷 형식: {path}")
+        if field_count != len(STRING_FIELDS):
+            self.close()
+            raise ValueError(f"문자열 필드 수 불일치: {field_count}")
+
+        self.rows = rows
+
+        cursor = HEADER.size
+        for name, typecode in NUMERIC_COLUMNS:
+            (position,) = SECTION.unpack_from(self._buffer, cursor)
+            cursor += SECTION.size
+            size = rows * array(typecode).itemsize
+            setattr(self, name, self._cast(position, size, typecode))
+
+        self._offsets = {}
+        self._heaps = {}
+        for field in STRING_FIELDS:
+            (offsets_position,) = SECTION.unpack_from(self._buffer, cursor)
+            (heap_position,) = SECTION.unpack_from(self._buffer, cursor + SECTION.size)
+            cursor += SECTION.size * 2
+            offsets = self._cast(offsets_position, (rows + 1) * 4, "I")
+            self._offsets[field] = offsets
+            self._heaps[field] = self._slice(heap_position, offsets[rows] if rows else 0)
+
+    def _slice(self, position: int, size: int) -> memoryview:
+        view = self._buffer[position:position + size]
+        self._views.append(view)
+        return view
+
+    def _cast(self, position: int, size: int, typecode: str) -> memoryview:
+        view = self._slice(position, size).cast(typecode)
+        self._views.append(view)
+        return view
+
+    def string_bytes(self, field: str, row: int) -> memoryview:
+        """문자열 필드의 원본 바이트 (복사 없음)"""
+        offsets = self._offsets[field]
+        return self._heaps[field][offsets[row]:offsets[row + 1]]
+
+    def string(self, field: str, row: int) -> str:
+        """문자열 필드 디코딩"""
+        return str(self.string_bytes(field, row), "utf-8")
+
+    def find(self, track_id: str) -> Optional[TrackView]:
+        """트랙 ID로 행 조회 (이진 탐색)"""
+        target = track_id.encode("utf-8")
+        low, high = 0, self.rows
+        while low < high:
+            middle = (low + high) // 2
+            current = self.string_bytes("id", middle).tobytes()
+            if current < target:
+                low = middle + 1
+            elif current > target:
+                high = middle
+            else:
+                return TrackView(self, middle)
+        return None
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, row: int) -> TrackView:
+        if not 0 <= row < self.rows:
+            raise IndexError(row)
+        return TrackView(self, row)
+
+    def __iter__(self) -> Iterator[TrackView]:
+        for row in range(self.rows):
+            yield TrackView(self, row)
+
+    def close(self):
+        """mmap 해제 (모든 뷰 반납 후)"""
+        for view in reversed(getattr(self, "_views", [])):
+            view.release()
+        self._buffer.release()
+        self._mmap.close()
+        self._file.close()
+
+
+def _pad(handle, alignment: int = 8):
+    """섹션 시작 위치 정렬"""
+    remainder = handle.tell() % alignment
+    if remainder:
+        handle.write(b"\0" * (alignment - remainder))
+
+
+def _merged_tracks(store, path: str) -> Tuple[List[SpotifyTrack], Dict[str, List[str]]]:
+    """디스크의 최신 스냅샷 + 저장소 트랙 병합 (같은 ID는 저장소 쪽, 장르는 합집합)"""
+    tracks: Dict[str, SpotifyTrack] = {}
+    genres: Dict[str, set] = {}
+    if os.path.exists(path):
+        disk = CatalogSnapshot(path)
+        try:
+            for view in disk:
+                tracks[view.id] = view.to_track()
+                genres[view.id] = set(view.genres)
+        finally:
+            disk.close()
+
+    for track in store.iter_tracks():
+        tracks[track.id] = track
+        genres.setdefault(track.id, set()).update(store.genres_of(track.id))
+
+    ordered = sorted(tracks.values(), key=lambda t: t.id.encode("utf-8"))
+    return ordered, {track_id: sorted(values) for track_id, values in genres.items()}
+
+
+def write_snapshot(
+    store,
+    path: str = CATALOG_SNAPSHOT_PATH,
+    lock_path: str = CATALOG_SNAPSHOT_LOCK_PATH
+) -> int:
+    """
+    트랙 저장소를 스냅샷 파일로 저장 (잠금 → 디스크 스냅샷과 병합 → 임시 파일 → 원자적 교체)
+    여러 워커가 종료하며 동시에 저장해도 다른 워커가 먼저 저장한 트랙이 사라지지 않음
+
+    Args:
+        store: TrackStore (iter_tracks, genres_of 제공)
+        path: 저장 경로
+        lock_path: 워커 간 저장 잠금 파일
+
+    Returns:
+        저장된 트랙 수
+    """
+    lock = acquire(lock_path)
+    if lock is None:
+        raise TimeoutError(f"카탈로그 스냅샷 저장 잠금 대기 시간 초과: {lock_path}")
+    try:
+        return _write(store, path)
+    finally:
+        release(lock)
+
+
+def _write(store, path: str) -> int:
+    tracks, track_genres = _merged_tracks(store, path)
+    rows = len(tracks)
+
+    numeric = {name: array(typecode) for name, typecode in NUMERIC_COLUMNS}
+    strings = {field: [] for field in STRING_FIELDS}
+
+    for track in tracks:
+        release_date = parse_release_date(track.release_date)
+        flags = 0
+        if is_korean_track(track):
+            flags |= FLAG_KOREAN
+        if is_spam_title(track.name):
+            flags |= FLAG_SPAM
+        if track.preview_url:
+            flags |= FLAG_PREVIEW
+
+        numeric["release_ordinal"].append(release_date.toordinal() if release_date else 0)
+        numeric["duration_ms"].append(track.duration_ms)
+        numeric["popularity"].append(max(0, min(100, track.popularity)))
+        numeric["flags"].append(flags)
+
+        strings["id"].append(track.id)
+        strings["name"].append(track.name)
+        strings["album_name"].append(track.album_name)
+        strings["release_date"].append(track.release_date)
+        strings["artist_ids"].append(LIST_SEPARATOR.join(a.id for a in track.artists))
+        strings["artist_names"].append(LIST_SEPARATOR.join(a.name for a in track.artists))
+        strings["genres"].append(LIST_SEPARATOR.join(track_genres.get(track.id, [])))
+        strings["preview_url"].append(track.preview_url or "")
+        strings["external_url"].append(track.external_url)
+        strings["artist_genres"].append(
+            LIST_SEPARATOR.join(ARTIST_GENRE_SEPARATOR.join(a.genres) for a in track.artists)
+        )
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.tmp.{os.getpid()}"
+
+    with open(temp_path, "wb") as handle:
+        handle.write(HEADER.pack(MAGIC, VERSION, 0, rows, len(STRING_FIELDS)))
+        section_table = handle.tell()
+        section_count = len(NUMERIC_COLUMNS) + len(STRING_FIELDS) * 2
+        handle.write(b"\0" * SECTION.size * section_count)
+
+        positions = []
+        for name, _ in NUMERIC_COLUMNS:
+            _pad(handle)
+            positions.append(handle.tell())
+            handle.write(numeric[name].tobytes())
+
+        for field in STRING_FIELDS:
+            encoded = [value.encode("utf-8") for value in strings[field]]
+            offsets = array("I", [0])
+            for value in encoded:
+                offsets.append(offsets[-1] + len(value))
+
+            _pad(handle)
+            positions.append(handle.tell())
+            handle.write(offsets.tobytes())
+            positions.append(handle.tell())
+            handle.write(b"".join(encoded))
+
+        handle.seek(section_table)
+        for position in positions:
+            handle.write(SECTION.pack(position))
+
+    os.replace(temp_path, path)
+    return rows
+
+
+if __name__ == "__main__":
+    from track_store import get_track_store
+
+    store = get_track_store()
+    count = write_snapshot(store)
+    print(f"스냅샷 저장: {count}곡 → {CATALOG_SNAPSHOT_PATH}")
+
+    snapshot = CatalogSnapshot()
+    print(f"스냅샷 로드: {len(snapshot)}곡")
+    for view in list(snapshot)[:5]:
+        print(f"{view.name} (인기도 {view.popularity}, 한국 {view.is_korean})")
+    snapshot.close()
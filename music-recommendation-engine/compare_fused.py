@@ -0,0 +1,96 @@
+"""
+통합 분석 비교 스크립트 - 개별(analyze_preference → context_analysis) vs 통합(fused_analysis)
+시나리오 프리셋별로 두 방식을 실행해 지연 시간과 결과 유사도(장르 Jaccard)를 비교
+
+실행: python compare_fused.py
+"""
+from typing import List
+import time
+
+from config import SCENARIO_PRESETS, LOCATIONS, DECIBEL_LEVELS
+from llm_cache import LLMResponseCache
+from persona_store import PersonaStore
+from local_search import normalize_genre
+import llm_cache
+import persona_store
+import nodes
+
+
+SAMPLE_PREFERENCES = [
+    (["IU", "AKMU"], ["k-pop", "acoustic"]),
+    (["Stray Kids", "ATEEZ"], ["k-pop", "hip hop"]),
+    (["Lauv", "Jeremy Zucker"], ["indie pop"]),
+]
+
+
+def jaccard(a: List[str], b: List[str]) -> float:
+    a = {normalize_genre(g) for g in a}
+    b = {normalize_genre(g) for g in b}
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def fresh_state(location: str, goal: str, decibel: str, artists: List[str], genres: List[str], mode: str) -> dict:
+    # 캐시/저장소를 비워 두 방식 모두 실제 LLM 호출을 측정
+    llm_cache._llm_cache = LLMResponseCache(":memory:")
+    persona_store._persona_store = PersonaStore(":memory:")
+    return {
+        "location": location,
+        "goal": goal,
+        "decibel": decibel,
+        "preferred_artists": artists,
+        "preferred_genres": genres,
+        "user_id": None,
+        "node_modes": {"context_analysis": "llm", "preference_context": mode},
+    }
+
+
+def run(state: dict, mode: str):
+    started = time.perf_counter()
+    if mode == "fused":
+        state = nodes.fused_analysis(state)
+    else:
+        state = nodes.context_analysis(nodes.analyze_preference(state))
+    return state, time.perf_counter() - started
+
+
+def main():
+    rows = []
+    for preset in SCENARIO_PRESETS.values():
+        location = preset["location"] if preset["location"] in LOCATIONS else "home"
+        decibel = preset["decibel"] if preset["decibel"] in DECIBEL_LEVELS else "moderate"
+        for artists, genres in SAMPLE_PREFERENCES:
+            context = (location, preset["goal"], decibel, artists, genres)
+            separate, separate_seconds = run(fresh_state(*context, "separate"), "separate")
+            fused, fused_seconds = run(fresh_state(*context, "fused"), "fused")
+            rows.append({
+                "context": f"{location}/{preset['goal']}/{decibel} {'+'.join(artists)}",
+                "separate_seconds": separate_seconds,
+                "fused_seconds": fused_seconds,
+                "genre_jaccard": jaccard(separate["ai_recommended_genres"], fused["ai_recommended_genres"]),
+                "persona_jaccard": jaccard(
+                    separate["artist_persona"].dominant_genres, fused["artist_persona"].dominant_genres
+                ),
+                "optimal_hits": (
+                    len({normalize_genre(g) for g in preset["optimal_genres"]} & {normalize_genre(g) for g in separate["ai_recommended_genres"]}),
+                    len({normalize_genre(g) for g in preset["optimal_genres"]} & {normalize_genre(g) for g in fused["ai_recommended_genres"]}),
+                ),
+            })
+
+    print("\n" + "=" * 100)
+    print(f"{'상황':45s} {'개별(s)':>8s} {'통합(s)':>8s} {'장르J':>6s} {'페르소나J':>9s} {'최적장르(개별/통합)':>18s}")
+    print("=" * 100)
+    for row in rows:
+        hits = f"{row['optimal_hits'][0]}/{row['optimal_hits'][1]}"
+        print(f"{row['context'][:45]:45s} {row['separate_seconds']:8.2f} {row['fused_seconds']:8.2f} "
+              f"{row['genre_jaccard']:6.2f} {row['persona_jaccard']:9.2f} {hits:>18s}")
+
+    count = len(rows)
+    print("-" * 100)
+    print(f"평균 지연: 개별 {sum(r['separate_seconds'] for r in rows) / count:.2f}s / "
+          f"통합 {sum(r['fused_seconds'] for r in rows) / count:.2f}s")
+    print(f"평균 장르 Jaccard: {sum(r['genre_jaccard'] for r in rows) / count:.2f}, "
+          f"페르소나 Jaccard: {sum(r['persona_jaccard'] for r in rows) / count:.2f}")
+
+
+if __name__ == "__main__":
+    main()
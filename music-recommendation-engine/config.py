@@ -24,6 +24,7 @@ PREFERRED_ARTIST_TRACK_RATIO = 0.2  # 선호 아티스트 곡 비율 20% (10곡
 KOREAN_TRACK_RATIO = 0.5  # 한국 노래 비율 50% (10곡 중 5곡)
 RECENT_TRACK_RATIO = 0.2  # 신곡 비율 20% (10곡 중 2곡)
 RECENT_YEARS = 4  # 신곡 기준 4년 이내 (2021-2025)
+DEDUP_KEEP_RULE = "popularity"  # 중복 버전 중 대표 선택: "popularity"(최고 인기도) | "original"(최초 발매본)
 
 # === 상황 컨텍스트 (새로운 정의) ===
 LOCATIONS = [
@@ -302,6 +303,253 @@ KOREAN_INDICATORS = [
     # 한글 포함 여부는 코드에서 별도 체크
 ]
 
+# 로컬 카탈로그 (수집 트랙 저장소 & mmap 스냅샷)
+DATA_DIR = Path(__file__).parent / "data"
+CATALOG_SNAPSHOT_PATH = str(DATA_DIR / "catalog.snapshot")
+CATALOG_SNAPSHOT_LOCK_PATH = str(DATA_DIR / "catalog.snapshot.lock")  # 워커들이 차례로 병합 저장
+TRACK_STORE_MAX_TRACKS = 100_000  # 메모리에 보관할 수집 트랙 수 (LRU, 스냅샷에 있는 트랙은 계속 조회 가능)
+
+# 로컬 검색 엔진 (카탈로그로 먼저 응답, 부족분만 Spotify 검색)
+LOCAL_SEARCH_ENABLED = True
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 후보 스코어링 가중치 (검색 결과 스트리밍 상위 k 선택)
+CANDIDATE_SCORE_WEIGHTS = {
+    "genre_match": 2.0,  # AI 추천/목표 장르와 일치
+    "keyword": 0.5,  # 소음도/목표 키워드 포함
+    "avoid_keyword": 1.5,  # 피해야 할 키워드 포함 (감점)
+    "korean": 1.0,
+    "recent": 0.8,
+    "preferred": 1.0,
+    "popularity": 0.5,
+}
+
+# 사용자별 최근 추천 제외 (블룸 필터)
+USER_HISTORY_FILTER_BYTES = 256  # 사용자당 필터 크기 (2세대 합계)
+USER_HISTORY_HASHES = 4  # 해시 함수 수
+USER_HISTORY_GENERATION_SIZE = 100  # 세대당 기록 곡 수 (초과 시 세대 교체)
+USER_HISTORY_GENERATION_SECONDS = 7 * 24 * 60 * 60  # 세대 최대 수명 (1주)
+USER_HISTORY_MAX_USERS = 2_000_000  # 프로세스당 최대 사용자 수 (LRU)
+
+# 장르별 후보 풀 (백그라운드 갱신)
+GENRE_POOL_ENABLED = True
+GENRE_POOL_REFRESH_SECONDS = 6 * 60 * 60  # 6시간마다 갱신
+GENRE_POOL_DEPTH = 20  # 장르 × 버킷(한국/해외 × 신곡/기존곡)당 보관 곡 수
+GENRE_POOL_PATH = str(DATA_DIR / "genre_pools.json")  # 갱신 담당 워커가 쓰고 나머지 워커는 읽기만 함
+GENRE_POOL_LOCK_PATH = str(DATA_DIR / "genre_pools.lock")  # 갱신 담당 워커 잠금
+
+# 아티스트 디렉터리 (자유 입력 아티스트명 → Spotify 아티스트 ID)
+ARTIST_DIRECTORY_PATH = str(DATA_DIR / "artist_directory.json")
+ARTIST_DIRECTORY_MAX_ARTISTS = 200000  # 디렉터리 아티스트 수 상한 (초과 시 가장 오래 쓰지 않은 아티스트와 별칭 삭제)
+ARTIST_FUZZY_THRESHOLD = 0.75  # 트라이그램 Jaccard 유사도 기준 ("Jennie"→"Jenni" 0.57은 거부, 오타 1자 수준만 허용)
+ARTIST_ALIASES = [
+    # 한글/영문 표기 별칭 그룹 (하나가 해석되면 그룹 전체가 같은 ID)
+    ["IU", "아이유"],
+    ["BTS", "방탄소년단", "Bangtan Boys"],
+    ["BLACKPINK", "블랙핑크"],
+    ["NewJeans", "뉴진스"],
+    ["Stray Kids", "스트레이 키즈", "스키즈"],
+    ["TWICE", "트와이스"],
+    ["EXO", "엑소"],
+    ["Red Velvet", "레드벨벳"],
+    ["SEVENTEEN", "세븐틴"],
+    ["aespa", "에스파"],
+    ["AKMU", "악동뮤지션"],
+    ["10CM", "십센치"],
+    ["ATEEZ", "에이티즈"],
+    ["LE SSERAFIM", "르세라핌"],
+    ["IVE", "아이브"],
+]
+
+# 아티스트 유사도 그래프 (후보 확장)
+ARTIST_GRAPH_PATH = str(DATA_DIR / "artist_graph.json")
+ARTIST_GRAPH_HOPS = 2  # 시드 아티스트에서 탐색할 최대 홉 수
+ARTIST_GRAPH_HOP_DECAY = 0.5  # 홉마다 점수 감쇠
+ARTIST_GRAPH_EXPANSION_ARTISTS = 10  # 확장할 이웃 아티스트 수
+ARTIST_GRAPH_TRACKS_PER_ARTIST = 2  # 이웃 아티스트당 후보 트랙 수
+ARTIST_GRAPH_MAX_NEIGHBOURS = 50  # 노드당 이웃 수 상한 (메모리는 2배까지 두었다가 약한 엣지부터 정리, 저장 시 상한)
+ARTIST_GRAPH_MAX_TRACKS_PER_ARTIST = 20  # 아티스트당 보관할 인기 트랙 수 (초과 시 인기도 낮은 곡부터 삭제)
+ARTIST_GRAPH_COOCCURRENCE_ARTISTS = 10  # 검색 결과당 동시 출현 엣지를 만들 상위 아티스트 수
+
+# LLM 응답 캐시 (SQLite)
+LLM_CACHE_ENABLED = True
+LLM_CACHE_PATH = str(DATA_DIR / "llm_cache.sqlite3")
+LLM_CACHE_MAX_ENTRIES = 20000  # 초과 시 가장 오래 사용되지 않은 항목부터 삭제
+LLM_CACHE_TTL_SECONDS = {  # 노드별 TTL (0 또는 미지정이면 캐시 안 함, temperature 0 노드만 캐시)
+    "analyze_preference": 7 * 24 * 60 * 60,
+    "context_analysis": 24 * 60 * 60,
+    "fused_analysis": 24 * 60 * 60,
+    "quality_validator": 60 * 60,
+    "generate_reason": 24 * 60 * 60,
+}
+LLM_DETERMINISTIC_NODES = [  # temperature 0으로 호출할 노드 (응답 캐시 대상)
+    # search_query_generator/selection은 샘플링 유지 - 품질 재시도마다 새 쿼리/선곡이 나와야 함
+    "analyze_preference",
+    "context_analysis",
+    "fused_analysis",
+    "quality_validator",
+    "generate_reason",
+]
+
+# 페르소나 저장소 (선호 아티스트/장르 조합별 ArtistPersona 재사용)
+PERSONA_STORE_PATH = str(DATA_DIR / "personas.sqlite3")
+PERSONA_TTL_SECONDS = 30 * 24 * 60 * 60  # 30일
+PERSONA_MAX_ENTRIES = 50000  # 초과 시 가장 오래된 항목부터 삭제 (만료 항목은 저장할 때마다 삭제)
+PERSONA_PERSIST_PER_USER = False  # True면 user_id별로 따로 저장 (키 앞에 user_id, 사용자 간 페르소나 공유 안 함)
+
+# 추천 이유 캐시 ((트랙, 상황, 페르소나 클러스터, 선호 아티스트 여부)별 이유 재사용)
+REASON_CACHE_PATH = str(DATA_DIR / "reasons.sqlite3")
+REASON_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60  # 7일
+REASON_CACHE_MAX_ENTRIES = 200000  # 초과 시 가장 오래된 항목부터 삭제 (만료 항목은 저장할 때마다 삭제)
+REASON_PERSONA_CLUSTER_GENRES = 2  # 페르소나 클러스터 = 주요 장르 상위 N개
+
+# 상황 분석 테이블 (위치 × 목표 × 소음도 조합별 장르를 미리 생성)
+CONTEXT_TABLE_PATH = str(DATA_DIR / "context_table.json")
+CONTEXT_TABLE_WORKERS = 8  # 테이블 생성 시 동시 LLM 호출 수
+
+# 규칙 기반 상황 분석 (LLM 없이 상황 매트릭스로 장르 채점)
+GENRE_RULE_WEIGHTS = {  # 소음도 → 목표 → 위치 우선순위
+    "decibel": 3.0,
+    "goal": 2.0,
+    "location": 1.0,
+    "scenario": 1.0,  # SCENARIO_PRESETS 최적 장르 가산점
+    "preference": 1.5,  # 선호/페르소나 장르 가산점 (소음도 적합도만큼만 반영)
+}
+GOAL_ENERGY_LEVELS = {  # GOAL_MUSIC_PROFILES energy_level → 목표 에너지
+    "very-low": 0.15,
+    "low-to-medium": 0.35,
+    "medium": 0.5,
+    "high": 0.8,
+}
+GENRE_ENERGY = {  # 장르별 대표 에너지 (0~1)
+    "lo-fi": 0.3, "lo-fi hip hop": 0.35, "study music": 0.25, "ambient": 0.15, "classical": 0.25, "instrumental": 0.3,
+    "pop": 0.65, "k-pop": 0.75, "indie pop": 0.55, "synth-pop": 0.65, "electropop": 0.7,
+    "rock": 0.75, "indie rock": 0.6, "alternative rock": 0.7, "punk rock": 0.85, "pop rock": 0.7, "metal": 0.95,
+    "electronic": 0.7, "edm": 0.9, "house": 0.8, "techno": 0.85, "dubstep": 0.9, "drum and bass": 0.9,
+    "hip hop": 0.7, "rap": 0.75, "r&b": 0.5, "trap": 0.8,
+    "jazz": 0.35, "blues": 0.4, "soul": 0.45, "funk": 0.7,
+    "acoustic": 0.3, "folk": 0.35, "ballad": 0.3, "chill": 0.3, "meditation": 0.1,
+    "reggae": 0.5, "latin": 0.7, "world music": 0.5, "country": 0.5, "workout music": 0.9,
+    "indie": 0.5, "alternative": 0.6, "soft pop": 0.4, "soft rock": 0.5, "lullaby": 0.1,
+}
+
+# 검색 쿼리 컴파일러 (LLM 없이 Spotify 필터 문법 쿼리 생성)
+QUERY_COMPILER_COUNT = 8
+KOREAN_GENRE_MAP = {  # 장르 → 한국 음악 검색용 장르 (위에서부터 먼저 일치하는 항목)
+    "hip hop": "k-hip-hop",
+    "rap": "k-rap",
+    "trap": "k-rap",
+    "r&b": "k-r&b",
+    "soul": "k-r&b",
+    "indie": "k-indie",
+    "folk": "k-indie",
+    "acoustic": "k-indie",
+    "rock": "k-rock",
+    "metal": "k-rock",
+    "ballad": "k-ballad",
+    "lo-fi": "k-indie",
+    "jazz": "korean jazz",
+}
+
+# 트랙 선택 솔버 (쿼터 제약 하 상황 적합도 최대화)
+SELECTION_MAX_PER_ARTIST = 2  # 대표 아티스트당 최대 곡 수
+
+# 프롬프트 트랙 목록 토큰 예산 (초과분은 적합도 점수가 낮은 곡부터 제외, 미지정 노드는 제한 없음)
+# quality_validator/generate_reason은 최종 곡 목록 전체가 필요하므로 예산 없음
+PROMPT_TOKEN_BUDGETS = {
+    "selection": 2500,
+}
+
+# selection LLM 프롬프트 사전 순위화 (쿼터 버킷별 상위 N곡만 전달)
+SELECTION_PRERANK_PER_BUCKET = {"korean": 15, "recent": 8, "other": 12}
+SELECTION_PRERANK_PREFERRED = 8  # 선호 아티스트 곡 상한
+
+# 구조화 출력 보정 (LLM 응답의 잘못된/잘린 트랙 번호 복원 & 빈 자리를 후보 순위로 채움)
+OUTPUT_REPAIR_MIN_SIMILARITY = 0.8  # 제목/아티스트 유사도 하한 (이름으로 복원할 때)
+OUTPUT_REPAIR_MIN_ID_PREFIX = 8  # 잘린 트랙 ID 접두사 복원 최소 길이
+SELECTION_REPAIR_MIN_RESOLVED = 0.5  # 복원된 곡 비율이 이보다 낮으면 보정 대신 LLM 재호출 (1회)
+
+# 노드 실행 방식 (요청별 node_modes로 덮어쓰기 가능)
+NODE_MODES = {
+    "context_analysis": "llm",
+    "search_query_generator": "llm",
+    "selection": "llm",
+    "quality_validator": "llm",
+    "generate_reason": "cached",
+    "preference_context": "separate",
+}
+NODE_MODE_CHOICES = {
+    # "llm": 매 요청 LLM 호출 | "table": 미리 생성한 테이블 + 규칙 타협 (없으면 llm)
+    # "rule": 규칙 엔진 (LLM 없음) | "auto": LLM 호출, 제한 시간 초과/오류 시 규칙 엔진
+    "context_analysis": ["llm", "table", "rule", "auto"],
+    # "compiler": 결정적 쿼리 컴파일러 (LLM 없음)
+    "search_query_generator": ["llm", "compiler"],
+    # "solver": 쿼터 제약 선택 솔버 (LLM 없음)
+    "selection": ["llm", "solver"],
+    # "rule": 계산된 지표 + QUALITY_THRESHOLDS만으로 검증 (LLM 없음)
+    "quality_validator": ["llm", "rule"],
+    # "cached": 추천 이유 캐시 → 미스만 LLM 한 번에 요청 | "template": 캐시 → 미스는 템플릿 (LLM 없음)
+    "generate_reason": ["llm", "cached", "template"],
+    # "separate": analyze_preference → context_analysis 순차 호출
+    # "fused": 두 분석이 모두 LLM을 필요로 하면 한 번의 구조화 출력 호출로 통합
+    "preference_context": ["separate", "fused"],
+}
+NODE_LLM_TIMEOUT_SECONDS = 3.0  # "auto" 모드의 LLM 제한 시간
+
+# 노드별 LLM 라우팅 (모델 티어 / 온도 / 타임아웃 / 지연 SLO)
+LLM_TIERS = {
+    "standard": {"model": OPENAI_MODEL},
+    "fast": {"model": "gpt-4.1-nano"},
+}
+LLM_TIER_FALLBACK = {"standard": "fast"}  # 지연 SLO 초과 또는 오류 시 대체 티어
+NODE_LLM_CONFIG = {  # default를 노드별 값으로 덮어씀 (timeout/slo_seconds 단위: 초)
+    "default": {"tier": "standard", "temperature": 0.7, "timeout": 30, "slo_seconds": 10.0},
+    # 작은 모델로 충분한 노드는 운영자가 "tier": "fast"로 opt-in (예: analyze_preference, quality_validator)
+    "analyze_preference": {"slo_seconds": 4.0},
+    "context_analysis": {"slo_seconds": 6.0},
+    "fused_analysis": {"slo_seconds": 8.0},
+    "search_query_generator": {"slo_seconds": 6.0},
+    "selection": {"timeout": 45, "slo_seconds": 12.0},
+    "quality_validator": {"slo_seconds": 4.0},
+    "generate_reason": {"slo_seconds": 8.0},
+    "context_table": {"temperature": 0, "timeout": 60, "slo_seconds": 30.0},  # 오프라인 테이블 생성
+}
+LLM_PRICING_PER_1M = {  # 모델별 100만 토큰당 단가 (USD) - 사용량 장부 비용 계산용 (cached_input: 접두사 캐시 적중 입력)
+    "gpt-4.1-mini": {"input": 0.40, "cached_input": 0.10, "output": 1.60},
+    "gpt-4.1-nano": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+}
+REQUEST_TOKEN_BUDGET = 30000  # 요청당 LLM 토큰 상한 (초과 시 품질 재시도 중단, None이면 제한 없음)
+LLM_LATENCY_EWMA_ALPHA = 0.3  # 노드 지연 시간 지수이동평균 가중치
+LLM_ROUTER_RECOVERY_SECONDS = 60  # 대체 티어 사용 중 기본 티어를 다시 시도하는 간격
+
+# LLM 런타임 (동시 호출 제한 / 레이트 리밋 재시도 / 공유 HTTP 클라이언트)
+LLM_MAX_CONCURRENCY = 8  # 프로세스 전체 동시 LLM 호출 상한 (초과 호출은 대기열에서 대기)
+LLM_NODE_CONCURRENCY = {  # 노드별 동시 호출 상한 (미지정 노드는 전체 상한만 적용)
+    "selection": 4,
+    "generate_reason": 4,
+    "context_table": 2,
+}
+LLM_QUEUE_TIMEOUT_SECONDS = 30.0  # 대기열 최대 대기 (초과 시 오류 → 대체 티어/저하 모드)
+LLM_RATE_LIMIT_RETRIES = 3  # 레이트 리밋(429) 재시도 횟수
+LLM_RATE_LIMIT_BACKOFF_SECONDS = 1.0  # 지수 백오프 기본값 (1, 2, 4초 + 지터, Retry-After 헤더 우선)
+LLM_RATE_LIMIT_MAX_BACKOFF_SECONDS = 20.0
+LLM_TRANSIENT_RETRIES = 2  # 연결 오류/타임아웃/5xx 재시도 횟수 (SDK 자체 재시도는 끄고 런타임에서 처리, 백오프는 위와 같음)
+LLM_HTTP_MAX_CONNECTIONS = 16  # 공유 HTTP 클라이언트 연결 풀 크기
+LLM_HTTP_KEEPALIVE_SECONDS = 30.0
+
+# 오프라인 실행 (네트워크 없이 전체 그래프 실행 - 부하 테스트/프로파일링)
+LLM_BACKEND = os.getenv("LLM_BACKEND", "openai")  # "openai" | "offline" (프롬프트 규칙 해석 백엔드)
+LLM_DEGRADED_MODE = True  # 모든 티어가 실패하면 오프라인 백엔드로 응답 (제공자 장애 대비)
+OFFLINE_LLM_LATENCY_SECONDS = float(os.getenv("OFFLINE_LLM_LATENCY_SECONDS", "0"))  # 호출당 인위적 지연
+OFFLINE_LLM_LATENCY_JITTER = 0.0  # 추가 무작위 지연 상한 (초)
+OFFLINE_LLM_PREFILL_SECONDS_PER_1K = 0.0  # 캐시되지 않은 입력 1K 토큰당 첫 토큰 지연 (접두사 캐시 효과 측정용)
+PROMPT_CACHE_MIN_TOKENS = 1024  # 제공자 접두사 캐시 최소 길이 (오프라인 백엔드 모사용)
+PROMPT_CACHE_BLOCK_TOKENS = 128  # 캐시 적중 토큰 단위
+SPOTIFY_BACKEND = os.getenv("SPOTIFY_BACKEND", "spotify")  # "spotify" | "local" (TrackStore 기반 검색)
+LOCAL_SPOTIFY_LATENCY_SECONDS = 0.0  # 로컬 검색 호출당 인위적 지연
+LOCAL_SPOTIFY_SYNTHETIC_TRACKS = 3000  # 로컬 카탈로그가 비어 있으면 생성할 합성 트랙 수
+
 # API 요청 설정
 REQUEST_TIMEOUT = 30
 MAX_RETRIES = 3
@@ -309,9 +557,9 @@ LOG_LEVEL = "INFO"
 
 def validate_config():
     """설정 검증"""
-    if not OPENAI_API_KEY:
+    if LLM_BACKEND == "openai" and not OPENAI_API_KEY:
         raise ValueError("OPENAI_API_KEY가 설정되지 않았습니다.")
-    if not SPOTIFY_CLIENT_ID or not SPOTIFY_CLIENT_SECRET:
+    if SPOTIFY_BACKEND == "spotify" and (not SPOTIFY_CLIENT_ID or not SPOTIFY_CLIENT_SECRET):
         raise ValueError("Spotify API 키가 설정되지 않았습니다.")
     print("✓ 설정 검증 완료 (우선순위 기반 시스템)")
 
@@ -0,0 +1,240 @@
+"""
+상황 분석 테이블 - 위치 × 목표 × 소음도 168개 조합의 상황 기반 장르를 오프라인으로 미리 생성
+요청 시에는 사용자 선호 장르/페르소나와 규칙 기반으로 섞기만 함 (LLM 호출 없음)
+DECIBEL_MUSIC_PROFILES / GOAL_MUSIC_PROFILES / LOCATION_MODIFIERS가 바뀌면 설정 해시로 감지해 재생성
+
+생성은 배포 전 한 번만 오프라인으로 실행 (python context_table.py [--force])
+서버 워커들은 같은 JSON 파일을 읽기만 하고, 파일이 갱신되면 다음 조회 때 다시 로드
+"""
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import itertools
+import json
+import os
+import threading
+import time
+
+from langchain_core.messages import SystemMessage, HumanMessage
+
+from config import (
+    LOCATIONS,
+    GOALS,
+    DECIBEL_LEVELS,
+    DECIBEL_MUSIC_PROFILES,
+    GOAL_MUSIC_PROFILES,
+    LOCATION_MODIFIERS,
+    CONTEXT_TABLE_PATH,
+    CONTEXT_TABLE_WORKERS,
+)
+from models import ArtistPersona, ContextGenreProfile
+from prompts import CONTEXT_TABLE_PROMPT, render_context_profiles
+from local_search import normalize_genre
+from llm_router import get_llm_router
+
+
+def config_hash() -> str:
+    """테이블 생성에 쓰인 상황 프로필 설정 해시"""
+    material = json.dumps(
+        {
+            "decibel": DECIBEL_MUSIC_PROFILES,
+            "goal": GOAL_MUSIC_PROFILES,
+            "location": LOCATION_MODIFIERS,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+# 설정은 프로세스 수명 동안 바뀌지 않으므로 임포트 시 한 번만 계산 (요청마다 직렬화/해시하지 않음)
+CONFIG_HASH = config_hash()
+
+
+def context_key(location: str, goal: str, decibel: str) -> str:
+    return f"{location}|{goal}|{decibel}"
+
+
+def all_contexts() -> List[Tuple[str, str, str]]:
+    """(위치, 목표, 소음도) 전체 조합"""
+    return list(itertools.product(LOCATIONS, GOALS, DECIBEL_LEVELS))
+
+
+def blend_with_preferences(
+    profile: ContextGenreProfile,
+    preferred_genres: List[str],
+    persona: Optional[ArtistPersona],
+    count: int = 5
+) -> Tuple[List[str], str]:
+    """
+    상황 장르와 사용자 취향을 규칙으로 타협
+
+    1) 상황 장르 중 선호/페르소나 장르와 겹치는 것을 앞으로
+    2) 상황에서 피해야 할 장르가 아닌 선호 장르를 최대 2개까지 포함
+    3) 나머지는 상황 장르 순위대로 채움
+
+    Returns:
+        (추천 장르, 추천 이유)
+    """
+    taste = list(preferred_genres) + (persona.dominant_genres if persona else [])
+    taste_keys = {normalize_genre(g) for g in taste}
+    avoid_keys = {normalize_genre(g) for g in profile.avoid_genres}
+
+    matched = [g for g in profile.genres if normalize_genre(g) in taste_keys]
+    compromise = [
+        g for g in preferred_genres
+        if normalize_genre(g) not in avoid_keys
+        and normalize_genre(g) not in {normalize_genre(m) for m in matched}
+    ][:2]
+
+    genres = []
+    for genre in matched + compromise + profile.genres:
+        if normalize_genre(genre) not in {normalize_genre(g) for g in genres}:
+            genres.append(genre)
+    genres = genres[:count]
+
+    reasoning = profile.reasoning
+    kept = [g for g in genres if normalize_genre(g) in taste_keys]
+    dropped = [g for g in preferred_genres if normalize_genre(g) in avoid_keys]
+    if kept:
+        reasoning += f" 사용자 취향 중 {', '.join(kept)}을(를) 상황에 맞게 포함했습니다."
+    if dropped:
+        reasoning += f" {', '.join(dropped)}은(는) 현재 상황과 맞지 않아 제외했습니다."
+    return genres, reasoning
+
+
+class ContextTable:
+    """상황 조합 → ContextGenreProfile 테이블 (JSON 영속화)"""
+
+    def __init__(self, path: Optional[str] = CONTEXT_TABLE_PATH):
+        self.path = path
+        self.entries: Dict[str, ContextGenreProfile] = {}
+        self.config_hash: Optional[str] = None
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def is_current(self) -> bool:
+        """현재 설정으로 만든 전체 테이블인지 여부"""
+        return self.config_hash == CONFIG_HASH and len(self.entries) == len(all_contexts())
+
+    def lookup(self, location: str, goal: str, decibel: str) -> Optional[ContextGenreProfile]:
+        """상황 조합 조회 (설정이 바뀐 테이블은 사용하지 않음, 파일이 갱신됐으면 다시 로드)"""
+        self._reload_if_changed()
+        if self.config_hash != CONFIG_HASH:
+            return None
+        return self.entries.get(context_key(location, goal, decibel))
+
+    def _generate(self, location: str, goal: str, decibel: str) -> ContextGenreProfile:
+        prompt = CONTEXT_TABLE_PROMPT.format(
+            location=location,
+            goal=goal,
+            decibel=decibel,
+            **render_context_profiles(location, goal, decibel)
+        )
+        router = get_llm_router()
+        profile, tier = router.invoke("context_table", ContextGenreProfile, [
+            SystemMessage(content="당신은 상황 기반 음악 추천 전문가입니다."),
+            HumanMessage(content=prompt)
+        ])
+        if not router.is_primary("context_table", tier):
+            # 대체 티어/저하 모드 응답은 테이블에 넣지 않음 (다음 빌드에서 다시 생성)
+            raise RuntimeError(f"{tier} 티어 응답은 저장하지 않음")
+        return profile
+
+    def build(self, force: bool = False) -> int:
+        """
+        전체 조합 생성 (설정 해시가 같으면 빠진 조합만)
+
+        Returns:
+            새로 생성한 조합 수
+        """
+        if force or self.config_hash != CONFIG_HASH:
+            self.entries = {}
+        self.config_hash = CONFIG_HASH
+
+        missing = [c for c in all_contexts() if context_key(*c) not in self.entries]
+        if not missing:
+            return 0
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=CONTEXT_TABLE_WORKERS) as executor:
+            futures = {executor.submit(self._generate, *context): context for context in missing}
+            for future, context in futures.items():
+                try:
+                    profile = future.result()
+                except Exception as e:
+                    print(f"상황 테이블 생성 오류 ({context_key(*context)}): {str(e)}")
+                    continue
+                with self._lock:
+                    self.entries[context_key(*context)] = profile
+
+        self.save()
+        print(f"✓ 상황 테이블 {len(missing)}개 조합 생성 ({time.perf_counter() - started:.1f}s)")
+        return len(missing)
+
+    # --- 영속화 ---
+
+    def _reload_if_changed(self):
+        """다른 프로세스(오프라인 생성)가 파일을 바꿨으면 다시 로드"""
+        if not self.path:
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime != self._mtime:
+            self.load()
+
+    def load(self):
+        """JSON 파일에서 테이블 로드"""
+        try:
+            self._mtime = os.stat(self.path).st_mtime
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.entries = {
+                key: ContextGenreProfile.model_validate(entry)
+                for key, entry in data.get("entries", {}).items()
+            }
+            self.config_hash = data.get("config_hash")
+        except (OSError, ValueError) as e:
+            print(f"상황 테이블 로드 오류: {str(e)}")
+
+    def save(self):
+        """JSON 파일로 저장"""
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                "config_hash": self.config_hash,
+                "entries": {key: entry.model_dump() for key, entry in self.entries.items()},
+            }
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp.{os.getpid()}"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+
+# 싱글톤 인스턴스
+_context_table = None
+
+def get_context_table() -> ContextTable:
+    """상황 분석 테이블 싱글톤 인스턴스 반환"""
+    global _context_table
+    if _context_table is None:
+        _context_table = ContextTable()
+    return _context_table
+
+
+if __name__ == "__main__":
+    import sys
+
+    table = get_context_table()
+    if table.is_current() and "--force" not in sys.argv:
+        print(f"✓ 상황 테이블 최신 상태 ({len(table.entries)}개 조합)")
+    else:
+        table.build(force="--force" in sys.argv)
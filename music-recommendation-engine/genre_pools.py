@@ -0,0 +1,283 @@
+"""
+장르별 후보 풀 - 백그라운드에서 주기적으로 미리 만들어두는 후보 트랙 목록
+AVAILABLE_GENRES + 목표/시나리오 추천 장르 (고정 어휘)에 대해
+스팸 필터 → 중복 버전 제거 → 한국/해외 × 신곡/기존곡 버킷별 인기도 순 정렬
+
+uvicorn 워커가 여러 개여도 잠금을 얻은 한 워커만 Spotify로 갱신해 GENRE_POOL_PATH에 저장하고
+나머지 워커는 그 파일을 읽기만 함 (파일이 갱신되면 다음 조회 때 다시 로드)
+"""
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+import json
+import os
+import threading
+import time
+
+from config import (
+    AVAILABLE_GENRES,
+    GOAL_MUSIC_PROFILES,
+    SCENARIO_PRESETS,
+    RECENT_YEARS,
+    KOREAN_TRACK_RATIO,
+    RECENT_TRACK_RATIO,
+    GENRE_POOL_REFRESH_SECONDS,
+    GENRE_POOL_DEPTH,
+    GENRE_POOL_PATH,
+    GENRE_POOL_LOCK_PATH,
+)
+from models import SpotifyTrack
+from local_search import normalize_genre
+from spotify_client import get_spotify_client
+from process_lock import try_acquire, release
+from track_utils import (
+    dedupe_tracks,
+    is_spam_title,
+    is_korean_track,
+    parse_release_date,
+)
+
+
+BUCKETS = ["korean_recent", "korean_other", "global_recent", "global_other"]
+
+
+def pool_vocabulary() -> List[str]:
+    """풀을 만들 장르 목록 (정규화 후 중복 제거)"""
+    genres = list(AVAILABLE_GENRES)
+    for profile in GOAL_MUSIC_PROFILES.values():
+        genres.extend(profile["suggested_genres"])
+    for preset in SCENARIO_PRESETS.values():
+        genres.extend(preset["optimal_genres"])
+
+    vocabulary = {}
+    for genre in genres:
+        vocabulary.setdefault(normalize_genre(genre), genre)
+    return list(vocabulary.values())
+
+
+class GenrePoolBuilder:
+    """장르별 후보 풀 생성 & 주기적 갱신"""
+
+    def __init__(self, path: Optional[str] = GENRE_POOL_PATH, lock_path: str = GENRE_POOL_LOCK_PATH):
+        self.vocabulary = pool_vocabulary()
+        self._keys = {normalize_genre(g): g for g in self.vocabulary}
+        self._pools: Dict[str, Dict[str, List[SpotifyTrack]]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.last_refresh: Optional[datetime] = None
+        self.path = path
+        self.lock_path = lock_path
+        self._leader_lock = None  # 갱신 담당 워커 잠금 핸들
+        self._mtime: Optional[float] = None
+
+    # --- 생성 ---
+
+    def build_pool(self, genre: str) -> Dict[str, List[SpotifyTrack]]:
+        """장르 하나의 버킷별 후보 풀 생성"""
+        spotify_client = get_spotify_client()
+        this_year = datetime.now().year
+        queries = [
+            f'genre:"{genre}" year:{this_year - RECENT_YEARS + 1}-{this_year}',
+            f'genre:"{genre}"',
+        ]
+
+        tracks = []
+        for query in queries:
+            tracks.extend(spotify_client.search_tracks(query, limit=50, use_local=False))
+
+        tracks = [t for t in tracks if not is_spam_title(t.name)]
+        tracks = dedupe_tracks(tracks)
+
+        cutoff_date = datetime.now() - timedelta(days=RECENT_YEARS * 365)
+        pool = {bucket: [] for bucket in BUCKETS}
+        for track in tracks:
+            release_date = parse_release_date(track.release_date)
+            region = "korean" if is_korean_track(track) else "global"
+            age = "recent" if release_date and release_date >= cutoff_date else "other"
+            pool[f"{region}_{age}"].append(track)
+
+        for bucket in BUCKETS:
+            pool[bucket].sort(key=lambda t: -t.popularity)
+            pool[bucket] = pool[bucket][:GENRE_POOL_DEPTH]
+
+        return pool
+
+    def refresh(self):
+        """전체 장르 풀 갱신"""
+        started = time.perf_counter()
+        for genre in self.vocabulary:
+            if self._stop.is_set():
+                return
+            try:
+                pool = self.build_pool(genre)
+            except Exception as e:
+                print(f"장르 풀 생성 오류 ({genre}): {str(e)}")
+                continue
+            with self._lock:
+                self._pools[normalize_genre(genre)] = pool
+
+        self.last_refresh = datetime.now()
+        self.save()
+        print(f"✓ 장르 풀 {len(self._pools)}개 갱신 ({time.perf_counter() - started:.1f}s)")
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(GENRE_POOL_REFRESH_SECONDS)
+
+    def start(self) -> bool:
+        """
+        백그라운드 갱신 시작 (잠금을 얻은 워커만 갱신, 나머지는 공유 파일 읽기)
+
+        Returns:
+            이 프로세스가 갱신을 맡았는지 여부
+        """
+        if self._thread and self._thread.is_alive():
+            return True
+        self._reload_if_changed()
+        if self.path:
+            self._leader_lock = self._leader_lock or try_acquire(self.lock_path)
+            if self._leader_lock is None:
+                return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="genre-pool-builder", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """백그라운드 갱신 중지 (갱신 담당 잠금 해제)"""
+        self._stop.set()
+        release(self._leader_lock)
+        self._leader_lock = None
+
+    # --- 공유 파일 ---
+
+    def save(self):
+        """풀을 JSON 파일로 저장 (갱신 담당 워커만 호출)"""
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                "refreshed_at": self.last_refresh.isoformat() if self.last_refresh else None,
+                "pools": {
+                    genre: {bucket: [t.model_dump() for t in tracks] for bucket, tracks in pool.items()}
+                    for genre, pool in self._pools.items()
+                },
+            }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp.{os.getpid()}"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
+
+    def _reload_if_changed(self):
+        """갱신 담당 워커가 파일을 바꿨으면 다시 로드 (갱신 담당 워커 자신은 메모리 풀 사용)"""
+        if not self.path or (self._thread and self._thread.is_alive()):
+            return
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            pools = {
+                genre: {bucket: [SpotifyTrack.model_validate(t) for t in tracks] for bucket, tracks in pool.items()}
+                for genre, pool in data.get("pools", {}).items()
+            }
+        except (OSError, ValueError) as e:
+            print(f"장르 풀 로드 오류: {str(e)}")
+            return
+        with self._lock:
+            self._pools = pools
+        self._mtime = mtime
+        if data.get("refreshed_at"):
+            self.last_refresh = datetime.fromisoformat(data["refreshed_at"])
+
+    # --- 조회 ---
+
+    def match_genre(self, genre: str) -> Optional[str]:
+        """AI 추천 장르를 풀 장르 키로 매핑 (정확 일치 → 가장 긴 부분 일치)"""
+        key = normalize_genre(genre)
+        self._reload_if_changed()
+        with self._lock:
+            if key in self._pools:
+                return key
+            candidates = [k for k in self._pools if f" {k} " in f" {key} "]
+        return max(candidates, key=len) if candidates else None
+
+    def assemble(self, genres: List[str], count: int) -> List[SpotifyTrack]:
+        """
+        여러 장르 풀에서 한국/신곡 비율에 맞춰 후보 조립
+
+        Args:
+            genres: 풀 장르 키 목록 (match_genre 결과)
+            count: 필요한 후보 수
+
+        Returns:
+            장르 라운드로빈으로 섞은 후보 트랙 리스트
+        """
+        with self._lock:
+            pools = [self._pools[g] for g in genres if g in self._pools]
+        if not pools:
+            return []
+
+        # 한국 신곡도 전체 신곡 목표에 포함 (신곡 합계 = recent_target)
+        korean_target = round(count * KOREAN_TRACK_RATIO)
+        recent_target = round(count * RECENT_TRACK_RATIO)
+        quotas = {"korean_recent": round(recent_target * KOREAN_TRACK_RATIO)}
+        quotas["global_recent"] = recent_target - quotas["korean_recent"]
+        quotas["korean_other"] = korean_target - quotas["korean_recent"]
+        quotas["global_other"] = count - sum(quotas.values())
+
+        selected = []
+        seen = set()
+        for bucket in BUCKETS:
+            taken = 0
+            depth = 0
+            while taken < quotas[bucket] and depth < GENRE_POOL_DEPTH:
+                for pool in pools:
+                    if depth < len(pool[bucket]) and taken < quotas[bucket]:
+                        track = pool[bucket][depth]
+                        if track.id not in seen:
+                            selected.append(track)
+                            seen.add(track.id)
+                            taken += 1
+                depth += 1
+
+        # 버킷이 부족하면 남은 트랙으로 채우기
+        for bucket in BUCKETS:
+            for pool in pools:
+                for track in pool[bucket]:
+                    if len(selected) >= count:
+                        return selected
+                    if track.id not in seen:
+                        selected.append(track)
+                        seen.add(track.id)
+
+        return selected
+
+    def is_ready(self) -> bool:
+        self._reload_if_changed()
+        return bool(self._pools)
+
+
+# 싱글톤 인스턴스
+_genre_pools = None
+
+def get_genre_pools() -> GenrePoolBuilder:
+    """장르 풀 싱글톤 인스턴스 반환"""
+    global _genre_pools
+    if _genre_pools is None:
+        _genre_pools = GenrePoolBuilder()
+    return _genre_pools
+
+
+if __name__ == "__main__":
+    builder = get_genre_pools()
+    print(f"풀 장르 {len(builder.vocabulary)}개: {', '.join(builder.vocabulary)}")
+    pool = builder.build_pool("lo-fi")
+    for bucket, tracks in pool.items():
+        print(f"{bucket}: {len(tracks)}곡")
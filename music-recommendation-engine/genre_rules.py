@@ -0,0 +1,160 @@
+"""
+규칙 기반 상황 분석 - config의 상황 매트릭스만으로 AI 추천 장르 생성 (LLM 호출 없음)
+AVAILABLE_GENRES(+ 선호 장르)를 소음도 → 목표 → 위치 우선순위 가중치로 채점하고
+추천 이유는 템플릿으로 작성
+"""
+from typing import Dict, List, Optional, Tuple
+
+from config import (
+    AVAILABLE_GENRES,
+    DECIBEL_MUSIC_PROFILES,
+    GOAL_MUSIC_PROFILES,
+    LOCATION_MODIFIERS,
+    SCENARIO_PRESETS,
+    GENRE_ENERGY,
+    GOAL_ENERGY_LEVELS,
+    GENRE_RULE_WEIGHTS,
+)
+from models import ArtistPersona
+from local_search import normalize_genre
+
+
+_ENERGY = {normalize_genre(genre): energy for genre, energy in GENRE_ENERGY.items()}
+
+
+def genre_energy(genre: str) -> float:
+    """장르 에너지 (미등록 장르는 포함된 가장 긴 등록 장르 기준, 없으면 0.5)"""
+    key = normalize_genre(genre)
+    if key in _ENERGY:
+        return _ENERGY[key]
+    matches = [known for known in _ENERGY if known in key]
+    if matches:
+        return _ENERGY[max(matches, key=len)]
+    return 0.5
+
+
+def _closeness(value: float, target: float, tolerance: float = 0.5) -> float:
+    return max(0.0, 1.0 - abs(value - target) / tolerance)
+
+
+def _genre_in(genre: str, genres: List[str]) -> bool:
+    """장르 이름 일치 또는 포함 관계 (예: "indie" ↔ "indie pop")"""
+    key = normalize_genre(genre)
+    for other in genres:
+        other_key = normalize_genre(other)
+        if key == other_key or other_key in key.split() or key in other_key.split():
+            return True
+    return False
+
+
+def _scenario_genres(location: str, goal: str, decibel: str) -> List[str]:
+    """상황에 해당하는 시나리오 프리셋의 최적 장르 ("any"는 모두 일치)"""
+    genres = []
+    for preset in SCENARIO_PRESETS.values():
+        if (
+            preset["goal"] == goal
+            and preset["location"] in (location, "any")
+            and preset["decibel"] in (decibel, "any")
+        ):
+            genres.extend(preset["optimal_genres"])
+    return genres
+
+
+def score_genres(
+    location: str,
+    goal: str,
+    decibel: str,
+    preferred_genres: List[str],
+    persona: Optional[ArtistPersona] = None
+) -> List[Tuple[str, float]]:
+    """
+    후보 장르 채점 (높은 점수 순)
+
+    - 소음도: 장르 에너지가 energy_range 안이면 만점, 벗어난 만큼 감점
+    - 목표: suggested_genres 일치 + 목표 에너지 레벨 근접도
+    - 위치: adjust_energy로 보정한 목표 에너지 근접도
+    - 시나리오 프리셋 최적 장르 가산점
+    - 사용자 선호/페르소나 장르 가산점 (소음도 적합도만큼만 반영)
+    """
+    weights = GENRE_RULE_WEIGHTS
+    low, high = DECIBEL_MUSIC_PROFILES[decibel]["energy_range"]
+    goal_profile = GOAL_MUSIC_PROFILES[goal]
+    goal_energy = GOAL_ENERGY_LEVELS[goal_profile["energy_level"]]
+    location_energy = goal_energy + LOCATION_MODIFIERS[location]["adjust_energy"]
+    scenario = _scenario_genres(location, goal, decibel)
+    taste = list(preferred_genres) + (persona.dominant_genres if persona else [])
+
+    candidates: Dict[str, str] = {}
+    for genre in AVAILABLE_GENRES + list(preferred_genres):
+        candidates.setdefault(normalize_genre(genre), genre)
+
+    scores = []
+    for genre in candidates.values():
+        energy = genre_energy(genre)
+        distance = max(low - energy, 0.0, energy - high)
+        decibel_fit = max(0.0, 1.0 - distance / 0.3)
+        goal_fit = 0.5 * _genre_in(genre, goal_profile["suggested_genres"]) + 0.5 * _closeness(energy, goal_energy)
+        location_fit = _closeness(energy, location_energy)
+
+        score = (
+            weights["decibel"] * decibel_fit
+            + weights["goal"] * goal_fit
+            + weights["location"] * location_fit
+            + weights["scenario"] * _genre_in(genre, scenario)
+            + weights["preference"] * _genre_in(genre, taste) * decibel_fit
+        )
+        scores.append((genre, score))
+
+    scores.sort(key=lambda item: (-item[1], item[0]))
+    return scores
+
+
+def recommend_genres(
+    location: str,
+    goal: str,
+    decibel: str,
+    preferred_genres: List[str],
+    persona: Optional[ArtistPersona] = None,
+    count: int = 5
+) -> Tuple[List[str], str]:
+    """
+    규칙 기반 AI 추천 장르 & 템플릿 추천 이유
+
+    Returns:
+        (추천 장르, 추천 이유)
+    """
+    genres = [genre for genre, _ in score_genres(location, goal, decibel, preferred_genres, persona)[:count]]
+
+    low, high = DECIBEL_MUSIC_PROFILES[decibel]["energy_range"]
+    goal_profile = GOAL_MUSIC_PROFILES[goal]
+    location_mod = LOCATION_MODIFIERS[location]
+    goal_matches = [g for g in genres if _genre_in(g, goal_profile["suggested_genres"])]
+
+    reasoning = f"소음도({decibel}) 환경에 맞춰 에너지 {low:.1f}-{high:.1f} 범위의 장르를 우선했습니다."
+    if goal_matches:
+        reasoning += f" 목표({goal}: {goal_profile['description']})에 맞는 {', '.join(goal_matches)}을(를) 포함했습니다."
+    reasoning += f" {location} 위치의 {location_mod['modifier']} 분위기를 반영했습니다"
+    if location_mod["adjust_energy"]:
+        reasoning += f" (에너지 {location_mod['adjust_energy']:+.1f} 보정)."
+    else:
+        reasoning += "."
+
+    kept = [g for g in genres if _genre_in(g, preferred_genres)]
+    dropped = [g for g in preferred_genres if not _genre_in(g, genres)]
+    if kept:
+        reasoning += f" 선호 장르 중 {', '.join(kept)}은(는) 상황에 맞아 유지했습니다."
+    if dropped:
+        reasoning += f" {', '.join(dropped)}은(는) 현재 상황과 에너지가 맞지 않아 비중을 낮췄습니다."
+
+    return genres, reasoning
+
+
+if __name__ == "__main__":
+    import time
+
+    started = time.perf_counter()
+    genres, reasoning = recommend_genres("library", "focus", "quiet", ["k-pop", "edm"])
+    elapsed = (time.perf_counter() - started) * 1_000_000
+    print(f"추천 장르: {genres}")
+    print(f"추천 이유: {reasoning}")
+    print(f"소요 시간: {elapsed:.0f}µs")
@@ -3,10 +3,14 @@ LangGraph 워크플로우 - 우선순위 기반 시스템
 """
 from langgraph.graph import StateGraph, END
 from models import AgentState
+from user_history import get_user_history
+from usage_ledger import UsageLedger, get_usage_metrics
 
 from nodes import (
     analyze_preference,
     context_analysis,  # 🆕 새 노드
+    fused_analysis,
+    route_entry,
     search_query_generator,  # 🆕 새 노드
     tools,
     preference_search,
@@ -14,7 +18,8 @@ from nodes import (
     remix_track_filter,
     quality_validator,
     generate_reason,
-    should_continue
+    should_continue,
+    is_preferred_artist
 )
 
 
@@ -25,6 +30,7 @@ def create_recommendation_graph():
     노드 흐름:
     1. analyze_preference: 선호 분석
     2. context_analysis: 🆕 상황 분석 & AI 장르 추천
+       (통합 모드: fused_analysis가 1, 2를 한 번의 LLM 호출로 처리)
     3. search_query_generator: 🆕 검색 쿼리 생성
     4. tools: Spotify 검색
     5. preference_search: 선호 아티스트 검색
@@ -40,6 +46,7 @@ def create_recommendation_graph():
     # 노드 추가
     workflow.add_node("analyze_preference", analyze_preference)
     workflow.add_node("context_analysis", context_analysis)  # 🆕
+    workflow.add_node("fused_analysis", fused_analysis)
     workflow.add_node("search_query_generator", search_query_generator)  # 🆕
     workflow.add_node("tools", tools)
     workflow.add_node("preference_search", preference_search)
@@ -49,8 +56,15 @@ def create_recommendation_graph():
     workflow.add_node("generate_reason", generate_reason)
     
     # 엣지 추가
-    workflow.set_entry_point("analyze_preference")
+    workflow.set_conditional_entry_point(
+        route_entry,
+        {
+            "separate": "analyze_preference",
+            "fused": "fused_analysis"
+        }
+    )
     workflow.add_edge("analyze_preference", "context_analysis")  # 🆕
+    workflow.add_edge("fused_analysis", "search_query_generator")
     workflow.add_edge("context_analysis", "search_query_generator")  # 🆕
     workflow.add_edge("search_query_generator", "tools")  # 🆕
     workflow.add_edge("tools", "preference_search")
@@ -79,7 +93,9 @@ def run_recommendation(
     goal: str,
     decibel: str,
     preferred_artists: list,
-    preferred_genres: list = None
+    preferred_genres: list = None,
+    user_id: str = None,
+    node_modes: dict = None
 ) -> dict:
     """
     음악 추천 실행 (우선순위 기반)
@@ -106,6 +122,9 @@ def run_recommendation(
         "decibel": decibel,
         "preferred_artists": preferred_artists,
         "preferred_genres": preferred_genres or [],
+        "preferred_artist_ids": None,
+        "user_id": user_id,
+        "node_modes": node_modes,
         "artist_persona": None,
         "ai_recommended_genres": None,  # 🆕
         "ai_genre_reasoning": None,  # 🆕
@@ -117,7 +136,9 @@ def run_recommendation(
         "recommendations": None,
         "iteration_count": 0,
         "validation_feedback": None,
-        "quality_validation": None
+        "validation_codes": None,
+        "quality_validation": None,
+        "usage_ledger": UsageLedger()  # 🆕 노드별 토큰/비용 기록 + 요청 토큰 상한
     }
     
     # 그래프 실행
@@ -126,6 +147,14 @@ def run_recommendation(
     try:
         final_state = app.invoke(initial_state)
         
+        # 🆕 다음 요청에서 같은 곡이 반복되지 않도록 사용자 이력에 기록
+        get_user_history().record(user_id, [t.id for t in final_state["final_tracks"]])
+        
+        # 🆕 LLM 사용량 로그 + 프로세스 누적 집계
+        ledger = final_state["usage_ledger"]
+        print(ledger.log_line())
+        get_usage_metrics().add(ledger)
+        
         print("\n" + "=" * 60)
         print("✅ 추천 완료!")
         print("=" * 60)
@@ -136,7 +165,9 @@ def run_recommendation(
             "ai_recommended_genres": final_state["ai_recommended_genres"],  # 🆕
             "iteration_count": final_state["iteration_count"],
             "quality_validation": final_state["quality_validation"],
-            "artist_persona": final_state["artist_persona"]
+            "artist_persona": final_state["artist_persona"],
+            "preferred_artist_ids": final_state["preferred_artist_ids"] or {},
+            "llm_usage": ledger.summary()
         }
         
         # 결과 출력
@@ -154,10 +185,10 @@ def run_recommendation(
             print(f"   - 인기도 분포: 높음 {pop_dist.high}, 중간 {pop_dist.medium}, 낮음 {pop_dist.low}")
         
         print(f"\n🎵 추천 곡 (10곡):")  # 🔧 5곡 → 10곡
-        preferred_set = set(preferred_artists)
         for i, track in enumerate(result['final_tracks'], 1):
+            # 🆕 입력 이름 또는 해석된 아티스트 ID 기준 (표기가 달라도 ⭐ 표시)
             is_preferred = any(
-                artist.name in preferred_set 
+                is_preferred_artist(artist, final_state)
                 for artist in track.artists
             )
             prefix = "⭐" if is_preferred else "  "
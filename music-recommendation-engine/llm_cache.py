@@ -0,0 +1,141 @@
+"""
+LLM 응답 캐시 - 구조화 출력 호출 결과를 SQLite에 저장
+키: 모델 + 온도 + 메시지 목록 해시 + 출력 스키마
+temperature 0 호출만 캐시 (샘플링 응답을 재사용하면 재시도해도 같은 결과), 노드별 TTL, 전체 항목 수 LRU 제한, 노드별 적중률/절약 시간 집계
+"""
+from typing import Dict, List, Optional, Type
+from collections import defaultdict
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from pydantic import BaseModel
+
+from config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_PATH,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_TTL_SECONDS,
+)
+
+
+class LLMResponseCache:
+    """SQLite 기반 구조화 출력 캐시 (스레드 안전)"""
+
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.stats: Dict[str, Dict[str, float]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "saved_seconds": 0.0}
+        )
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                node TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                latency REAL NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+
+    @staticmethod
+    def make_key(model: str, temperature: float, schema: Type[BaseModel], messages: List) -> str:
+        """모델/온도/스키마/메시지로 캐시 키 생성"""
+        material = json.dumps(
+            {
+                "model": model,
+                "temperature": temperature,
+                "schema": schema.model_json_schema(),
+                "messages": [(message.type, message.content) for message in messages],
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def cacheable(node: str, temperature: float) -> bool:
+        """TTL이 설정된 temperature 0 노드만 캐시"""
+        return LLM_CACHE_ENABLED and temperature == 0 and LLM_CACHE_TTL_SECONDS.get(node, 0) > 0
+
+    def get(self, node: str, key: str, schema: Type[BaseModel], temperature: float) -> Optional[BaseModel]:
+        """캐시 조회 (만료/스키마 불일치 항목은 미스 처리)"""
+        if not self.cacheable(node, temperature):
+            return None
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, latency, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or now - row[2] > LLM_CACHE_TTL_SECONDS[node]:
+                self.stats[node]["misses"] += 1
+                return None
+
+            try:
+                result = schema.model_validate_json(row[0])
+            except ValueError:
+                self.stats[node]["misses"] += 1
+                return None
+
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self.stats[node]["hits"] += 1
+            self.stats[node]["saved_seconds"] += row[1]
+            return result
+
+    def put(self, node: str, key: str, result: BaseModel, latency: float, temperature: float):
+        """응답 저장 후 LRU 한도 초과분 삭제"""
+        if not self.cacheable(node, temperature):
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, node, result.model_dump_json(), latency, now, now),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """노드별 적중률 & 절약 시간"""
+        report = {}
+        for node, stat in self.stats.items():
+            total = stat["hits"] + stat["misses"]
+            report[node] = {
+                "hits": stat["hits"],
+                "misses": stat["misses"],
+                "hit_rate": round(stat["hits"] / total, 3) if total else 0.0,
+                "saved_seconds": round(stat["saved_seconds"], 3),
+            }
+        return report
+
+
+# 싱글톤 인스턴스
+_llm_cache = None
+
+def get_llm_cache() -> LLMResponseCache:
+    """LLM 응답 캐시 싱글톤 인스턴스 반환"""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache()
+    return _llm_cache
@@ -0,0 +1,301 @@
+"""
+LLM 라우터 - 노드별 모델 티어/온도/타임아웃 (NODE_LLM_CONFIG) 적용
+노드의 최근 지연 시간(EWMA)이 SLO를 넘거나 호출이 실패하면 더 빠른 티어로 대체
+티어별 호출 수, 지연 시간, 토큰 사용량 집계
+백엔드 팩토리를 주입하면 스텁 모델로 오프라인 테스트 가능
+모든 티어가 실패하면 (LLM_DEGRADED_MODE) 오프라인 규칙 백엔드로 저하 모드 응답
+실제 호출은 LLM 런타임을 거침 (러너블 캐시, 동시성 제한, 레이트 리밋 재시도)
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+from collections import defaultdict
+import contextlib
+import json
+import threading
+import time
+
+from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
+
+from config import (
+    LLM_TIERS,
+    LLM_TIER_FALLBACK,
+    NODE_LLM_CONFIG,
+    LLM_DETERMINISTIC_NODES,
+    LLM_LATENCY_EWMA_ALPHA,
+    LLM_ROUTER_RECOVERY_SECONDS,
+    LLM_BACKEND,
+    LLM_DEGRADED_MODE,
+)
+from track_encoding import estimate_tokens
+from prompts import identify_prompt
+from offline_llm import StubChatModel, offline_backend, offline_response
+from llm_runtime import LLMRuntime, get_llm_runtime
+from usage_ledger import UsageLedger
+
+
+BackendFactory = Callable[[str, float, float], Any]  # (모델, 온도, 타임아웃) → with_structured_output 지원 모델
+
+
+def openai_backend(model: str, temperature: float, timeout: float) -> ChatOpenAI:
+    """기본 백엔드 (OpenAI, 공유 HTTP 클라이언트 사용 - 레이트 리밋/연결 오류/5xx 재시도는 LLM 런타임이 담당)"""
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
+        timeout=timeout,
+        max_retries=0,
+        http_client=get_llm_runtime().http_client,
+    )
+
+
+class LLMRouter:
+    """노드별 모델 라우팅 & 티어 대체 (스레드 안전)"""
+
+    def __init__(
+        self,
+        backend_factory: Optional[BackendFactory] = None,
+        degraded_model: Optional[Any] = None,
+        runtime: Optional[LLMRuntime] = None
+    ):
+        self.backend_factory = backend_factory or openai_backend
+        self.degraded_model = degraded_model  # 제공자 장애 시 응답 모델 (None이면 예외 전파)
+        self.runtime = runtime or get_llm_runtime()
+        self._models: Dict[Tuple[str, float, float], Any] = {}
+        self._latency: Dict[Tuple[str, str], float] = {}  # (노드, 티어) → 지연 시간 EWMA
+        self._last_sample: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, float]] = defaultdict(lambda: {
+            "calls": 0, "errors": 0, "fallbacks": 0,
+            "latency_total": 0.0, "input_tokens": 0, "cached_input_tokens": 0, "output_tokens": 0,
+        })
+        self._prompts: Dict[str, Dict[str, str]] = {}  # 노드 → 마지막으로 사용한 템플릿 버전/접두사 해시
+
+    # --- 설정 ---
+
+    def node_config(self, node: str) -> Dict[str, Any]:
+        """노드 설정 (default + 노드별 덮어쓰기, LLM_DETERMINISTIC_NODES는 temperature 0)"""
+        config = dict(NODE_LLM_CONFIG["default"])
+        config.update(NODE_LLM_CONFIG.get(node, {}))
+        if node in LLM_DETERMINISTIC_NODES:
+            config["temperature"] = 0.0
+        return config
+
+    def describe(self, node: str) -> Tuple[str, float]:
+        """노드 기본 티어의 (모델, 온도) - 응답 캐시 키용 (캐시에는 기본 티어 응답만 저장)"""
+        config = self.node_config(node)
+        return LLM_TIERS[config["tier"]]["model"], config["temperature"]
+
+    def is_primary(self, node: str, tier: str) -> bool:
+        """기본 티어가 응답했는지 (대체 티어/저하 모드 응답은 캐시·영속화 금지)"""
+        return tier == self.node_config(node)["tier"]
+
+    def _model(self, tier: str, config: Dict[str, Any]):
+        key = (LLM_TIERS[tier]["model"], config["temperature"], config["timeout"])
+        with self._lock:
+            if key not in self._models:
+                self._models[key] = self.backend_factory(*key)
+            return self._models[key]
+
+    # --- 라우팅 ---
+
+    def choose_tier(self, node: str) -> str:
+        """
+        기본 티어의 지연 EWMA가 SLO를 넘으면 대체 티어 선택
+        (LLM_ROUTER_RECOVERY_SECONDS가 지나면 기본 티어를 다시 시도해 회복 여부 확인)
+        """
+        config = self.node_config(node)
+        primary = config["tier"]
+        fallback = LLM_TIER_FALLBACK.get(primary)
+        latency = self._latency.get((node, primary))
+        if fallback is None or latency is None or latency <= config["slo_seconds"]:
+            return primary
+        if time.time() - self._last_sample.get((node, primary), 0.0) >= LLM_ROUTER_RECOVERY_SECONDS:
+            return primary
+        return fallback
+
+    def _record(self, node: str, tier: str, elapsed: float, messages: List, result: Any) -> Dict[str, Any]:
+        """지연/토큰 집계 → 사용량 장부 기록용 값 (입력/캐시 입력/출력 토큰, 첫 토큰까지 시간)"""
+        raw, parsed = result.get("raw"), result.get("parsed")
+        usage = getattr(raw, "usage_metadata", None) or {}
+        input_tokens = usage.get("input_tokens") or sum(estimate_tokens(str(m.content)) for m in messages)
+        output_tokens = usage.get("output_tokens") or (
+            estimate_tokens(parsed.model_dump_json()) if isinstance(parsed, BaseModel) else 0
+        )
+        cached_input_tokens = (usage.get("input_token_details") or {}).get("cache_read") or 0
+        ttft = (getattr(raw, "response_metadata", None) or {}).get("time_to_first_token")
+
+        # 등록 템플릿 프롬프트면 접두사 해시와 캐시 적중 토큰 로그
+        template = next(filter(None, (identify_prompt(str(getattr(m, "content", m))) for m in messages)), None)
+        if template is not None:
+            print(f"🧩 {node}: {template.key} 접두사 {template.prefix_hash}, "
+                  f"캐시 토큰 {cached_input_tokens}/{input_tokens}")
+
+        with self._lock:
+            previous = self._latency.get((node, tier))
+            self._latency[(node, tier)] = (
+                elapsed if previous is None
+                else LLM_LATENCY_EWMA_ALPHA * elapsed + (1 - LLM_LATENCY_EWMA_ALPHA) * previous
+            )
+            self._last_sample[(node, tier)] = time.time()
+            if template is not None:
+                self._prompts[node] = {"template": template.key, "prefix_hash": template.prefix_hash}
+            stat = self.stats[tier]
+            stat["calls"] += 1
+            stat["latency_total"] += elapsed
+            stat["input_tokens"] += input_tokens
+            stat["cached_input_tokens"] += cached_input_tokens
+            stat["output_tokens"] += output_tokens
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "cached_input_tokens": cached_input_tokens,
+            "ttft": ttft,
+        }
+
+    def _invoke_model(
+        self,
+        node: str,
+        tier: str,
+        model: Any,
+        slo_seconds: float,
+        schema: Type[BaseModel],
+        messages: List,
+        ledger: Optional[UsageLedger] = None
+    ) -> BaseModel:
+        runnable = self.runtime.structured(model, schema)
+        # 저하 모드 (로컬 규칙 응답)는 제공자 장애 중에도 바로 응답하도록 동시성 제한 없이 호출
+        slot = self.runtime.slot(node) if tier != "degraded" else contextlib.nullcontext()
+        try:
+            with slot:
+                # 대기열 대기 / 재시도 백오프는 지연 EWMA에서 제외 (성공한 시도만 측정)
+                result, elapsed = self.runtime.call(node, runnable, messages)
+        except Exception:
+            with self._lock:
+                self.stats[tier]["errors"] += 1
+                # 실패도 지연 샘플로 기록 (SLO 판단에 반영)
+                self._latency[(node, tier)] = max(self._latency.get((node, tier), 0.0), slo_seconds * 2)
+                self._last_sample[(node, tier)] = time.time()
+            raise
+
+        usage = self._record(node, tier, elapsed, messages, result)
+        if ledger is not None:
+            ledger.record(node, LLM_TIERS.get(tier, {}).get("model", tier), tier, latency=elapsed, **usage)
+        if result.get("parsing_error") is not None or result.get("parsed") is None:
+            with self._lock:
+                self.stats[tier]["errors"] += 1
+            raise ValueError(f"구조화 출력 파싱 실패 ({node}/{tier}): {result.get('parsing_error')}")
+        return result["parsed"]
+
+    def _invoke_tier(
+        self,
+        node: str,
+        tier: str,
+        schema: Type[BaseModel],
+        messages: List,
+        ledger: Optional[UsageLedger] = None
+    ) -> BaseModel:
+        config = self.node_config(node)
+        model = self._model(tier, config)
+        return self._invoke_model(node, tier, model, config["slo_seconds"], schema, messages, ledger)
+
+    def invoke(
+        self,
+        node: str,
+        schema: Type[BaseModel],
+        messages: List,
+        ledger: Optional[UsageLedger] = None
+    ) -> Tuple[BaseModel, str]:
+        """
+        노드 호출 (SLO 초과 시 대체 티어, 실패 시 대체 티어로 한 번 재시도,
+        그래도 실패하면 저하 모드 모델로 응답)
+
+        ledger가 주어지면 성공한 호출의 토큰/지연을 요청 사용량 장부에 기록
+
+        Returns:
+            (응답, 응답한 티어) - 기본 티어가 아닌 응답(대체 티어/"degraded")은 캐시/저장하지 않도록 호출자가 구분
+        """
+        tier = self.choose_tier(node)
+        primary = self.node_config(node)["tier"]
+        if tier != primary:
+            print(f"⚡ {node}: {primary} 티어 지연으로 {tier} 티어 사용")
+            with self._lock:
+                self.stats[tier]["fallbacks"] += 1
+
+        try:
+            return self._invoke_tier(node, tier, schema, messages, ledger), tier
+        except Exception as e:
+            error = e
+
+        fallback = LLM_TIER_FALLBACK.get(tier)
+        if fallback is not None:
+            print(f"⚠️ {node}: {tier} 티어 오류 ({type(error).__name__}) → {fallback} 티어 재시도")
+            with self._lock:
+                self.stats[fallback]["fallbacks"] += 1
+            try:
+                return self._invoke_tier(node, fallback, schema, messages, ledger), fallback
+            except Exception as e:
+                error = e
+
+        if self.degraded_model is None:
+            raise error
+        print(f"🛟 {node}: LLM 제공자 오류 ({type(error).__name__}) → 저하 모드 (규칙 기반 응답)")
+        with self._lock:
+            self.stats["degraded"]["fallbacks"] += 1
+        return self._invoke_model(node, "degraded", self.degraded_model, 0.0, schema, messages, ledger), "degraded"
+
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """티어별 호출 수 / 평균 지연 / 토큰 사용량 + 노드별 지연 EWMA & 프롬프트 템플릿 버전"""
+        with self._lock:
+            tiers = {
+                tier: {
+                    "model": LLM_TIERS.get(tier, {}).get("model", tier),
+                    "calls": stat["calls"],
+                    "errors": stat["errors"],
+                    "fallbacks": stat["fallbacks"],
+                    "avg_latency": round(stat["latency_total"] / stat["calls"], 3) if stat["calls"] else 0.0,
+                    "input_tokens": stat["input_tokens"],
+                    "cached_input_tokens": stat["cached_input_tokens"],
+                    "output_tokens": stat["output_tokens"],
+                }
+                for tier, stat in self.stats.items()
+            }
+            latency = {f"{node}/{tier}": round(value, 3) for (node, tier), value in self._latency.items()}
+            prompts = dict(self._prompts)
+        return {"tiers": tiers, "node_latency_ewma": latency, "prompts": prompts}
+
+
+# 싱글톤 인스턴스
+_llm_router = None
+
+def get_llm_router() -> LLMRouter:
+    """LLM 라우터 싱글톤 인스턴스 반환"""
+    global _llm_router
+    if _llm_router is None:
+        _llm_router = LLMRouter(
+            offline_backend if LLM_BACKEND == "offline" else None,
+            degraded_model=StubChatModel(offline_response, model="offline") if LLM_DEGRADED_MODE else None,
+        )
+    return _llm_router
+
+
+def set_llm_router(router: LLMRouter):
+    """라우터 교체 (스텁/오프라인 백엔드용)"""
+    global _llm_router
+    _llm_router = router
+
+
+if __name__ == "__main__":
+    from models import ArtistPersona
+
+    def respond(schema, messages):
+        return schema.model_construct()
+
+    def factory(model, temperature, timeout):
+        # 기본 티어는 느린 스텁, 대체 티어는 빠른 스텁 → SLO 초과 후 fast 티어로 전환
+        latency = 0.3 if model == LLM_TIERS["standard"]["model"] else 0.0
+        return StubChatModel(respond, latency=latency, model=model)
+
+    NODE_LLM_CONFIG["selection"] = {**NODE_LLM_CONFIG["selection"], "slo_seconds": 0.1}
+    router = LLMRouter(factory)
+    for _ in range(3):
+        router.invoke("selection", ArtistPersona, [])
+    print(json.dumps(router.report(), indent=2, ensure_ascii=False))
@@ -0,0 +1,252 @@
+"""
+LLM 런타임 - 모든 LLM 호출이 공유하는 실행 계층
+- 구조화 출력 러너블 (model.with_structured_output(schema)) 을 모델×스키마별로 한 번만 생성
+- keep-alive HTTP 클라이언트 하나를 모든 OpenAI 모델이 공유 (연결 재사용)
+- 전체/노드별 동시 호출 세마포어 (초과 호출은 대기열에서 대기, LLM_QUEUE_TIMEOUT_SECONDS 초과 시 오류)
+- 레이트 리밋(429) 응답은 지수 백오프로 재시도 (Retry-After 헤더 우선)
+- 연결 오류 / 타임아웃 / 5xx 응답도 지수 백오프로 재시도 (SDK 자체 재시도는 꺼 둠)
+노드별 대기 시간 / 재시도 통계는 GET /llm-runtime
+"""
+from typing import Any, Dict, List, Optional, Tuple, Type
+from collections import defaultdict
+from contextlib import contextmanager
+import random
+import threading
+import time
+
+import httpx
+import openai
+from pydantic import BaseModel
+
+from config import (
+    LLM_MAX_CONCURRENCY,
+    LLM_NODE_CONCURRENCY,
+    LLM_QUEUE_TIMEOUT_SECONDS,
+    LLM_RATE_LIMIT_RETRIES,
+    LLM_RATE_LIMIT_BACKOFF_SECONDS,
+    LLM_RATE_LIMIT_MAX_BACKOFF_SECONDS,
+    LLM_TRANSIENT_RETRIES,
+    LLM_HTTP_MAX_CONNECTIONS,
+    LLM_HTTP_KEEPALIVE_SECONDS,
+)
+
+
+class LLMQueueTimeout(TimeoutError):
+    """동시 호출 대기열에서 제한 시간 안에 슬롯을 얻지 못함"""
+
+
+def is_rate_limit(error: Exception) -> bool:
+    """레이트 리밋 오류 여부 (openai.RateLimitError 또는 HTTP 429)"""
+    return isinstance(error, openai.RateLimitError) or getattr(error, "status_code", None) == 429
+
+
+def is_transient(error: Exception) -> bool:
+    """일시적 오류 여부 (연결 오류/타임아웃, 서버 오류 5xx)"""
+    if isinstance(error, (openai.APIConnectionError, openai.InternalServerError, httpx.TransportError)):
+        return True
+    status_code = getattr(error, "status_code", None)
+    return isinstance(status_code, int) and status_code >= 500
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Retry-After 헤더 (초, 없으면 None)"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMRuntime:
+    """러너블 캐시 + 공유 HTTP 클라이언트 + 동시성 제한 + 레이트 리밋 재시도 (스레드 안전)"""
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        node_concurrency: Optional[Dict[str, int]] = None,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT_SECONDS
+    ):
+        self.max_concurrency = max_concurrency
+        self.node_concurrency = LLM_NODE_CONCURRENCY if node_concurrency is None else node_concurrency
+        self.queue_timeout = queue_timeout
+        self._global_slots = threading.BoundedSemaphore(max_concurrency)
+        self._node_slots = {
+            node: threading.BoundedSemaphore(limit) for node, limit in self.node_concurrency.items()
+        }
+        self._runnables: Dict[Tuple[int, Type[BaseModel]], Tuple[Any, Any]] = {}
+        self._http_client: Optional[httpx.Client] = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.stats: Dict[str, Dict[str, float]] = defaultdict(lambda: {
+            "calls": 0, "queued": 0, "wait_total": 0.0, "wait_max": 0.0,
+            "rate_limited": 0, "transient_errors": 0, "retries": 0, "queue_timeouts": 0,
+        })
+
+    # --- 공유 자원 ---
+
+    @property
+    def http_client(self) -> httpx.Client:
+        """공유 keep-alive HTTP 클라이언트 (처음 사용할 때 생성)"""
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = httpx.Client(limits=httpx.Limits(
+                    max_connections=LLM_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=LLM_HTTP_MAX_CONNECTIONS,
+                    keepalive_expiry=LLM_HTTP_KEEPALIVE_SECONDS,
+                ))
+            return self._http_client
+
+    def structured(self, model: Any, schema: Type[BaseModel]):
+        """모델 × 스키마별 구조화 출력 러너블 (include_raw=True, 한 번만 생성)"""
+        key = (id(model), schema)
+        with self._lock:
+            if key not in self._runnables:
+                # 모델 참조를 함께 보관해 id가 재사용되지 않도록 함
+                self._runnables[key] = (model, model.with_structured_output(schema, include_raw=True))
+            return self._runnables[key][1]
+
+    # --- 동시성 제한 ---
+
+    @contextmanager
+    def slot(self, node: str):
+        """
+        노드 → 전체 순으로 동시 호출 슬롯 확보 (대기 시간 기록)
+        노드 슬롯을 먼저 잡아 전체 슬롯을 대기 중인 호출이 점유하지 않도록 함
+        """
+        started = time.perf_counter()
+        deadline = started + self.queue_timeout
+        node_slot = self._node_slots.get(node)
+        if node_slot is not None and not node_slot.acquire(timeout=self.queue_timeout):
+            self._queue_timeout(node)
+        if not self._global_slots.acquire(timeout=max(0.0, deadline - time.perf_counter())):
+            if node_slot is not None:
+                node_slot.release()
+            self._queue_timeout(node)
+
+        wait = time.perf_counter() - started
+        with self._lock:
+            stat = self.stats[node]
+            stat["calls"] += 1
+            stat["queued"] += wait >= 0.001
+            stat["wait_total"] += wait
+            stat["wait_max"] = max(stat["wait_max"], wait)
+            self.in_flight += 1
+        if wait >= 1.0:
+            print(f"⏳ {node}: LLM 대기열 {wait:.2f}s 대기")
+        try:
+            yield wait
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._global_slots.release()
+            if node_slot is not None:
+                node_slot.release()
+
+    def _queue_timeout(self, node: str):
+        with self._lock:
+            self.stats[node]["queue_timeouts"] += 1
+        raise LLMQueueTimeout(f"LLM 대기열 제한 시간 초과 ({node}, {self.queue_timeout}s)")
+
+    # --- 호출 ---
+
+    def call(self, node: str, runnable: Any, messages: List) -> Tuple[Any, float]:
+        """
+        러너블 호출 (지수 백오프 + 지터로 재시도)
+        - 레이트 리밋: 최대 LLM_RATE_LIMIT_RETRIES회 (Retry-After 헤더 우선)
+        - 연결 오류/타임아웃/5xx: 최대 LLM_TRANSIENT_RETRIES회
+
+        Returns:
+            (응답, 성공한 시도의 소요 시간 - 백오프 대기 제외)
+        """
+        attempts = {"rate_limit": 0, "transient": 0}
+        while True:
+            started = time.perf_counter()
+            try:
+                return runnable.invoke(messages), time.perf_counter() - started
+            except Exception as e:
+                if is_rate_limit(e):
+                    kind, limit, label = "rate_limit", LLM_RATE_LIMIT_RETRIES, "레이트 리밋"
+                elif is_transient(e):
+                    kind, limit, label = "transient", LLM_TRANSIENT_RETRIES, f"일시적 오류 ({type(e).__name__})"
+                else:
+                    raise
+                attempt = attempts[kind]
+                if attempt >= limit:
+                    raise
+                attempts[kind] += 1
+                delay = (_retry_after(e) if kind == "rate_limit" else None) or LLM_RATE_LIMIT_BACKOFF_SECONDS * 2 ** attempt
+                delay = min(delay, LLM_RATE_LIMIT_MAX_BACKOFF_SECONDS) * random.uniform(1.0, 1.25)
+                with self._lock:
+                    stat = self.stats[node]
+                    stat["rate_limited" if kind == "rate_limit" else "transient_errors"] += attempt == 0
+                    stat["retries"] += 1
+                print(f"🚦 {node}: {label} → {delay:.1f}s 후 재시도 ({attempt + 1}/{limit})")
+                time.sleep(delay)
+
+    def report(self) -> Dict:
+        """노드별 호출 수 / 대기 횟수 / 평균·최대 대기 시간 / 레이트 리밋·일시적 오류 재시도"""
+        with self._lock:
+            nodes = {
+                node: {
+                    "calls": stat["calls"],
+                    "queued": stat["queued"],
+                    "avg_wait": round(stat["wait_total"] / stat["calls"], 3) if stat["calls"] else 0.0,
+                    "max_wait": round(stat["wait_max"], 3),
+                    "rate_limited": stat["rate_limited"],
+                    "transient_errors": stat["transient_errors"],
+                    "retries": stat["retries"],
+                    "queue_timeouts": stat["queue_timeouts"],
+                }
+                for node, stat in self.stats.items()
+            }
+            in_flight = self.in_flight
+        return {
+            "max_concurrency": self.max_concurrency,
+            "node_concurrency": dict(self.node_concurrency),
+            "in_flight": in_flight,
+            "runnables": len(self._runnables),
+            "nodes": nodes,
+        }
+
+
+# 싱글톤 인스턴스
+_llm_runtime = None
+
+def get_llm_runtime() -> LLMRuntime:
+    """LLM 런타임 싱글톤 인스턴스 반환"""
+    global _llm_runtime
+    if _llm_runtime is None:
+        _llm_runtime = LLMRuntime()
+    return _llm_runtime
+
+
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    class _RateLimited(Exception):
+        status_code = 429
+
+    class _FlakyRunnable:
+        """처음 한 번은 429, 다음 한 번은 연결 오류, 이후 0.2초 걸려 응답"""
+
+        def __init__(self):
+            self.errors = [_RateLimited(), httpx.ConnectError("connection reset")]
+
+        def invoke(self, messages):
+            if self.errors:
+                raise self.errors.pop(0)
+            time.sleep(0.2)
+            return messages
+
+    runtime = LLMRuntime(max_concurrency=2, node_concurrency={"selection": 1})
+    runnable = _FlakyRunnable()
+
+    def run(node):
+        with runtime.slot(node):
+            return runtime.call(node, runnable, [node])[1]
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        elapsed = list(executor.map(run, ["selection"] * 3 + ["generate_reason"] * 3))
+    print(f"시도별 소요 시간 (백오프 제외): {[round(e, 2) for e in elapsed]}")
+    print(runtime.report())
@@ -0,0 +1,390 @@
+"""
+로컬 검색 엔진 - 수집 카탈로그에 대한 역색인 + BM25 랭킹
+search_query_generator가 만드는 Spotify 필터 문법(genre:, year:, artist:, track:, OR, 괄호)을
+그대로 해석하여 SpotifyClient.search_tracks / parallel_search 대체 백엔드로 사용
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from collections import defaultdict
+from dataclasses import dataclass, field
+import math
+import re
+import threading
+import unicodedata
+
+from config import BM25_K1, BM25_B
+from models import SpotifyTrack
+from track_store import TrackStore, get_track_store
+from catalog_snapshot import TrackView
+from track_utils import parse_release_date
+
+
+# === 쿼리 파싱 ===
+
+FILTER_FIELDS = {"genre", "year", "artist", "track", "album"}
+
+_TOKEN_PATTERN = re.compile(r'\(|\)|[A-Za-z]+:"[^"]*"|[A-Za-z]+:[^\s()"]+|"[^"]*"|[^\s()]+')
+
+
+@dataclass
+class QueryNode:
+    """쿼리 구문 트리 노드 (and / or / term)"""
+    op: str
+    field_name: Optional[str] = None
+    value: str = ""
+    children: List["QueryNode"] = field(default_factory=list)
+
+
+def normalize_text(text: str) -> str:
+    """검색용 정규화 (NFKC + 소문자)"""
+    return unicodedata.normalize("NFKC", text).lower().strip()
+
+
+def tokenize(text: str) -> List[str]:
+    """단어 토큰 분리 (한글/영문/숫자)"""
+    return re.findall(r"\w+", normalize_text(text))
+
+
+def normalize_genre(genre: str) -> str:
+    """장르 표기 통일 (hip-hop / hip hop / Hip_Hop → hip hop)"""
+    return " ".join(re.split(r"[\s\-_]+", normalize_text(genre).strip('"')))
+
+
+def parse_query(query: str) -> QueryNode:
+    """
+    Spotify 검색 쿼리 파싱
+
+    지원 문법: field:value, field:"quoted value", 자유 텍스트, OR, 괄호, q= 접두사
+    """
+    query = query.strip().strip('"')
+    if query.startswith("q="):
+        query = query[2:]
+
+    tokens = _TOKEN_PATTERN.findall(query)
+    position = 0
+
+    def parse_or() -> QueryNode:
+        nonlocal position
+        branches = [parse_and()]
+        while position < len(tokens) and tokens[position] == "OR":
+            position += 1
+            branches.append(parse_and())
+        return branches[0] if len(branches) == 1 else QueryNode(op="or", children=branches)
+
+    def parse_and() -> QueryNode:
+        nonlocal position
+        terms = []
+        while position < len(tokens) and tokens[position] not in ("OR", ")"):
+            token = tokens[position]
+            position += 1
+            if token == "(":
+                terms.append(parse_or())
+                if position < len(tokens) and tokens[position] == ")":
+                    position += 1
+            else:
+                terms.append(_parse_term(token))
+        return terms[0] if len(terms) == 1 else QueryNode(op="and", children=terms)
+
+    root = parse_or() if tokens else QueryNode(op="and")
+    while position < len(tokens):
+        # 짝이 맞지 않는 닫는 괄호는 무시하고 이어서 파싱
+        position += 1
+        root = QueryNode(op="and", children=[root, parse_or()])
+    return root
+
+
+def _parse_term(token: str) -> QueryNode:
+    name, sep, value = token.partition(":")
+    if sep and name.lower() in FILTER_FIELDS:
+        return QueryNode(op="term", field_name=name.lower(), value=value.strip('"'))
+    return QueryNode(op="term", value=token.strip('"'))
+
+
+def parse_year_range(value: str) -> Optional[Tuple[int, int]]:
+    """year: 값 파싱 (2023 또는 2021-2025)"""
+    match = re.fullmatch(r"(\d{4})(?:-(\d{4}))?", value.strip())
+    if not match:
+        return None
+    start = int(match.group(1))
+    end = int(match.group(2) or start)
+    return (min(start, end), max(start, end))
+
+
+def extract_genres(query: str) -> List[str]:
+    """쿼리에 포함된 genre: 필터 값 목록"""
+    genres = []
+
+    def visit(node: QueryNode):
+        if node.op == "term" and node.field_name == "genre":
+            genres.append(node.value)
+        for child in node.children:
+            visit(child)
+
+    visit(parse_query(query))
+    return genres
+
+
+# === 역색인 ===
+
+class LocalSearchIndex:
+    """
+    제목/아티스트/앨범 토큰 역색인 + 장르/연도 색인
+
+    색인에는 트랙 ID와 길이/인기도만 두고, 결과 트랙은 반환할 때 TrackStore에서 조회
+    (스냅샷 행은 TrackView로 색인 → 워커마다 카탈로그 전체를 SpotifyTrack으로 만들지 않음)
+    """
+
+    def __init__(self, store: TrackStore):
+        self.store = store
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)  # 토큰 → {트랙ID: tf}
+        self.field_postings: Dict[str, Dict[str, Set[str]]] = {
+            "track": defaultdict(set),
+            "artist": defaultdict(set),
+            "album": defaultdict(set),
+        }
+        self.genre_index: Dict[str, Set[str]] = defaultdict(set)
+        self.year_index: Dict[int, Set[str]] = defaultdict(set)
+        self.doc_lengths: Dict[str, int] = {}
+        self.popularity: Dict[str, int] = {}  # 동점 정렬용
+        self.total_length = 0
+        # 스냅샷에 없는 트랙만 제거용 토큰 보관 (LRU에서 밀려날 수 있는 트랙 - 최대 TRACK_STORE_MAX_TRACKS곡)
+        self._removable: Dict[str, Tuple[Dict[str, List[str]], Optional[int]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _fields(name: str, artist_names: str, album_name: str) -> Dict[str, List[str]]:
+        return {
+            "track": tokenize(name),
+            "artist": tokenize(artist_names),
+            "album": tokenize(album_name),
+        }
+
+    def _index(
+        self,
+        track_id: str,
+        fields: Dict[str, List[str]],
+        release_date: str,
+        popularity: int,
+        removable: bool
+    ):
+        """토큰/연도 색인 (호출자가 잠금 보유)"""
+        tokens = []
+        for name, field_tokens in fields.items():
+            for token in field_tokens:
+                self.field_postings[name][token].add(track_id)
+            tokens.extend(field_tokens)
+
+        for token in tokens:
+            self.postings[token][track_id] = self.postings[token].get(track_id, 0) + 1
+        self.doc_lengths[track_id] = len(tokens)
+        self.popularity[track_id] = popularity
+        self.total_length += len(tokens)
+
+        parsed = parse_release_date(release_date)
+        year = parsed.year if parsed else None
+        if year is not None:
+            self.year_index[year].add(track_id)
+        if removable:
+            self._removable[track_id] = (fields, year)
+
+    def add_track(self, track: SpotifyTrack):
+        """트랙 색인 (이미 색인된 트랙은 무시) - TrackStore 구독용"""
+        fields = self._fields(track.name, track.get_artist_names(), track.album_name)
+        snapshot = self.store.snapshot
+        removable = snapshot is None or snapshot.find(track.id) is None
+        with self._lock:
+            if track.id in self.doc_lengths:
+                return
+            self._index(track.id, fields, track.release_date, track.popularity, removable)
+
+    def add_view(self, view: TrackView):
+        """스냅샷 행 색인 (SpotifyTrack 생성 없이 필요한 문자열만 디코딩)"""
+        fields = self._fields(view.name, view.artist_names, view.album_name)
+        track_id = view.id
+        with self._lock:
+            if track_id in self.doc_lengths:
+                return
+            self._index(track_id, fields, view.release_date, view.popularity, removable=False)
+            for genre in view.genres:
+                self.genre_index[normalize_genre(genre)].add(track_id)
+
+    def remove_track(self, track_id: str):
+        """트랙 색인 제거 (TrackStore LRU에서 밀려나 카탈로그에서 사라진 트랙)"""
+        with self._lock:
+            entry = self._removable.pop(track_id, None)
+            if entry is None:
+                return
+            fields, year = entry
+
+            for name, field_tokens in fields.items():
+                for token in field_tokens:
+                    postings = self.field_postings[name].get(token)
+                    if postings is not None:
+                        postings.discard(track_id)
+                        if not postings:
+                            del self.field_postings[name][token]
+                    if token in self.postings:
+                        self.postings[token].pop(track_id, None)
+                        if not self.postings[token]:
+                            del self.postings[token]
+            self.total_length -= self.doc_lengths.pop(track_id, 0)
+            self.popularity.pop(track_id, None)
+
+            if year is not None and year in self.year_index:
+                self.year_index[year].discard(track_id)
+                if not self.year_index[year]:
+                    del self.year_index[year]
+            for genre in [g for g, ids in self.genre_index.items() if track_id in ids]:
+                self.genre_index[genre].discard(track_id)
+                if not self.genre_index[genre]:
+                    del self.genre_index[genre]
+
+    def add_genres(self, track_id: str, genres: Iterable[str]):
+        """트랙 장르 태그 색인"""
+        with self._lock:
+            for genre in genres:
+                self.genre_index[normalize_genre(genre)].add(track_id)
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    # --- 검색 ---
+
+    def _match_term(self, node: QueryNode) -> Set[str]:
+        if node.field_name == "genre":
+            return set(self.genre_index.get(normalize_genre(node.value), ()))
+
+        if node.field_name == "year":
+            year_range = parse_year_range(node.value)
+            if year_range is None:
+                return set()
+            matched = set()
+            for year in range(year_range[0], year_range[1] + 1):
+                matched |= self.year_index.get(year, set())
+            return matched
+
+        tokens = tokenize(node.value)
+        if not tokens:
+            return set(self.doc_lengths)
+
+        if node.field_name in self.field_postings:
+            postings = self.field_postings[node.field_name]
+            sets = [postings.get(token, set()) for token in tokens]
+        else:
+            sets = [set(self.postings.get(token, {})) for token in tokens]
+        return set.intersection(*sets)
+
+    def _evaluate(self, node: QueryNode) -> Set[str]:
+        if node.op == "term":
+            return self._match_term(node)
+        if not node.children:
+            return set(self.doc_lengths)
+        results = [self._evaluate(child) for child in node.children]
+        if node.op == "or":
+            return set.union(*results)
+        return set.intersection(*results)
+
+    def _text_terms(self, node: QueryNode) -> List[str]:
+        """BM25 점수 계산에 쓰는 텍스트 토큰 (genre/year 필터 제외)"""
+        if node.op == "term":
+            if node.field_name in ("genre", "year"):
+                return []
+            return tokenize(node.value)
+        terms = []
+        for child in node.children:
+            terms.extend(self._text_terms(child))
+        return terms
+
+    def _bm25(self, track_id: str, terms: List[str]) -> float:
+        document_count = len(self.doc_lengths)
+        average_length = self.total_length / document_count if document_count else 0
+        length = self.doc_lengths.get(track_id, 0)
+        score = 0.0
+
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings or track_id not in postings:
+                continue
+            frequency = postings[track_id]
+            idf = math.log(1 + (document_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (average_length or 1))
+            score += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+        return score
+
+    def search(self, query: str, limit: int = 10) -> List[SpotifyTrack]:
+        """쿼리에 맞는 트랙을 BM25 (동점 시 인기도) 순으로 반환 (트랙은 TrackStore에서 조회)"""
+        root = parse_query(query)
+        with self._lock:
+            matched = self._evaluate(root)
+            terms = self._text_terms(root)
+            ranked = sorted(
+                matched,
+                key=lambda track_id: (
+                    -self._bm25(track_id, terms),
+                    -self.popularity.get(track_id, 0),
+                    track_id
+                )
+            )
+
+        tracks = []
+        for track_id in ranked:
+            track = self.store.get(track_id)
+            if track is not None:
+                tracks.append(track)
+                if len(tracks) >= limit:
+                    break
+        return tracks
+
+
+class LocalSearchEngine:
+    """TrackStore와 동기화되는 로컬 검색 백엔드 (SpotifyClient와 같은 검색 인터페이스)"""
+
+    def __init__(self, store: TrackStore):
+        self.index = LocalSearchIndex(store)
+        if store.snapshot is not None:
+            for view in store.snapshot:
+                self.index.add_view(view)
+        for track in store.memory_tracks():
+            self.index.add_track(track)
+            self.index.add_genres(track.id, store.genres_of(track.id))
+        store.subscribe(self.index)
+
+    def search_tracks(self, query: str, limit: int = 10) -> List[SpotifyTrack]:
+        """트랙 검색 (네트워크 없음)"""
+        return self.index.search(query, limit)
+
+    def parallel_search(
+        self,
+        queries: List[str],
+        limit_per_query: int = 10
+    ) -> List[SpotifyTrack]:
+        """여러 쿼리 검색 결과를 중복 없이 병합"""
+        all_tracks = []
+        seen_ids = set()
+        for query in queries:
+            for track in self.search_tracks(query, limit_per_query):
+                if track.id not in seen_ids:
+                    all_tracks.append(track)
+                    seen_ids.add(track.id)
+        return all_tracks
+
+
+# 싱글톤 인스턴스
+_local_search_engine = None
+
+def get_local_search_engine() -> LocalSearchEngine:
+    """로컬 검색 엔진 싱글톤 인스턴스 반환"""
+    global _local_search_engine
+    if _local_search_engine is None:
+        _local_search_engine = LocalSearchEngine(get_track_store())
+    return _local_search_engine
+
+
+if __name__ == "__main__":
+    for q in [
+        'q=genre:lo-fi year:2023-2025',
+        '(artist:"Stray Kids" OR artist:ATEEZ) year:2021-2025',
+        'artist:IU genre:k-pop year:2021-2025',
+        'track:"Spring Day" BTS',
+    ]:
+        print(q, "→", parse_query(q))
@@ -0,0 +1,234 @@
+"""
+로컬 Spotify 대체 클라이언트 - SpotifyClient와 같은 인터페이스를 TrackStore + 로컬 검색으로 구현
+(SPOTIFY_BACKEND="local", 네트워크 없음)
+
+카탈로그가 비어 있으면 장르/아티스트 분포를 갖춘 합성 트랙을 결정적으로 생성
+(오프라인 LLM 백엔드와 함께 부하 테스트/프로파일링용)
+"""
+from typing import Dict, List, Optional, Set, Tuple
+from collections import defaultdict
+from datetime import datetime, timedelta
+import hashlib
+import random
+import threading
+import time
+
+from config import (
+    AVAILABLE_GENRES,
+    KOREAN_GENRE_MAP,
+    CANDIDATE_TRACKS_COUNT,
+    LOCAL_SPOTIFY_LATENCY_SECONDS,
+    LOCAL_SPOTIFY_SYNTHETIC_TRACKS,
+)
+from models import SpotifyTrack, SpotifyArtist
+from track_utils import song_fingerprint, parse_release_date
+from track_store import get_track_store
+from local_search import get_local_search_engine
+from artist_directory import get_artist_directory
+from artist_graph import get_artist_graph
+
+
+# 합성 카탈로그에 포함할 실제 아티스트 (샘플 선호 아티스트 해석용)
+_SEED_ARTISTS = {
+    "k-pop": ["IU", "AKMU", "BTS", "NewJeans", "TWICE"],
+    "k-hip-hop": ["Stray Kids", "ATEEZ"],
+    "indie pop": ["Lauv", "Jeremy Zucker"],
+}
+_KOREAN_WORDS = ["밤", "바람", "우리", "여름", "별", "기억", "노을", "하루", "너의", "봄날", "그대", "꿈"]
+_ENGLISH_WORDS = ["Night", "Wave", "Golden", "Echo", "Light", "Blue", "Dream", "Runaway", "Summer", "Static", "Home", "Fade"]
+
+
+def _synthetic_id(*parts) -> str:
+    return hashlib.sha1("|".join(map(str, parts)).encode("utf-8")).hexdigest()[:22]
+
+
+def synthetic_catalog(count: int, seed: int = 42) -> List[Tuple[SpotifyTrack, str]]:
+    """
+    합성 트랙 생성 (결정적)
+
+    장르마다 아티스트 4명(+ 시드 아티스트), 한국 장르는 한글 제목
+    발매 연도/인기도는 신곡/인기도 쿼터를 채울 수 있도록 고르게 분포
+
+    Returns:
+        (트랙, 장르) 리스트
+    """
+    rng = random.Random(seed)
+    genres = list(dict.fromkeys(AVAILABLE_GENRES + list(KOREAN_GENRE_MAP.values())))
+    artists: Dict[str, List[SpotifyArtist]] = defaultdict(list)
+    for genre in genres:
+        names = _SEED_ARTISTS.get(genre, []) + [f"{genre.title()} Collective {i}" for i in range(1, 5)]
+        for name in names:
+            artists[genre].append(SpotifyArtist(id=_synthetic_id("artist", name), name=name, genres=[genre]))
+
+    this_year = datetime.now().year
+    catalog = []
+    for i in range(count):
+        genre = genres[i % len(genres)]
+        artist = rng.choice(artists[genre])
+        korean = genre.startswith("k-")
+        words = _KOREAN_WORDS if korean else _ENGLISH_WORDS
+        name = " ".join(rng.sample(words, 2))
+        track_id = _synthetic_id("track", i, name)
+        track = SpotifyTrack(
+            id=track_id,
+            name=name,
+            artists=[artist],
+            album_name=f"{name} (Single)",
+            release_date=f"{rng.randint(this_year - 15, this_year)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            duration_ms=rng.randint(150, 280) * 1000,
+            popularity=rng.randint(10, 99),
+            external_url=f"https://open.spotify.com/track/{track_id}",
+        )
+        track.fingerprint = song_fingerprint(track)
+        catalog.append((track, genre))
+    return catalog
+
+
+class LocalSpotifyClient:
+    """SpotifyClient 대체 (TrackStore + 로컬 BM25 검색, 네트워크 없음)"""
+
+    def __init__(
+        self,
+        synthetic_tracks: int = LOCAL_SPOTIFY_SYNTHETIC_TRACKS,
+        latency: float = LOCAL_SPOTIFY_LATENCY_SECONDS
+    ):
+        self.latency = latency
+        self.track_store = get_track_store()
+        self.local_search = get_local_search_engine()
+        self.artist_directory = get_artist_directory()
+        self.track_store.subscribe(self.artist_directory)
+        self.artist_graph = get_artist_graph()
+        self.track_store.subscribe(self.artist_graph)
+
+        if len(self.track_store) == 0 and synthetic_tracks:
+            for track, genre in synthetic_catalog(synthetic_tracks):
+                self.track_store.add(track, [genre])
+            print(f"✓ 로컬 합성 카탈로그 {synthetic_tracks}곡 생성")
+
+        # 아티스트 ID → 트랙 ID (트랙 본문은 TrackStore에서 조회)
+        self._artist_tracks: Dict[str, Set[str]] = defaultdict(set)
+        # 스냅샷에 없는 트랙만 제거용 아티스트 ID 보관 (LRU에서 밀려날 수 있는 트랙)
+        self._removable: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+        snapshot = self.track_store.snapshot
+        if snapshot is not None:
+            for view in snapshot:
+                self._index(view.id, view.artist_ids, removable=False)
+        for track in self.track_store.memory_tracks():
+            self.add_track(track)
+        self.track_store.subscribe(self)
+
+    # --- TrackStore 구독 (아티스트별 트랙 색인) ---
+
+    def _index(self, track_id: str, artist_ids: List[str], removable: bool):
+        with self._lock:
+            for artist_id in artist_ids:
+                self._artist_tracks[artist_id].add(track_id)
+            if removable:
+                self._removable[track_id] = artist_ids
+
+    def add_track(self, track: SpotifyTrack):
+        snapshot = self.track_store.snapshot
+        removable = snapshot is None or snapshot.find(track.id) is None
+        self._index(track.id, [artist.id for artist in track.artists], removable)
+
+    def add_genres(self, track_id: str, genres):
+        pass
+
+    def remove_track(self, track_id: str):
+        """LRU에서 밀려나 카탈로그에서 사라진 트랙 제거"""
+        with self._lock:
+            for artist_id in self._removable.pop(track_id, ()):
+                track_ids = self._artist_tracks.get(artist_id)
+                if track_ids is None:
+                    continue
+                track_ids.discard(track_id)
+                if not track_ids:
+                    del self._artist_tracks[artist_id]
+
+    def _tracks_of(self, artist_id: Optional[str]) -> List[SpotifyTrack]:
+        """아티스트의 트랙 (TrackStore에서 조회)"""
+        if not artist_id:
+            return []
+        with self._lock:
+            track_ids = sorted(self._artist_tracks.get(artist_id, ()))
+        tracks = (self.track_store.get(track_id) for track_id in track_ids)
+        return [track for track in tracks if track is not None]
+
+    # --- SpotifyClient 인터페이스 ---
+
+    def _wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def search_tracks(self, query: str, limit: int = 10, use_local: bool = True) -> List[SpotifyTrack]:
+        # 합성 카탈로그가 곧 "Spotify"이므로 use_local과 무관하게 같은 결과
+        self._wait()
+        return self.local_search.search_tracks(query, limit)
+
+    def resolve_artist_id(self, artist_name: str) -> Optional[str]:
+        return self.artist_directory.resolve(artist_name)
+
+    def search_artist_tracks(
+        self,
+        artist_name: str,
+        limit: int = 10,
+        artist_id: Optional[str] = None
+    ) -> List[SpotifyTrack]:
+        """아티스트 인기 트랙 (인기도 순)"""
+        self._wait()
+        artist_id = artist_id or self.resolve_artist_id(artist_name)
+        return sorted(self._tracks_of(artist_id), key=lambda t: -t.popularity)[:limit]
+
+    def get_artist_recent_tracks(
+        self,
+        artist_name: str,
+        months: int = 48,
+        artist_id: Optional[str] = None
+    ) -> List[SpotifyTrack]:
+        """아티스트 최신 트랙 (기간 내, 최신순 10곡)"""
+        self._wait()
+        artist_id = artist_id or self.resolve_artist_id(artist_name)
+        cutoff_date = datetime.now() - timedelta(days=months * 30)
+        recent = []
+        for track in self._tracks_of(artist_id):
+            release_date = parse_release_date(track.release_date)
+            if release_date and release_date >= cutoff_date:
+                recent.append((release_date, track))
+        recent.sort(key=lambda item: item[0], reverse=True)
+        return [track for _, track in recent[:10]]
+
+    def parallel_search(
+        self,
+        queries: List[str],
+        limit_per_query: int = 10,
+        scorer=None
+    ) -> List[SpotifyTrack]:
+        """여러 쿼리 검색 (scorer가 있으면 도착 순으로 채점해 상위 k곡 반환)"""
+        all_tracks = []
+        seen_ids = set()
+        for query in queries:
+            for track in self.search_tracks(query, limit_per_query):
+                if track.id in seen_ids:
+                    continue
+                seen_ids.add(track.id)
+                if scorer is not None:
+                    scorer.push(track)
+                else:
+                    all_tracks.append(track)
+
+        if scorer is not None:
+            return scorer.result()
+        return all_tracks[:CANDIDATE_TRACKS_COUNT]
+
+    def get_track_by_id(self, track_id: str) -> Optional[SpotifyTrack]:
+        return self.track_store.get(track_id)
+
+
+if __name__ == "__main__":
+    client = LocalSpotifyClient()
+    for query in ['genre:"k-pop" year:2022-2025', 'genre:"lo-fi"']:
+        tracks = client.search_tracks(query, 5)
+        print(f"{query} → {[f'{t.name} - {t.get_artist_names()}' for t in tracks]}")
+    print("IU 최신곡:", [t.name for t in client.get_artist_recent_tracks("IU")])
@@ -2,7 +2,7 @@
 데이터 모델 - 우선순위 기반 시스템
 AI 추천 장르 필드 추가
 """
-from typing import List, Optional, TypedDict
+from typing import Any, Dict, List, Optional, TypedDict
 from pydantic import BaseModel, Field
 
 
@@ -22,6 +22,7 @@ class SpotifyTrack(BaseModel):
     popularity: int
     preview_url: Optional[str] = None
     external_url: str
+    fingerprint: Optional[str] = None  # 곡 동일성 핑거프린트 (수집 시 계산)
     
     def get_artist_names(self) -> str:
         return ", ".join([artist.name for artist in self.artists])
@@ -34,6 +35,12 @@ class ArtistPersona(BaseModel):
     similar_artists: List[str] = Field(description="유사 아티스트")
     summary: str = Field(description="종합 분석")
 
+class ContextGenreProfile(BaseModel):
+    """상황 조합별 장르 프로필 (사용자 취향 반영 전)"""
+    genres: List[str] = Field(description="상황에 맞는 장르 8개 (적합도 순)")
+    avoid_genres: List[str] = Field(description="상황에 맞지 않는 장르")
+    reasoning: str = Field(description="소음도/목표/위치 기반 추천 이유 (2-3문장)")
+
 class SearchQuery(BaseModel):
     query: str = Field(description="Spotify 검색 쿼리")
     rationale: str = Field(description="검색 의도")
@@ -82,6 +89,9 @@ class AgentState(TypedDict):
     decibel: str
     preferred_artists: List[str]
     preferred_genres: List[str]
+    preferred_artist_ids: Optional[Dict[str, str]]  # 🆕 선호 아티스트명 → Spotify 아티스트 ID
+    user_id: Optional[str]  # 🆕 최근 추천 곡 제외용 사용자 ID
+    node_modes: Optional[Dict[str, str]]  # 🆕 요청별 노드 실행 방식 (NODE_MODES 덮어쓰기)
     
     # 분석 결과
     artist_persona: Optional[ArtistPersona]
@@ -101,7 +111,9 @@ class AgentState(TypedDict):
     # 순환 제어
     iteration_count: int
     validation_feedback: Optional[str]
+    validation_codes: Optional[List[str]]  # 🆕 기계 판독용 부족분 코드 (예: "korean:+2")
     quality_validation: Optional[QualityValidation]
+    usage_ledger: Optional[Any]  # 🆕 요청 LLM 사용량 장부 (UsageLedger)
 
 
 # === API 요청/응답 모델 ===
@@ -128,6 +140,15 @@ class RecommendationRequest(BaseModel):
         default=[],
         max_length=5
     )
+    user_id: Optional[str] = Field(
+        description="사용자 ID (최근 추천 곡 제외용, 선택)",
+        default=None,
+        max_length=128
+    )
+    node_modes: Optional[Dict[str, str]] = Field(
+        description="노드별 실행 방식 (예: {\"context_analysis\": \"rule\"}, 선택)",
+        default=None
+    )
 
 class TrackRecommendation(BaseModel):
     track_id: str
@@ -145,6 +166,8 @@ class RecommendationResponse(BaseModel):
     ai_recommended_genres: List[str] = Field(description="AI 추천 장르")  # 🆕
     iteration_count: int = Field(description="반복 횟수")
     quality_scores: dict = Field(description="품질 지표")
+    llm_usage: Optional[dict] = Field(default=None, description="노드별 LLM 토큰/지연/비용")  # 🆕
+    degraded: bool = Field(default=False, description="LLM 제공자 장애로 일부 노드가 규칙 기반 저하 모드로 응답")  # 🆕
 
 
 if __name__ == "__main__":
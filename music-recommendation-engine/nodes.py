@@ -7,27 +7,30 @@ LangGraph 노드 통합 최종 버전
 - 인기도 분포 (높음4, 중간4, 낮음2)
 - 신곡 4년 기준 (2021-2025)
 """
-from typing import List
-from datetime import datetime, timedelta
-import re
-from langchain_openai import ChatOpenAI
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import time
 from langchain_core.messages import SystemMessage, HumanMessage
 from pydantic import BaseModel, Field
 
 from config import (
-    OPENAI_MODEL,
     QUALITY_THRESHOLDS,
     MAX_ITERATIONS,
-    DECIBEL_MUSIC_PROFILES,
-    GOAL_MUSIC_PROFILES,
-    LOCATION_MODIFIERS,
     PREFERRED_ARTIST_TRACK_RATIO,
     KOREAN_TRACK_RATIO,
     RECENT_TRACK_RATIO,
-    RECENT_YEARS,
-    SPAM_KEYWORDS,
-    KOREAN_INDICATORS,
     POPULARITY_DISTRIBUTION,
+    CANDIDATE_TRACKS_COUNT,
+    GENRE_POOL_ENABLED,
+    ARTIST_GRAPH_HOPS,
+    ARTIST_GRAPH_EXPANSION_ARTISTS,
+    ARTIST_GRAPH_TRACKS_PER_ARTIST,
+    NODE_MODES,
+    NODE_LLM_TIMEOUT_SECONDS,
+    SELECTION_PRERANK_PER_BUCKET,
+    SELECTION_PRERANK_PREFERRED,
+    SELECTION_REPAIR_MIN_RESOLVED,
+    FINAL_RECOMMENDATIONS_COUNT,
 )
 from models import (
     AgentState,
@@ -38,70 +41,136 @@ from models import (
     QualityValidation,
     PopularityDistribution,  # 🔧 추가
     FinalRecommendations,
+    RecommendationReason,
     SpotifyTrack
 )
 from prompts import (
     ANALYZE_PREFERENCE_PROMPT,
     CONTEXT_ANALYSIS_PROMPT,
+    FUSED_ANALYSIS_PROMPT,
     SEARCH_QUERY_PROMPT,
     SELECTION_PROMPT,
     QUALITY_VALIDATOR_PROMPT,
     GENERATE_REASON_PROMPT,
     FEEDBACK_SEARCH_PROMPT,
-    format_tracks_for_prompt
+    render_context_profiles,
 )
 from spotify_client import get_spotify_client
+from genre_pools import get_genre_pools
+from artist_graph import get_artist_graph
+from artist_directory import get_artist_directory
+from track_store import get_track_store
+from candidate_scorer import CandidateScorer, ScoringContext, build_features, prerank_tracks
+from llm_cache import get_llm_cache
+from llm_router import get_llm_router
+from persona_store import get_persona_store, persona_key
+from context_table import get_context_table, blend_with_preferences
+from genre_rules import recommend_genres
+from query_compiler import compile_queries
+from quality_metrics import compute_quality_metrics, shortfall_codes, validate_metrics
+from track_selector import select_tracks
+from track_encoding import TrackEncoder, estimate_tokens
+from reason_cache import get_reason_cache, persona_cluster, reason_key, template_reason
+from usage_ledger import UsageLedger
+from output_repair import TrackResolver, get_repair_metrics, repair_selection
+from track_utils import (
+    dedupe_tracks,
+    is_spam_title,
+    is_korean_track,
+)
+
+def invoke_structured(
+    node: str,
+    schema,
+    messages: list,
+    ledger: Optional[UsageLedger] = None,
+    return_primary: bool = False
+):
+    """
+    구조화 출력 LLM 호출 (노드별 응답 캐시 적용)
+    
+    모델/온도/타임아웃은 NODE_LLM_CONFIG 기준으로 LLM 라우터가 결정
+    (LLM_DETERMINISTIC_NODES에 속한 노드는 temperature 0, 응답 캐시는 temperature 0 노드만)
+    ledger가 주어지면 호출 토큰/지연을 요청 사용량 장부에 기록 (캐시 적중은 토큰 0)
+    
+    캐시에는 기본 티어 응답만 저장 (대체 티어/저하 모드 응답이 제공자 복구 후에도 재사용되지 않도록)
+    return_primary=True면 (응답, 기본 티어 응답 여부) 반환 - 호출자의 영속화 여부 판단용
+    """
+    router = get_llm_router()
+    cache = get_llm_cache()
+    model_name, temperature = router.describe(node)
+    key = cache.make_key(model_name, temperature, schema, messages)
+    
+    cached = cache.get(node, key, schema, temperature)
+    if cached is not None:
+        print(f"⚡ LLM 캐시 적중 ({node})")
+        if ledger is not None:
+            ledger.record(node, model_name, "cache", 0, 0, 0.0, cached=True)
+        return (cached, True) if return_primary else cached
+    
+    started = time.perf_counter()
+    result, tier = router.invoke(node, schema, messages, ledger)
+    primary = router.is_primary(node, tier)
+    if primary:
+        cache.put(node, key, result, time.perf_counter() - started, temperature)
+    return (result, primary) if return_primary else result
 
-llm = ChatOpenAI(model=OPENAI_MODEL, temperature=0.7)
+
+_timeout_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="llm-timeout")
+
+
+def invoke_structured_with_timeout(
+    node: str,
+    schema,
+    messages: list,
+    timeout: float,
+    ledger: Optional[UsageLedger] = None
+):
+    """제한 시간이 있는 invoke_structured (초과 시 TimeoutError, 호출은 백그라운드에서 마저 진행되어 캐시에 저장)"""
+    future = _timeout_executor.submit(invoke_structured, node, schema, messages, ledger)
+    return future.result(timeout=timeout)
 
 
 # === 유틸리티 함수 ===
 
-def is_spam_title(title: str) -> bool:
-    """키워드 스팸 제목 판별"""
-    title_lower = title.lower()
-    
-    # 스팸 키워드 체크
-    for keyword in SPAM_KEYWORDS:
-        if keyword.lower() in title_lower:
-            return True
-    
-    # 숫자+시간 패턴 체크 (1시간, 2 hours 등)
-    if re.search(r'\d+\s*(시간|분|hour|min)', title_lower):
-        return True
-    
-    return False
+def usage_ledger(state: AgentState) -> Optional[UsageLedger]:
+    """요청 사용량 장부 (현재 품질 재시도 회차로 갱신해 반환)"""
+    ledger = state.get("usage_ledger")
+    if ledger is not None:
+        ledger.iteration = state.get("iteration_count", 0)
+    return ledger
 
 
-def is_korean_track(track: SpotifyTrack) -> bool:
-    """한국 노래 판별"""
-    # 1. 한글 포함 여부
-    if re.search(r'[가-힣]', track.name):
-        return True
-    
-    # 2. 한국 아티스트 키워드
-    artist_names = track.get_artist_names()
-    for indicator in KOREAN_INDICATORS:
-        if indicator in artist_names:
-            return True
-    
-    # 3. 아티스트 장르에 k-pop, k-indie 등 포함
-    for artist in track.artists:
-        for genre in artist.genres:
-            if 'k-pop' in genre.lower() or 'k-indie' in genre.lower() or 'korean' in genre.lower():
-                return True
-    
-    return False
+def node_mode(state: AgentState, node: str) -> str:
+    """노드 실행 방식 (요청별 node_modes → NODE_MODES 순, 기본 "llm")"""
+    return (state.get("node_modes") or {}).get(node) or NODE_MODES.get(node, "llm")
 
 
-def get_popularity_level(popularity: int) -> str:
-    """인기도 레벨 반환"""
-    if 80 <= popularity <= 100:
-        return "high"
-    elif 50 <= popularity < 80:
-        return "medium"
-    else:
-        return "low"
+def is_preferred_artist(artist, state: AgentState) -> bool:
+    """선호 아티스트 여부 (입력 이름 또는 해석된 아티스트 ID 기준)"""
+    preferred_ids = set((state.get("preferred_artist_ids") or {}).values())
+    return artist.id in preferred_ids or artist.name in state["preferred_artists"]
+
+
+def resolve_preferred_artist_ids(state: AgentState) -> Dict[str, str]:
+    """
+    자유 입력 선호 아티스트명 → Spotify 아티스트 ID (로컬 디렉터리 우선)
+    요청당 한 번만 해석해 state에 보관 (첫 검색의 스트리밍 채점부터 선호 아티스트 가산점 적용)
+    """
+    if state.get("preferred_artist_ids") is None:
+        spotify_client = get_spotify_client()
+        preferred_artist_ids = {}
+        for artist in state["preferred_artists"][:5]:
+            artist_id = spotify_client.resolve_artist_id(artist)
+            if artist_id:
+                preferred_artist_ids[artist] = artist_id
+        state["preferred_artist_ids"] = preferred_artist_ids
+    return state["preferred_artist_ids"]
+
+
+def _preferred_track_checker(state: AgentState):
+    """트랙 → 선호 아티스트 곡 여부 판별 함수"""
+    return lambda track: any(is_preferred_artist(a, state) for a in track.artists)
 
 
 # === 새로운 출력 모델: AI 추천 장르 ===
@@ -115,6 +184,12 @@ class AIGenreRecommendation(BaseModel):
     )
 
 
+class FusedAnalysis(BaseModel):
+    """선호 분석 + 상황 분석 통합 출력"""
+    persona: ArtistPersona = Field(description="사용자 취향 페르소나")
+    genre_recommendation: AIGenreRecommendation = Field(description="상황 기반 AI 추천 장르")
+
+
 # === 노드 1: 선호 아티스트 분석 ===
 def analyze_preference(state: AgentState) -> AgentState:
     """사용자의 선호 아티스트와 장르 분석"""
@@ -123,16 +198,28 @@ def analyze_preference(state: AgentState) -> AgentState:
     preferred_artists = state["preferred_artists"]
     preferred_genres = state["preferred_genres"]
     
-    prompt = ANALYZE_PREFERENCE_PROMPT.format(
-        preferred_artists=", ".join(preferred_artists),
-        preferred_genres=", ".join(preferred_genres) if preferred_genres else "지정 없음"
-    )
+    # 🆕 같은 아티스트/장르 조합의 페르소나가 있으면 LLM 호출 생략
+    persona_store = get_persona_store()
+    key = persona_key(preferred_artists, preferred_genres, state.get("user_id"))
+    artist_persona = persona_store.get(key)
     
-    structured_llm = llm.with_structured_output(ArtistPersona)
-    artist_persona = structured_llm.invoke([
-        SystemMessage(content="당신은 전문 음악 큐레이터입니다."),
-        HumanMessage(content=prompt)
-    ])
+    if artist_persona is not None:
+        print("⚡ 저장된 페르소나 사용 (LLM 호출 생략)")
+    else:
+        prompt = ANALYZE_PREFERENCE_PROMPT.format(
+            preferred_artists=", ".join(preferred_artists),
+            preferred_genres=", ".join(preferred_genres) if preferred_genres else "지정 없음"
+        )
+        
+        artist_persona, primary = invoke_structured("analyze_preference", ArtistPersona, [
+            SystemMessage(content="당신은 전문 음악 큐레이터입니다."),
+            HumanMessage(content=prompt)
+        ], ledger=usage_ledger(state), return_primary=True)
+        if primary:  # 대체 티어/저하 모드 페르소나는 저장하지 않음
+            persona_store.put(key, artist_persona)
+        
+        # 🆕 선호 아티스트 ↔ 유사 아티스트를 아티스트 그래프에 기록
+        get_artist_graph().add_persona(preferred_artists, artist_persona.similar_artists)
     
     print(f"✓ 주요 장르: {', '.join(artist_persona.dominant_genres)}")
     print(f"✓ 선호 장르: {', '.join(preferred_genres) if preferred_genres else '없음'}")
@@ -151,59 +238,53 @@ def context_analysis(state: AgentState) -> AgentState:
     print("\n[2/8] 🎯 상황 분석 & AI 장르 추천 중...")
     print(f"   우선순위: 1)소음({state['decibel']}) 2)목표({state['goal']}) 3)위치({state['location']})")
     
-    # 1순위: 소음도 프로필
-    decibel = state["decibel"]
-    decibel_profile = DECIBEL_MUSIC_PROFILES[decibel]
-    decibel_text = f"""
-에너지 범위: {decibel_profile['energy_range']}
-볼륨 키워드: {', '.join(decibel_profile['volume_keywords'])}
-피해야 할: {', '.join(decibel_profile['avoid_keywords'])}
-템포 범위: {decibel_profile['tempo_range']} BPM
-보컬 선호: {decibel_profile['vocal_preference']}
-"""
+    location, goal, decibel = state["location"], state["goal"], state["decibel"]
+    artist_persona = state["artist_persona"]
+    preferred_genres = state["preferred_genres"]
     
-    # 2순위: 목표 프로필
-    goal = state["goal"]
-    goal_profile = GOAL_MUSIC_PROFILES[goal]
-    goal_text = f"""
-설명: {goal_profile['description']}
-분위기: {', '.join(goal_profile['mood'])}
-특성: {', '.join(goal_profile['characteristics'])}
-추천 장르: {', '.join(goal_profile['suggested_genres'])}
-에너지 레벨: {goal_profile['energy_level']}
-피해야 할: {', '.join(goal_profile.get('avoid', []))}
-"""
+    mode = node_mode(state, "context_analysis")
     
-    # 3순위: 위치 보정
-    location = state["location"]
-    location_mod = LOCATION_MODIFIERS[location]
-    location_text = f"""
-분위기: {location_mod['atmosphere']}
-보정: {location_mod['modifier']}
-에너지 조정: {location_mod['adjust_energy']:+.1f}
-"""
+    # 🆕 규칙 엔진 (LLM 호출 없음)
+    if mode == "rule":
+        return _apply_rule_genres(state)
     
-    # 프롬프트 생성
-    artist_persona = state["artist_persona"]
-    preferred_genres = state["preferred_genres"]
+    # 🆕 미리 생성한 상황 테이블 + 규칙 기반 취향 타협 (LLM 호출 없음)
+    if mode == "table":
+        profile = get_context_table().lookup(location, goal, decibel)
+        if profile is not None:
+            genres, reasoning = blend_with_preferences(profile, preferred_genres, artist_persona)
+            print(f"⚡ 상황 테이블 사용: {', '.join(genres)}")
+            state["ai_recommended_genres"] = genres
+            state["ai_genre_reasoning"] = reasoning
+            return state
+        print("⚠️ 상황 테이블 없음 → LLM 분석")
     
+    # 프롬프트 생성 (1순위 소음도 / 2순위 목표 / 3순위 위치 프로필은 고정 접두사의 프로필 표)
     prompt = CONTEXT_ANALYSIS_PROMPT.format(
         location=location,
         goal=goal,
         decibel=decibel,
-        decibel_profile=decibel_text,
-        goal_profile=goal_text,
-        location_modifier=location_text,
         preferred_genres=", ".join(preferred_genres) if preferred_genres else "지정 없음",
         artist_persona_summary=artist_persona.summary
     )
     
     # LLM 호출 - AI 추천 장르 생성
-    structured_llm = llm.with_structured_output(AIGenreRecommendation)
-    ai_genre_rec = structured_llm.invoke([
+    messages = [
         SystemMessage(content="당신은 상황 기반 음악 추천 전문가입니다."),
         HumanMessage(content=prompt)
-    ])
+    ]
+    if mode == "auto":
+        # 🆕 제한 시간 안에 응답이 없거나 오류면 규칙 엔진으로 대체
+        try:
+            ai_genre_rec = invoke_structured_with_timeout(
+                "context_analysis", AIGenreRecommendation, messages, NODE_LLM_TIMEOUT_SECONDS,
+                ledger=usage_ledger(state)
+            )
+        except Exception as e:
+            print(f"⚠️ LLM 지연/오류 ({type(e).__name__}) → 규칙 엔진 사용")
+            return _apply_rule_genres(state)
+    else:
+        ai_genre_rec = invoke_structured("context_analysis", AIGenreRecommendation, messages, ledger=usage_ledger(state))
     
     print(f"✓ AI 추천 장르: {', '.join(ai_genre_rec.ai_recommended_genres)}")
     print(f"✓ 추천 이유: {ai_genre_rec.reasoning[:100]}...")
@@ -215,6 +296,89 @@ def context_analysis(state: AgentState) -> AgentState:
     return state
 
 
+def _apply_rule_genres(state: AgentState) -> AgentState:
+    """규칙 엔진으로 AI 추천 장르 & 이유 생성"""
+    genres, reasoning = recommend_genres(
+        state["location"],
+        state["goal"],
+        state["decibel"],
+        state["preferred_genres"],
+        state["artist_persona"]
+    )
+    print(f"⚡ 규칙 기반 추천 장르: {', '.join(genres)}")
+    state["ai_recommended_genres"] = genres
+    state["ai_genre_reasoning"] = reasoning
+    return state
+
+
+# === 노드 1+2 (통합 모드): 선호 분석 + 상황 분석 단일 호출 ===
+def _context_needs_llm(state: AgentState) -> bool:
+    """context_analysis가 LLM을 호출하게 되는지 여부 ("auto"는 제한 시간 처리를 위해 제외)"""
+    mode = node_mode(state, "context_analysis")
+    if mode == "llm":
+        return True
+    if mode == "table":
+        return get_context_table().lookup(state["location"], state["goal"], state["decibel"]) is None
+    return False
+
+
+def fused_analysis(state: AgentState) -> AgentState:
+    """
+    ArtistPersona + AIGenreRecommendation을 한 번의 구조화 출력 호출로 생성
+    두 분석 중 하나라도 LLM이 필요 없으면 개별 노드 로직으로 처리
+    """
+    print("\n[1-2/8] 🎵🎯 선호 & 상황 통합 분석 중...")
+    
+    if not _context_needs_llm(state):
+        return context_analysis(analyze_preference(state))
+    
+    preferred_artists = state["preferred_artists"]
+    preferred_genres = state["preferred_genres"]
+    persona_store = get_persona_store()
+    key = persona_key(preferred_artists, preferred_genres, state.get("user_id"))
+    
+    artist_persona = persona_store.get(key)
+    if artist_persona is not None:
+        print("⚡ 저장된 페르소나 사용 (상황 분석만 호출)")
+        state["artist_persona"] = artist_persona
+        return context_analysis(state)
+    
+    location, goal, decibel = state["location"], state["goal"], state["decibel"]
+    prompt = FUSED_ANALYSIS_PROMPT.format(
+        preferred_artists=", ".join(preferred_artists),
+        preferred_genres=", ".join(preferred_genres) if preferred_genres else "지정 없음",
+        location=location,
+        goal=goal,
+        decibel=decibel,
+        **render_context_profiles(location, goal, decibel)
+    )
+    
+    fused, primary = invoke_structured("fused_analysis", FusedAnalysis, [
+        SystemMessage(content="당신은 전문 음악 큐레이터이자 상황 기반 음악 추천 전문가입니다."),
+        HumanMessage(content=prompt)
+    ], ledger=usage_ledger(state), return_primary=True)
+    artist_persona = fused.persona
+    ai_genre_rec = fused.genre_recommendation
+    
+    if primary:  # 대체 티어/저하 모드 페르소나는 저장하지 않음
+        persona_store.put(key, artist_persona)
+    get_artist_graph().add_persona(preferred_artists, artist_persona.similar_artists)
+    
+    print(f"✓ 주요 장르: {', '.join(artist_persona.dominant_genres)}")
+    print(f"✓ AI 추천 장르: {', '.join(ai_genre_rec.ai_recommended_genres)}")
+    print(f"✓ 추천 이유: {ai_genre_rec.reasoning[:100]}...")
+    
+    state["artist_persona"] = artist_persona
+    state["ai_recommended_genres"] = ai_genre_rec.ai_recommended_genres
+    state["ai_genre_reasoning"] = ai_genre_rec.reasoning
+    return state
+
+
+def route_entry(state: AgentState) -> str:
+    """시작 노드 선택 (선호/상황 분석 통합 여부)"""
+    return node_mode(state, "preference_context")
+
+
 # === 노드 3: 검색 쿼리 생성 (Spotify 필터 문법 활용) ===
 def search_query_generator(state: AgentState) -> AgentState:
     """Spotify 필터 문법을 활용한 고도화된 검색 쿼리 생성"""
@@ -224,6 +388,22 @@ def search_query_generator(state: AgentState) -> AgentState:
     ai_reasoning = state["ai_genre_reasoning"]
     validation_feedback = state.get("validation_feedback")
     
+    # 🆕 결정적 쿼리 컴파일러 (LLM 호출 없음, 재시도 시 피드백 코드 반영)
+    if node_mode(state, "search_query_generator") == "compiler":
+        queries = compile_queries(
+            ai_genres,
+            state["decibel"],
+            state["goal"],
+            preferred_artists=state["preferred_artists"],
+            codes=state.get("validation_codes") if validation_feedback else None,
+            iteration=state.get("iteration_count", 0)
+        )
+        print(f"⚡ 쿼리 컴파일러 {len(queries)}개 생성:")
+        for i, q in enumerate(queries, 1):
+            print(f"  {i}. {q.query}")
+        state["search_queries"] = queries
+        return state
+    
     if validation_feedback:
         print("⚠ 품질 검증 피드백 반영 중...")
         prompt = FEEDBACK_SEARCH_PROMPT.format(
@@ -240,11 +420,10 @@ def search_query_generator(state: AgentState) -> AgentState:
             location=state["location"]
         )
     
-    structured_llm = llm.with_structured_output(ContextSearchQueries)
-    queries_result = structured_llm.invoke([
+    queries_result = invoke_structured("search_query_generator", ContextSearchQueries, [
         SystemMessage(content="당신은 Spotify 검색 전문가입니다. 필터 문법을 활용하세요."),
         HumanMessage(content=prompt)
-    ])
+    ], ledger=usage_ledger(state))
     
     print(f"✓ 생성된 쿼리 {len(queries_result.queries)}개:")
     for i, q in enumerate(queries_result.queries, 1):
@@ -262,15 +441,60 @@ def tools(state: AgentState) -> AgentState:
     search_queries = state["search_queries"]
     spotify_client = get_spotify_client()
     
-    queries = [q.query for q in search_queries]
-    candidate_tracks = spotify_client.parallel_search(
-        queries=queries,
-        limit_per_query=10
-    )
+    # 🆕 AI 추천 장르가 모두 장르 풀에 있으면 풀에서 후보 조립 (첫 반복만)
+    pool_tracks = []
+    genre_pools = get_genre_pools()
+    if GENRE_POOL_ENABLED and genre_pools.is_ready() and not state.get("validation_feedback"):
+        matched = [genre_pools.match_genre(g) for g in state["ai_recommended_genres"]]
+        if all(matched):
+            pool_tracks = genre_pools.assemble(matched, CANDIDATE_TRACKS_COUNT)
+    
+    # 🆕 사용자 최근 추천 곡 제외 (선호 아티스트 ID를 먼저 해석해 채점에 반영)
+    resolve_preferred_artist_ids(state)
+    scoring_context = ScoringContext.from_state(state)
+    pool_tracks = [t for t in pool_tracks if not scoring_context.recently_recommended(t)]
+    
+    if len(pool_tracks) >= CANDIDATE_TRACKS_COUNT:
+        print(f"✓ 장르 풀에서 후보 {len(pool_tracks)}곡 조립 (검색 생략)")
+        candidate_tracks = pool_tracks
+    else:
+        # 🆕 도착하는 대로 채점해 쿼터 버킷별 상위 k곡만 유지
+        scorer = CandidateScorer(scoring_context, k=CANDIDATE_TRACKS_COUNT)
+        queries = [q.query for q in search_queries]
+        candidate_tracks = spotify_client.parallel_search(
+            queries=queries,
+            limit_per_query=10,
+            scorer=scorer
+        )
+        print(f"✓ 후보 트랙 {len(candidate_tracks)}곡 검색 완료 "
+              f"(검색 {scorer.seen}곡, 스팸 {scorer.rejected_spam}, 중복 버전 {scorer.rejected_duplicates}, "
+              f"최근 추천 {scorer.rejected_recent})")
+    
+    # 🆕 아티스트 그래프 k-hop 확장 (선호 아티스트 + 페르소나 유사 아티스트 기준, 검색 없음)
+    # 선호 아티스트는 검증된 해석 결과, 페르소나 유사 아티스트는 정확/별칭 일치만 사용 (퍼지 오매칭 시드 방지)
+    directory = get_artist_directory()
+    seeds = list(resolve_preferred_artist_ids(state).values())
+    if state.get("artist_persona"):
+        seeds += [directory.resolve(name, fuzzy=False) for name in state["artist_persona"].similar_artists]
+    
+    track_store = get_track_store()
+    seen_ids = {t.id for t in candidate_tracks}
+    expanded = []
+    for track_id in get_artist_graph().candidate_track_ids(
+        seeds,
+        hops=ARTIST_GRAPH_HOPS,
+        artist_limit=ARTIST_GRAPH_EXPANSION_ARTISTS,
+        tracks_per_artist=ARTIST_GRAPH_TRACKS_PER_ARTIST
+    ):
+        track = track_store.get(track_id)
+        if track and track.id not in seen_ids and not scoring_context.recently_recommended(track):
+            expanded.append(track)
+            seen_ids.add(track.id)
     
-    print(f"✓ 후보 트랙 {len(candidate_tracks)}곡 검색 완료")
+    if expanded:
+        print(f"✓ 아티스트 그래프 확장 {len(expanded)}곡 추가")
     
-    state["candidate_tracks"] = candidate_tracks
+    state["candidate_tracks"] = candidate_tracks + expanded
     return state
 
 
@@ -281,20 +505,30 @@ def preference_search(state: AgentState) -> AgentState:
     preferred_artists = state["preferred_artists"]
     spotify_client = get_spotify_client()
     
+    # 🆕 자유 입력 아티스트명 → Spotify 아티스트 ID (tools 노드에서 이미 해석)
+    preferred_artist_ids = resolve_preferred_artist_ids(state)
+    
     preference_tracks = []
     
     for artist in preferred_artists[:5]:
+        artist_id = preferred_artist_ids.get(artist)
+        if not artist_id:
+            print(f"아티스트를 찾을 수 없음: {artist}")
+            continue
+        
         # 최신 곡 (4년)
         recent_tracks = spotify_client.get_artist_recent_tracks(
             artist_name=artist,
-            months=48
+            months=48,
+            artist_id=artist_id
         )
         preference_tracks.extend(recent_tracks[:3])
         
         # 인기 곡
         top_tracks = spotify_client.search_artist_tracks(
             artist_name=artist,
-            limit=3
+            limit=3,
+            artist_id=artist_id
         )
         preference_tracks.extend(top_tracks)
     
@@ -306,6 +540,18 @@ def preference_search(state: AgentState) -> AgentState:
             unique_tracks.append(track)
             seen_ids.add(track.id)
     
+    # 🆕 사용자 최근 추천 곡 제외 (남는 곡이 선호 할당량보다 적으면 최근 곡을 뒤에 남겨둠)
+    scoring_context = ScoringContext.from_state(state)
+    fresh_tracks = [t for t in unique_tracks if not scoring_context.recently_recommended(t)]
+    preferred_quota = round(FINAL_RECOMMENDATIONS_COUNT * PREFERRED_ARTIST_TRACK_RATIO)
+    if len(fresh_tracks) < len(unique_tracks):
+        if len(fresh_tracks) >= preferred_quota:
+            print(f"✓ 최근 추천 곡 {len(unique_tracks) - len(fresh_tracks)}곡 제외")
+            unique_tracks = fresh_tracks
+        else:
+            fresh_ids = {t.id for t in fresh_tracks}
+            unique_tracks = fresh_tracks + [t for t in unique_tracks if t.id not in fresh_ids]
+    
     print(f"✓ 선호 아티스트 곡 {len(unique_tracks)}곡 검색 완료")
     print(f"   (이 중 2곡은 최종 추천에 반드시 포함됨)")
     
@@ -327,6 +573,15 @@ def selection(state: AgentState) -> AgentState:
     candidate_tracks = state["candidate_tracks"]
     preference_tracks = state["preference_tracks"]
     
+    # 🆕 동일 곡 중복 버전 제거 (싱글/앨범/리마스터 → 대표 1개)
+    preference_ids = {t.id for t in preference_tracks}
+    deduped = dedupe_tracks(candidate_tracks + preference_tracks)
+    duplicate_count = len(candidate_tracks) + len(preference_tracks) - len(deduped)
+    candidate_tracks = [t for t in deduped if t.id not in preference_ids]
+    preference_tracks = [t for t in deduped if t.id in preference_ids]
+    if duplicate_count > 0:
+        print(f"✓ 중복 버전 {duplicate_count}곡 제거됨")
+    
     # 🆕 키워드 스팸 필터링
     filtered_candidates = [t for t in candidate_tracks if not is_spam_title(t.name)]
     filtered_preference = [t for t in preference_tracks if not is_spam_title(t.name)]
@@ -335,37 +590,26 @@ def selection(state: AgentState) -> AgentState:
     if spam_count > 0:
         print(f"✓ 키워드 스팸 {spam_count}곡 필터링됨")
     
-    ai_genres = state["ai_recommended_genres"]
-    
-    prompt = SELECTION_PROMPT.format(
-        decibel=state["decibel"],
-        goal=state["goal"],
-        location=state["location"],
-        ai_genres=", ".join(ai_genres),
-        preferred_artists=", ".join(state["preferred_artists"]),
-        num_candidates=len(filtered_candidates),
-        candidate_tracks_info=format_tracks_for_prompt(filtered_candidates),
-        num_preference=len(filtered_preference),
-        preference_tracks_info=format_tracks_for_prompt(filtered_preference)
-    )
-    
-    structured_llm = llm.with_structured_output(FinalSelection)
-    selection_result = structured_llm.invoke([
-        SystemMessage(content="당신은 상황 기반 음악 큐레이터입니다. 10곡을 선택하세요."),
-        HumanMessage(content=prompt)
-    ])
+    started = time.perf_counter()
     
-    # 선택된 트랙 객체 찾기
-    all_tracks = filtered_candidates + filtered_preference
-    track_dict = {track.id: track for track in all_tracks}
+    # 🆕 쿼터 제약 선택 솔버 (LLM 호출 없음)
+    if node_mode(state, "selection") == "solver":
+        result = select_tracks(
+            filtered_candidates + filtered_preference,
+            ScoringContext.from_state(state),
+            is_preferred=_preferred_track_checker(state)
+        )
+        selected_tracks = result.tracks
+        print(f"⚡ 선택 솔버: 적합도 합계 {result.score:.2f}")
+        if result.unmet:
+            print(f"⚠ 후보 부족으로 미충족 쿼터: {', '.join(result.unmet)}")
+    else:
+        selected_tracks = _select_with_llm(state, filtered_candidates, filtered_preference)
     
-    selected_tracks = []
-    for selection in selection_result.selected_tracks[:10]:  # 최대 10곡
-        if selection.track_id in track_dict:
-            selected_tracks.append(track_dict[selection.track_id])
+    print(f"⏱ 선택 소요 시간: {time.perf_counter() - started:.2f}s")
     
     # 통계 출력
-    preferred_count = sum(1 for t in selected_tracks if any(a.name in state["preferred_artists"] for a in t.artists))
+    preferred_count = sum(1 for t in selected_tracks if any(is_preferred_artist(a, state) for a in t.artists))
     korean_count = sum(1 for t in selected_tracks if is_korean_track(t))
     
     print(f"✓ {len(selected_tracks)}곡 선택 완료")
@@ -376,6 +620,88 @@ def selection(state: AgentState) -> AgentState:
     return state
 
 
+def _select_with_llm(
+    state: AgentState,
+    filtered_candidates: List[SpotifyTrack],
+    filtered_preference: List[SpotifyTrack]
+) -> List[SpotifyTrack]:
+    """LLM으로 10곡 선택"""
+    ai_genres = state["ai_recommended_genres"]
+    scoring_context = ScoringContext.from_state(state)
+    
+    # 🆕 사전 순위화: 상황에 맞지 않는 후보를 빼고 쿼터 버킷별 상위 N곡만 프롬프트에 포함
+    total_count = len(filtered_candidates) + len(filtered_preference)
+    filtered_candidates = prerank_tracks(filtered_candidates, scoring_context, SELECTION_PRERANK_PER_BUCKET)
+    filtered_preference = prerank_tracks(
+        filtered_preference, scoring_context, dict.fromkeys(("korean", "recent", "other"), SELECTION_PRERANK_PREFERRED)
+    )[:SELECTION_PRERANK_PREFERRED]
+    print(f"✓ 사전 순위화: {total_count}곡 → {len(filtered_candidates) + len(filtered_preference)}곡")
+    
+    # 🆕 압축 인코딩 (선호 아티스트 곡을 먼저 예산에 배정, 후보는 적합도 순으로 잘라냄)
+    encoder = TrackEncoder("selection", scoring_context, _preferred_track_checker(state))
+    preference_tracks_info = encoder.encode(filtered_preference)
+    preference_dropped = encoder.dropped
+    candidate_tracks_info = encoder.encode(filtered_candidates)
+    # 프롬프트의 곡 수는 예산으로 제외된 곡을 뺀 실제 전달 곡 수
+    num_preference = len(filtered_preference) - preference_dropped
+    num_candidates = len(filtered_candidates) - (encoder.dropped - preference_dropped)
+    if encoder.dropped:
+        print(f"✂ 토큰 예산 초과로 후보 {encoder.dropped}곡 제외")
+    
+    prompt = SELECTION_PROMPT.format(
+        decibel=state["decibel"],
+        goal=state["goal"],
+        location=state["location"],
+        ai_genres=", ".join(ai_genres),
+        preferred_artists=", ".join(state["preferred_artists"]),
+        num_candidates=num_candidates,
+        candidate_tracks_info=candidate_tracks_info,
+        num_preference=num_preference,
+        preference_tracks_info=preference_tracks_info
+    )
+    
+    print(f"📏 선택 프롬프트: {len(prompt)}자 (약 {estimate_tokens(prompt)} 토큰)")
+    
+    messages = [
+        SystemMessage(content="당신은 상황 기반 음악 큐레이터입니다. 10곡을 선택하세요."),
+        HumanMessage(content=prompt)
+    ]
+    llm_started = time.perf_counter()
+    selection_result = invoke_structured("selection", FinalSelection, messages, ledger=usage_ledger(state))
+    print(f"⏱ 선택 LLM 응답: {time.perf_counter() - llm_started:.2f}s")
+    
+    # 🆕 구조화 출력 보정: 없는/잘린 번호는 제목·아티스트로 복원, 빈 자리는 후보 순위로 채우고 쿼터 부족분만 교체
+    resolver = TrackResolver(filtered_candidates + filtered_preference, encoder.decode)
+    is_preferred = _preferred_track_checker(state)
+    refs = [selection.track_id for selection in selection_result.selected_tracks]
+    repair = repair_selection(refs, resolver, scoring_context, is_preferred)
+    
+    reinvoked = False
+    min_resolved = FINAL_RECOMMENDATIONS_COUNT * SELECTION_REPAIR_MIN_RESOLVED
+    if repair.resolved < min_resolved:
+        # 보정으로 살릴 수 없을 만큼 응답이 어긋나면 번호 사용을 다시 지시해 한 번만 재호출
+        print(f"⚠ 선택 결과 {len(refs)}곡 중 {repair.resolved}곡만 후보와 일치 → LLM 재호출")
+        reinvoked = True
+        retry_result = invoke_structured("selection", FinalSelection, messages + [
+            HumanMessage(content=(
+                f"이전 응답의 트랙 번호 중 {len(refs) - repair.resolved}개가 후보 목록에 없습니다. "
+                "후보 목록에 있는 번호(t1, t2 ...)만 사용해 다시 10곡을 선택하세요."
+            ))
+        ], ledger=usage_ledger(state))
+        retry = repair_selection(
+            [selection.track_id for selection in retry_result.selected_tracks], resolver, scoring_context, is_preferred
+        )
+        if retry.resolved >= repair.resolved:
+            repair = retry
+    
+    get_repair_metrics().record("selection", repair.counts, reinvoked)
+    if repair.repaired:
+        counts = repair.counts
+        print(f"🔧 선택 보정: 유사 복원 {counts['fuzzy']}, 제외 {counts['dropped']}, "
+              f"채움 {counts['filled']}, 쿼터 교체 {counts['swapped']}")
+    return repair.tracks
+
+
 # === 노드 7: 리믹스 필터링 (10곡 대응) ===
 def remix_track_filter(state: AgentState) -> AgentState:
     """리믹스, 라이브 버전 필터링"""
@@ -433,46 +759,12 @@ def quality_validator(state: AgentState) -> AgentState:
     preferred_artists = state["preferred_artists"]
     
     # 수동 검증
-    unique_artists = set()
-    preferred_count = 0
-    korean_count = 0
-    recent_count = 0
-    popularity_dist = {"high": 0, "medium": 0, "low": 0}
-    
-    cutoff_date = datetime.now() - timedelta(days=RECENT_YEARS * 365)
-    
-    for track in selected_tracks:
-        # 아티스트
-        for artist in track.artists:
-            unique_artists.add(artist.name)
-            if artist.name in preferred_artists:
-                preferred_count += 1
-        
-        # 한국 노래
-        if is_korean_track(track):
-            korean_count += 1
-        
-        # 최신성 (4년)
-        try:
-            release_date_str = track.release_date
-            if len(release_date_str) == 4:
-                release_date = datetime.strptime(release_date_str, "%Y")
-            elif len(release_date_str) == 7:
-                release_date = datetime.strptime(release_date_str, "%Y-%m")
-            else:
-                release_date = datetime.strptime(release_date_str, "%Y-%m-%d")
-            
-            if release_date >= cutoff_date:
-                recent_count += 1
-        except:
-            pass
-        
-        # 인기도 분포
-        pop_level = get_popularity_level(track.popularity)
-        popularity_dist[pop_level] += 1
-    
-    diversity_score = len(unique_artists) / len(selected_tracks)
-    preferred_ratio = preferred_count / len(selected_tracks)
+    metrics = compute_quality_metrics(selected_tracks, lambda artist: is_preferred_artist(artist, state))
+    diversity_score = metrics.diversity_score
+    preferred_ratio = metrics.preferred_ratio
+    korean_count = metrics.korean_count
+    recent_count = metrics.recent_count
+    popularity_dist = metrics.popularity
     korean_ratio = korean_count / len(selected_tracks)
     
     print(f"  다양성: {diversity_score:.2f} (기준: {QUALITY_THRESHOLDS['min_diversity']})")
@@ -481,28 +773,32 @@ def quality_validator(state: AgentState) -> AgentState:
     print(f"  신곡 수: {recent_count}곡 (기준: {QUALITY_THRESHOLDS['min_recent_tracks']})")
     print(f"  인기도 분포: 높음 {popularity_dist['high']}, 중간 {popularity_dist['medium']}, 낮음 {popularity_dist['low']}")
     
-    # LLM 검증
-    prompt = QUALITY_VALIDATOR_PROMPT.format(
-        selected_tracks_info=format_tracks_for_prompt(selected_tracks),
-        preferred_artists=", ".join(preferred_artists),
-        min_diversity=QUALITY_THRESHOLDS["min_diversity"],
-        min_preferred_ratio=QUALITY_THRESHOLDS["min_preferred_ratio"],
-        min_recent_tracks=QUALITY_THRESHOLDS["min_recent_tracks"]
-    )
-    
-    structured_llm = llm.with_structured_output(QualityValidation)
-    validation = structured_llm.invoke([
-        SystemMessage(content="당신은 음악 추천 품질 검증 전문가입니다."),
-        HumanMessage(content=prompt)
-    ])
-    
-    # 수동 검증 결과 덮어쓰기
-    validation.korean_tracks_count = korean_count
-    validation.popularity_distribution = PopularityDistribution(
-        high=popularity_dist["high"],
-        medium=popularity_dist["medium"],
-        low=popularity_dist["low"]
-    )  # 🔧 dict → PopularityDistribution 객체
+    if node_mode(state, "quality_validator") == "rule":
+        # 🆕 지표만으로 결정적 검증 (LLM 호출 없음)
+        validation = validate_metrics(metrics)
+    else:
+        # LLM 검증
+        encoder = TrackEncoder("quality_validator", ScoringContext.from_state(state), _preferred_track_checker(state))
+        prompt = QUALITY_VALIDATOR_PROMPT.format(
+            selected_tracks_info=encoder.encode(selected_tracks, keep_order=True),
+            preferred_artists=", ".join(preferred_artists),
+            min_diversity=QUALITY_THRESHOLDS["min_diversity"],
+            min_preferred_ratio=QUALITY_THRESHOLDS["min_preferred_ratio"],
+            min_recent_tracks=QUALITY_THRESHOLDS["min_recent_tracks"]
+        )
+        
+        validation = invoke_structured("quality_validator", QualityValidation, [
+            SystemMessage(content="당신은 음악 추천 품질 검증 전문가입니다."),
+            HumanMessage(content=prompt)
+        ], ledger=usage_ledger(state))
+        
+        # 수동 검증 결과 덮어쓰기
+        validation.korean_tracks_count = korean_count
+        validation.popularity_distribution = PopularityDistribution(
+            high=popularity_dist["high"],
+            medium=popularity_dist["medium"],
+            low=popularity_dist["low"]
+        )  # 🔧 dict → PopularityDistribution 객체
     
     current_iteration = state.get("iteration_count", 0) + 1
     
@@ -517,13 +813,22 @@ def quality_validator(state: AgentState) -> AgentState:
         print("✅ 품질 검증 통과!")
         state["final_tracks"] = selected_tracks
         state["validation_feedback"] = None
+        state["validation_codes"] = None
     else:
         print(f"❌ 품질 검증 실패 (반복 {current_iteration}/{MAX_ITERATIONS})")
+        state["validation_codes"] = shortfall_codes(metrics)
+        print(f"   부족분: {', '.join(state['validation_codes']) or '없음'}")
         
+        ledger = state.get("usage_ledger")
         if current_iteration >= MAX_ITERATIONS:
             print("⚠ 최대 반복 횟수 도달 - 현재 결과로 진행")
             state["final_tracks"] = selected_tracks
             state["validation_feedback"] = None
+        elif ledger is not None and ledger.over_budget():
+            # 🆕 요청 토큰 상한 초과 - 재시도 없이 현재 결과로 진행
+            print(f"⚠ LLM 토큰 상한 도달 ({ledger.total_tokens}/{ledger.token_budget}) - 현재 결과로 진행")
+            state["final_tracks"] = selected_tracks
+            state["validation_feedback"] = None
         else:
             state["validation_feedback"] = validation.feedback or f"한국 노래 {korean_count}/5, 신곡 {recent_count}/2 부족"
     
@@ -532,34 +837,96 @@ def quality_validator(state: AgentState) -> AgentState:
     return state
 
 
-# === 노드 9: 추천 이유 생성 (변경 없음) ===
+# === 노드 9: 추천 이유 생성 ===
 def generate_reason(state: AgentState) -> AgentState:
-    """추천 이유 생성"""
+    """
+    추천 이유 생성
+    - "cached": 추천 이유 캐시 적중 곡은 재사용, 미스만 LLM 한 번에 요청
+    - "template": 캐시 미스는 템플릿 이유 (LLM 호출 없음)
+    - "llm": 매번 전체 곡을 LLM으로 생성
+    """
     print("\n[9/9] 💬 추천 이유 생성 중...")
     
     final_tracks = state["final_tracks"]
-    ai_genres = state["ai_recommended_genres"]
-    artist_persona = state["artist_persona"]
+    location, goal, decibel = state["location"], state["goal"], state["decibel"]
+    mode = node_mode(state, "generate_reason")
+    scoring_context = ScoringContext.from_state(state)
+    is_preferred = _preferred_track_checker(state)
+    
+    # 🆕 (트랙, 상황, 페르소나 클러스터, 선호 여부)별 캐시 조회
+    cache = get_reason_cache()
+    cluster = persona_cluster(state["artist_persona"])
+    keys = {
+        track.id: reason_key(track.id, location, goal, decibel, cluster, is_preferred(track))
+        for track in final_tracks
+    }
+    cached = cache.get_many(keys.values()) if mode != "llm" else {}
+    reasons = {track.id: cached[keys[track.id]] for track in final_tracks if keys[track.id] in cached}
+    misses = [track for track in final_tracks if track.id not in reasons]
+    if mode != "llm":
+        print(f"⚡ 추천 이유 캐시 적중 {len(reasons)}/{len(final_tracks)}곡")
+    
+    if misses and mode != "template":
+        generated, primary = _generate_reasons_with_llm(state, misses)
+        if mode == "cached" and primary:  # 대체 티어/저하 모드 이유는 캐시하지 않음
+            cache.put_many({keys[track_id]: reason for track_id, reason in generated.items()})
+        reasons.update(generated)
+    
+    # LLM이 빠뜨린 곡 & 템플릿 모드 미스는 템플릿 이유
+    for track in final_tracks:
+        if track.id not in reasons:
+            features = build_features(track, scoring_context)
+            reasons[track.id] = template_reason(
+                track.id,
+                track.artists[0].name if track.artists else "이 아티스트",
+                location,
+                goal,
+                decibel,
+                is_preferred=is_preferred(track),
+                is_korean=features.is_korean,
+                is_recent=features.is_recent,
+                popularity_level=features.popularity_level,
+            )
+    
+    print("✓ 추천 이유 생성 완료")
     
+    state["recommendations"] = FinalRecommendations(recommendations=[
+        RecommendationReason(track_id=track.id, reason=reasons[track.id])
+        for track in final_tracks
+    ])
+    return state
+
+
+def _generate_reasons_with_llm(state: AgentState, tracks: List[SpotifyTrack]) -> Tuple[dict, bool]:
+    """트랙들의 추천 이유를 한 번의 LLM 호출로 생성 ({트랙 ID → 이유}, 기본 티어 응답 여부)"""
+    encoder = TrackEncoder("generate_reason", ScoringContext.from_state(state), _preferred_track_checker(state))
     prompt = GENERATE_REASON_PROMPT.format(
         decibel=state["decibel"],
         goal=state["goal"],
         location=state["location"],
-        ai_genres=", ".join(ai_genres),
-        artist_persona_summary=artist_persona.summary,
-        selected_tracks_info=format_tracks_for_prompt(final_tracks)
+        ai_genres=", ".join(state["ai_recommended_genres"]),
+        artist_persona_summary=state["artist_persona"].summary,
+        selected_tracks_info=encoder.encode(tracks, keep_order=True)
     )
     
-    structured_llm = llm.with_structured_output(FinalRecommendations)
-    recommendations = structured_llm.invoke([
+    recommendations, primary = invoke_structured("generate_reason", FinalRecommendations, [
         SystemMessage(content="당신은 친근한 음악 큐레이터입니다."),
         HumanMessage(content=prompt)
-    ])
-    
-    print("✓ 추천 이유 생성 완료")
-    
-    state["recommendations"] = recommendations
-    return state
+    ], ledger=usage_ledger(state), return_primary=True)
+    
+    # 트랙 번호 → Spotify 트랙 ID 복원 (유사 매칭 포함, 요청하지 않은 곡은 무시)
+    resolver = TrackResolver(tracks, encoder.decode)
+    reasons = {}
+    counts = {"exact": 0, "fuzzy": 0, "dropped": 0}
+    for recommendation in recommendations.recommendations:
+        track_id, fuzzy = resolver.resolve(recommendation.track_id)
+        if track_id is None or track_id in reasons:
+            counts["dropped"] += 1
+            continue
+        reasons[track_id] = recommendation.reason
+        counts["fuzzy" if fuzzy else "exact"] += 1
+    get_repair_metrics().record("generate_reason", counts)
+    return reasons, primary
 
 
 # === 조건부 엣지 (변경 없음) ===
@@ -574,6 +941,10 @@ def should_continue(state: AgentState) -> str:
     if iteration_count >= MAX_ITERATIONS:
         return "continue"
     
+    ledger = state.get("usage_ledger")
+    if ledger is not None and ledger.over_budget():
+        return "continue"
+    
     if state.get("validation_feedback"):
         return "retry"
     
@@ -0,0 +1,453 @@
+"""
+오프라인 LLM 백엔드 - OpenAI 없이 프롬프트 입력을 규칙으로 해석해 구조화 출력 생성
+(ArtistPersona, AIGenreRecommendation, FusedAnalysis, ContextGenreProfile,
+ ContextSearchQueries, FinalSelection, QualityValidation, FinalRecommendations)
+
+- LLM_BACKEND="offline": 네트워크 없이 전체 그래프 실행 (부하 테스트/프로파일링, benchmark.py)
+- LLM_DEGRADED_MODE: LLM 제공자 장애 시 라우터가 이 백엔드로 저하 모드 응답
+"""
+from typing import Callable, List, Optional, Tuple, Type
+from dataclasses import dataclass
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+
+from langchain_core.messages import AIMessage
+from pydantic import BaseModel
+
+from config import (
+    LOCATIONS,
+    GOALS,
+    DECIBEL_LEVELS,
+    DECIBEL_MUSIC_PROFILES,
+    KOREAN_INDICATORS,
+    FINAL_RECOMMENDATIONS_COUNT,
+    OFFLINE_LLM_LATENCY_SECONDS,
+    OFFLINE_LLM_LATENCY_JITTER,
+    OFFLINE_LLM_PREFILL_SECONDS_PER_1K,
+    PROMPT_CACHE_MIN_TOKENS,
+    PROMPT_CACHE_BLOCK_TOKENS,
+)
+from models import (
+    ArtistPersona,
+    ContextGenreProfile,
+    ContextSearchQueries,
+    FinalSelection,
+    TrackSelection,
+    QualityValidation,
+    FinalRecommendations,
+    RecommendationReason,
+    SpotifyArtist,
+    SpotifyTrack,
+)
+from artist_directory import get_artist_directory
+from artist_graph import get_artist_graph
+from candidate_scorer import TrackFeatures
+from genre_rules import genre_energy, recommend_genres, score_genres
+from query_compiler import compile_queries
+from quality_metrics import QualityMetrics, validate_metrics
+from track_selector import SelectionQuotas, TrackSelector
+from reason_cache import template_reason
+from prompts import identify_prompt, prompt_suffix
+from track_encoding import estimate_tokens
+
+
+# === 스텁 모델 (with_structured_output 인터페이스) ===
+
+class StubChatModel:
+    """
+    오프라인 테스트용 스텁 모델 - with_structured_output(...).invoke(messages)만 구현
+
+    Args:
+        responder: (스키마, 메시지) → 스키마 인스턴스
+        latency: 호출당 인위적 지연 (초)
+        jitter: 추가 무작위 지연 상한 (초)
+        prefill: 캐시되지 않은 입력 1K 토큰당 첫 토큰 지연 (초)
+
+    제공자 접두사 캐시 모사: 도구 스키마 + 시스템 메시지 + 등록 템플릿 접두사가
+    이전 호출과 같고 PROMPT_CACHE_MIN_TOKENS 이상이면 그 부분을 캐시 토큰으로 보고
+    (usage_metadata.input_token_details.cache_read, response_metadata.time_to_first_token)
+    """
+
+    def __init__(
+        self,
+        responder: Callable[[Type[BaseModel], List], BaseModel],
+        latency: float = 0.0,
+        model: str = "stub",
+        jitter: float = 0.0,
+        prefill: float = 0.0
+    ):
+        self.responder = responder
+        self.latency = latency
+        self.jitter = jitter
+        self.prefill = prefill
+        self.model_name = model
+        self._prefixes = set()
+        self._lock = threading.Lock()
+
+    def with_structured_output(self, schema: Type[BaseModel], include_raw: bool = False) -> "_StubRunnable":
+        return _StubRunnable(self, schema, include_raw)
+
+    def prompt_usage(self, schema: Type[BaseModel], messages: List) -> Tuple[int, int]:
+        """(입력 토큰, 접두사 캐시 적중 토큰)"""
+        texts = [str(getattr(m, "content", m)) for m in messages]
+        tool = json.dumps(schema.model_json_schema(), ensure_ascii=False)
+        input_tokens = estimate_tokens(tool) + sum(estimate_tokens(text) for text in texts)
+
+        static = [tool]  # 도구 스키마 + 앞쪽 시스템 메시지 + 첫 사용자 메시지의 템플릿 접두사
+        for message in messages:
+            text = str(getattr(message, "content", message))
+            template = identify_prompt(text)
+            if template is not None:
+                static.append(template.prefix)
+                break
+            if getattr(message, "type", None) != "system":
+                break
+            static.append(text)
+        prefix_tokens = sum(estimate_tokens(text) for text in static)
+        if prefix_tokens < PROMPT_CACHE_MIN_TOKENS:
+            return input_tokens, 0
+
+        key = hashlib.sha256("\x00".join(static).encode("utf-8")).hexdigest()
+        with self._lock:
+            seen = key in self._prefixes
+            self._prefixes.add(key)
+        cached = prefix_tokens // PROMPT_CACHE_BLOCK_TOKENS * PROMPT_CACHE_BLOCK_TOKENS if seen else 0
+        return input_tokens, cached
+
+
+class _StubRunnable:
+    def __init__(self, model: StubChatModel, schema: Type[BaseModel], include_raw: bool):
+        self.model = model
+        self.schema = schema
+        self.include_raw = include_raw
+
+    def invoke(self, messages: List) -> object:
+        input_tokens, cached_tokens = self.model.prompt_usage(self.schema, messages)
+        ttft = self.model.prefill * (input_tokens - cached_tokens) / 1000
+        delay = ttft + self.model.latency + (random.uniform(0, self.model.jitter) if self.model.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        parsed = self.model.responder(self.schema, messages)
+        if not self.include_raw:
+            return parsed
+
+        output_tokens = estimate_tokens(parsed.model_dump_json())
+        raw = AIMessage(
+            content="",
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+                "input_token_details": {"cache_read": cached_tokens},
+            },
+            response_metadata={"model_name": self.model.model_name, "time_to_first_token": ttft},
+        )
+        return {"raw": raw, "parsed": parsed, "parsing_error": None}
+
+
+# === 프롬프트 해석 ===
+
+_TRACK_LINE = re.compile(r"^(t\d+)\|([^|\n]*)\|([^|\n]*)\|(\d*)\|(\d+)\|([A-Z]*)$", re.MULTILINE)
+_FUSED_SITUATION = re.compile(r"위치 (\S+) / 목표 (\S+) / 소음 레벨 (\S+)")
+_FEEDBACK_CODE = re.compile(r"[a-z_]+:\+\d+")
+_POPULARITY_FLAGS = {"H": "high", "M": "medium", "L": "low"}
+
+
+@dataclass
+class PromptTrack:
+    """인코딩된 트랙 한 줄 (track_encoding 형식: 번호|제목|아티스트|연도|인기도|플래그)"""
+    ref: str
+    title: str
+    artists: List[str]
+    year: str
+    popularity: int
+    flags: str
+
+    @property
+    def is_korean(self) -> bool:
+        return "K" in self.flags
+
+    @property
+    def is_recent(self) -> bool:
+        return "N" in self.flags
+
+    @property
+    def is_preferred(self) -> bool:
+        return "P" in self.flags
+
+    @property
+    def popularity_level(self) -> str:
+        for flag, level in _POPULARITY_FLAGS.items():
+            if flag in self.flags:
+                return level
+        return "high" if self.popularity >= 80 else "medium" if self.popularity >= 50 else "low"
+
+
+def _prompt_text(messages: List) -> str:
+    """메시지 본문 (등록 템플릿의 고정 접두사 - 지시문/예시 - 는 제외하고 요청별 값만 해석)"""
+    return "\n".join(prompt_suffix(str(getattr(m, "content", m))) for m in messages)
+
+
+def _field(text: str, *labels: str) -> Optional[str]:
+    """"라벨: 값" 줄의 값 (목록 기호 "- " 허용, 첫 번째로 값이 있는 줄)"""
+    for label in labels:
+        match = re.search(rf"^[ \t]*(?:-[ \t]*)?{re.escape(label)}:[ \t]*(\S.*)$", text, re.MULTILINE)
+        if match:
+            return match.group(1).strip()
+    return None
+
+
+def _list_field(text: str, label: str) -> List[str]:
+    value = _field(text, label)
+    if not value or value in ("지정 없음", "없음"):
+        return []
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _choice(value: Optional[str], choices: List[str], default: str) -> str:
+    token = value.split()[0] if value else ""
+    return token if token in choices else default
+
+
+def parse_situation(text: str) -> Tuple[str, str, str]:
+    """프롬프트 → (위치, 목표, 소음도) - 없으면 기본값 (home, neutral, moderate)"""
+    fused = _FUSED_SITUATION.search(text)
+    if fused:
+        location, goal, decibel = fused.groups()
+    else:
+        location = _field(text, "위치")
+        goal = _field(text, "목표")
+        decibel = _field(text, "소음 레벨", "소음")
+    return (
+        _choice(location, LOCATIONS, "home"),
+        _choice(goal, GOALS, "neutral"),
+        _choice(decibel, DECIBEL_LEVELS, "moderate"),
+    )
+
+
+def parse_tracks(text: str) -> List[PromptTrack]:
+    """프롬프트의 인코딩된 트랙 줄 (등장 순서)"""
+    return [
+        PromptTrack(
+            ref=ref,
+            title=title,
+            artists=[a.strip() for a in artists.split(",") if a.strip()],
+            year=year,
+            popularity=int(popularity),
+            flags=flags,
+        )
+        for ref, title, artists, year, popularity, flags in _TRACK_LINE.findall(text)
+    ]
+
+
+def _describe(track: PromptTrack) -> str:
+    tags = []
+    if track.is_preferred:
+        tags.append("선호 아티스트")
+    if track.is_korean:
+        tags.append("한국 노래")
+    if track.is_recent:
+        tags.append("신곡")
+    tags.append({"high": "인기곡", "medium": "스테디셀러", "low": "숨은 명곡"}[track.popularity_level])
+    return " · ".join(tags)
+
+
+# === 스키마별 응답 ===
+
+def _persona(text: str) -> ArtistPersona:
+    """선호 아티스트/장르 → 페르소나 (유사 아티스트는 아티스트 그래프 이웃)"""
+    artists = _list_field(text, "선호 아티스트")
+    genres = _list_field(text, "선호 장르")
+
+    dominant = genres[:3]
+    is_korean = any(name in KOREAN_INDICATORS or re.search(r"[가-힣]", name) for name in artists)
+    if is_korean and len(dominant) < 3 and not any(g.lower().startswith("k-") for g in dominant):
+        dominant.append("k-pop")
+    dominant = dominant or ["pop"]
+
+    energy = sum(genre_energy(g) for g in dominant) / len(dominant)
+    level = "quiet" if energy < 0.4 else "loud" if energy > 0.7 else "moderate"
+    characteristics = DECIBEL_MUSIC_PROFILES[level]["volume_keywords"][:3] + [
+        DECIBEL_MUSIC_PROFILES[level]["vocal_preference"]
+    ]
+
+    directory = get_artist_directory()
+    seeds = [directory.resolve(name) for name in artists]
+    similar = []
+    for artist_id, _ in get_artist_graph().neighbours(seeds, hops=2, limit=10):
+        name = directory.canonical_name(artist_id)
+        if name and name not in artists and artist_id not in seeds:
+            similar.append(name)
+
+    summary = (
+        f"{', '.join(artists) or '다양한 아티스트'}의 음악을 즐기는 {', '.join(dominant)} 취향입니다. "
+        f"전반적으로 {', '.join(characteristics[:2])} 느낌의 곡을 선호합니다."
+    )
+    return ArtistPersona(
+        dominant_genres=dominant,
+        music_characteristics=characteristics,
+        similar_artists=similar[:5],
+        summary=summary,
+    )
+
+
+def _genre_recommendation(text: str, persona: Optional[ArtistPersona] = None) -> dict:
+    location, goal, decibel = parse_situation(text)
+    genres, reasoning = recommend_genres(location, goal, decibel, _list_field(text, "선호 장르"), persona)
+    return {"ai_recommended_genres": genres, "reasoning": reasoning}
+
+
+def _context_profile(text: str) -> ContextGenreProfile:
+    location, goal, decibel = parse_situation(text)
+    scores = score_genres(location, goal, decibel, [])
+    _, reasoning = recommend_genres(location, goal, decibel, [])
+    return ContextGenreProfile(
+        genres=[genre for genre, _ in scores[:8]],
+        avoid_genres=[genre for genre, _ in scores[-3:]],
+        reasoning=reasoning,
+    )
+
+
+def _search_queries(text: str) -> ContextSearchQueries:
+    """AI 추천 장르 + (재검색이면) 피드백 코드 → 쿼리 컴파일러"""
+    _, goal, decibel = parse_situation(text)
+    feedback = _field(text, "피드백")
+    codes = _FEEDBACK_CODE.findall(feedback or "")
+    queries = compile_queries(
+        _list_field(text, "AI 추천 장르"),
+        decibel,
+        goal,
+        preferred_artists=_list_field(text, "선호 아티스트"),
+        codes=codes,
+        iteration=1 if feedback else 0,
+    )
+    return ContextSearchQueries(queries=queries)
+
+
+def _selection(text: str) -> FinalSelection:
+    """인코딩된 후보 줄 → 피처 테이블 → 쿼터 제약 선택 솔버 (점수는 프롬프트 내 순위)"""
+    tracks = parse_tracks(text)
+    features = {}
+    for rank, track in enumerate(tracks):
+        if track.ref in features:
+            continue
+        score = 1.0 - rank / max(len(tracks), 1)
+        features[track.ref] = TrackFeatures(
+            track=SpotifyTrack(
+                id=track.ref,
+                name=track.title,
+                artists=[SpotifyArtist(id=name, name=name) for name in track.artists] or [SpotifyArtist(id=track.ref, name="")],
+                album_name="",
+                release_date=track.year or "0000",
+                duration_ms=0,
+                popularity=track.popularity,
+                external_url="",
+            ),
+            is_korean=track.is_korean,
+            is_recent=track.is_recent,
+            is_spam=False,
+            is_preferred=track.is_preferred,
+            popularity_level=track.popularity_level,
+            context_fit=score,
+            score=score,
+        )
+
+    by_ref = {track.ref: track for track in tracks}
+    result = TrackSelector(features, quotas=SelectionQuotas.default(FINAL_RECOMMENDATIONS_COUNT)).select()
+    return FinalSelection(selected_tracks=[
+        TrackSelection(track_id=track.id, selection_reason=_describe(by_ref[track.id]))
+        for track in result.tracks
+    ])
+
+
+def _quality(text: str) -> QualityValidation:
+    """인코딩된 최종 곡 줄의 플래그 → 품질 지표 → 결정적 검증"""
+    tracks = parse_tracks(text)
+    metrics = QualityMetrics(
+        track_count=len(tracks),
+        unique_artists=len({artist for track in tracks for artist in track.artists}),
+        preferred_count=sum(track.is_preferred for track in tracks),
+        korean_count=sum(track.is_korean for track in tracks),
+        recent_count=sum(track.is_recent for track in tracks),
+    )
+    for track in tracks:
+        metrics.popularity[track.popularity_level] += 1
+    return validate_metrics(metrics)
+
+
+def _reasons(text: str) -> FinalRecommendations:
+    """상황 프로필 + 트랙 플래그로 템플릿 추천 이유"""
+    location, goal, decibel = parse_situation(text)
+    return FinalRecommendations(recommendations=[
+        RecommendationReason(
+            track_id=track.ref,
+            reason=template_reason(
+                track.title,
+                track.artists[0] if track.artists else "이 아티스트",
+                location,
+                goal,
+                decibel,
+                is_preferred=track.is_preferred,
+                is_korean=track.is_korean,
+                is_recent=track.is_recent,
+                popularity_level=track.popularity_level,
+            ),
+        )
+        for track in parse_tracks(text)
+    ])
+
+
+def offline_response(schema: Type[BaseModel], messages: List) -> BaseModel:
+    """스키마별 규칙 응답 (nodes에서 정의한 스키마는 이름으로 구분)"""
+    text = _prompt_text(messages)
+    name = schema.__name__
+
+    if schema is ArtistPersona:
+        return _persona(text)
+    if name == "AIGenreRecommendation":
+        return schema(**_genre_recommendation(text))
+    if name == "FusedAnalysis":
+        persona = _persona(text)
+        return schema(persona=persona, genre_recommendation=_genre_recommendation(text, persona))
+    if schema is ContextGenreProfile:
+        return _context_profile(text)
+    if schema is ContextSearchQueries:
+        return _search_queries(text)
+    if schema is FinalSelection:
+        return _selection(text)
+    if schema is QualityValidation:
+        return _quality(text)
+    if schema is FinalRecommendations:
+        return _reasons(text)
+    raise ValueError(f"오프라인 백엔드가 지원하지 않는 스키마: {name}")
+
+
+def offline_backend(model: str, temperature: float, timeout: float) -> StubChatModel:
+    """LLMRouter 백엔드 팩토리 (모델/온도는 무시, OFFLINE_LLM_LATENCY_SECONDS 만큼 지연)"""
+    return StubChatModel(
+        offline_response,
+        latency=OFFLINE_LLM_LATENCY_SECONDS,
+        model=f"offline:{model}",
+        jitter=OFFLINE_LLM_LATENCY_JITTER,
+        prefill=OFFLINE_LLM_PREFILL_SECONDS_PER_1K,
+    )
+
+
+if __name__ == "__main__":
+    from langchain_core.messages import HumanMessage
+    from prompts import GENERATE_REASON_PROMPT
+
+    prompt = GENERATE_REASON_PROMPT.format(
+        decibel="quiet",
+        goal="focus",
+        location="library",
+        ai_genres="lo-fi, ambient",
+        artist_persona_summary="차분한 인디 취향",
+        selected_tracks_info="t1|밤편지|IU|2017|78|KPM\nt2|Weightless|Marconi Union|2012|55|M",
+    )
+    for rec in offline_response(FinalRecommendations, [HumanMessage(content=prompt)]).recommendations:
+        print(f"{rec.track_id}: {rec.reason}")
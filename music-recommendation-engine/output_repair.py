@@ -0,0 +1,183 @@
+"""
+구조화 출력 보정 - LLM 응답의 트랙 참조를 후보로 복원하고 부족한 자리를 로컬에서 채움
+- 번호(t12) / 원래 ID 그대로면 정확 매칭
+- 프롬프트 줄을 통째로 돌려준 경우("t12|제목|아티스트..."), 잘린/덧붙은 ID, 제목·아티스트 표기는 유사 매칭
+- selection: 복원한 곡을 시드로 선택 솔버가 빈 자리를 채우고 쿼터 부족분만 교체
+  (복원 비율이 SELECTION_REPAIR_MIN_RESOLVED 미만일 때만 LLM 재호출)
+노드별 보정 횟수는 GET /llm-repairs
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+from collections import defaultdict
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+import threading
+
+from config import (
+    FINAL_RECOMMENDATIONS_COUNT,
+    OUTPUT_REPAIR_MIN_SIMILARITY,
+    OUTPUT_REPAIR_MIN_ID_PREFIX,
+)
+from models import SpotifyTrack
+from candidate_scorer import ScoringContext, build_feature_table
+from track_selector import SelectionQuotas, TrackSelector
+from local_search import tokenize
+
+
+def _label(text: str) -> str:
+    return " ".join(tokenize(text))
+
+
+class TrackResolver:
+    """LLM 응답의 트랙 참조 → 후보 트랙 ID"""
+
+    def __init__(self, tracks: List[SpotifyTrack], decode: Optional[Callable[[str], str]] = None):
+        self.tracks = {track.id: track for track in tracks}
+        self.decode = decode or (lambda ref: ref)
+        self._labels: List[Tuple[str, str, str]] = [
+            (_label(track.name), _label(f"{track.name} {track.get_artist_names()}"), track.id)
+            for track in self.tracks.values()
+        ]
+
+    def resolve(self, ref: str) -> Tuple[Optional[str], bool]:
+        """
+        Returns:
+            (트랙 ID 또는 None, 유사 매칭으로 복원했는지 여부)
+        """
+        ref = (ref or "").strip()
+        track_id = self.decode(ref)
+        if track_id in self.tracks:
+            return track_id, False
+
+        # 프롬프트 줄을 통째로 돌려준 경우 (번호|제목|아티스트|...)
+        head = ref.split("|")[0].strip()
+        track_id = self.decode(head)
+        if track_id in self.tracks:
+            return track_id, True
+
+        # 잘리거나 덧붙은 Spotify ID
+        if len(head) >= OUTPUT_REPAIR_MIN_ID_PREFIX:
+            matches = [tid for tid in self.tracks if tid.startswith(head) or head.startswith(tid)]
+            if len(matches) == 1:
+                return matches[0], True
+
+        # 제목 / "제목 - 아티스트" 표기
+        text = _label(ref.replace("|", " "))
+        if not text:
+            return None, False
+        best_id, best_ratio = None, 0.0
+        for title, title_artist, tid in self._labels:
+            ratio = max(
+                SequenceMatcher(None, text, title).ratio(),
+                SequenceMatcher(None, text, title_artist).ratio(),
+            )
+            if ratio > best_ratio:
+                best_id, best_ratio = tid, ratio
+        if best_ratio >= OUTPUT_REPAIR_MIN_SIMILARITY:
+            return best_id, True
+        return None, False
+
+    def resolve_all(self, refs: List[str]) -> Tuple[List[str], Dict[str, int]]:
+        """
+        참조 목록 복원 (중복 제거, 순서 유지)
+
+        Returns:
+            (트랙 ID 리스트, {"exact", "fuzzy", "dropped"} 개수)
+        """
+        resolved: List[str] = []
+        counts = {"exact": 0, "fuzzy": 0, "dropped": 0}
+        for ref in refs:
+            track_id, fuzzy = self.resolve(ref)
+            if track_id is None or track_id in resolved:
+                counts["dropped"] += 1
+                continue
+            resolved.append(track_id)
+            counts["fuzzy" if fuzzy else "exact"] += 1
+        return resolved, counts
+
+
+@dataclass
+class SelectionRepair:
+    tracks: List[SpotifyTrack]
+    resolved: int  # LLM 선택 중 후보로 복원된 곡 수
+    counts: Dict[str, int] = field(default_factory=dict)  # exact / fuzzy / dropped / filled / swapped
+    unmet: List[str] = field(default_factory=list)
+
+    @property
+    def repaired(self) -> bool:
+        return any(self.counts.get(key) for key in ("fuzzy", "dropped", "filled", "swapped"))
+
+
+def repair_selection(
+    refs: List[str],
+    resolver: TrackResolver,
+    context: ScoringContext,
+    is_preferred: Optional[Callable[[SpotifyTrack], bool]] = None,
+    count: int = FINAL_RECOMMENDATIONS_COUNT
+) -> SelectionRepair:
+    """
+    LLM 선택 결과 보정: 참조 복원 → 복원한 곡을 시드로 선택 솔버가 빈 자리를 채우고 쿼터 부족분만 교체
+    """
+    picks, counts = resolver.resolve_all(refs)
+    picks = picks[:count]
+
+    features = build_feature_table(list(resolver.tracks.values()), context)
+    features = {track_id: f for track_id, f in features.items() if not f.is_spam}
+    result = TrackSelector(features, is_preferred, SelectionQuotas.default(count)).select(seed=picks)
+
+    selected_ids = {track.id for track in result.tracks}
+    counts["filled"] = sum(track.id not in picks for track in result.tracks)
+    counts["swapped"] = sum(track_id not in selected_ids for track_id in picks)
+    return SelectionRepair(tracks=result.tracks, resolved=len(picks), counts=counts, unmet=result.unmet)
+
+
+class RepairMetrics:
+    """노드별 보정 통계 (스레드 안전)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {
+            "calls": 0, "repaired": 0, "exact": 0, "fuzzy": 0,
+            "dropped": 0, "filled": 0, "swapped": 0, "reinvoked": 0,
+        })
+
+    def record(self, node: str, counts: Dict[str, int], reinvoked: bool = False):
+        with self._lock:
+            stat = self.stats[node]
+            stat["calls"] += 1
+            stat["reinvoked"] += reinvoked
+            stat["repaired"] += any(counts.get(key) for key in ("fuzzy", "dropped", "filled", "swapped"))
+            for key, value in counts.items():
+                stat[key] += value
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {node: dict(stat) for node, stat in self.stats.items()}
+
+
+# 싱글톤 인스턴스
+_repair_metrics = None
+
+def get_repair_metrics() -> RepairMetrics:
+    """보정 통계 싱글톤 인스턴스 반환"""
+    global _repair_metrics
+    if _repair_metrics is None:
+        _repair_metrics = RepairMetrics()
+    return _repair_metrics
+
+
+if __name__ == "__main__":
+    from local_spotify import synthetic_catalog
+
+    tracks = [track for track, _ in synthetic_catalog(60)]
+    resolver = TrackResolver(tracks)
+    refs = [
+        tracks[0].id,                                            # 정확
+        tracks[1].id[:12],                                       # 잘린 ID
+        f"{tracks[2].name} - {tracks[2].get_artist_names()}",    # 제목 - 아티스트
+        "t999",                                                  # 없는 번호
+    ]
+    for ref in refs:
+        print(f"{ref!r} → {resolver.resolve(ref)}")
+
+    repair = repair_selection(refs, resolver, ScoringContext(decibel="quiet", goal="focus", location="library"))
+    print(f"복원 {repair.resolved}곡 → 최종 {len(repair.tracks)}곡, {repair.counts}, 미충족 {repair.unmet}")
@@ -0,0 +1,116 @@
+"""
+페르소나 저장소 - 정규화된 선호 아티스트/장르 집합 → ArtistPersona
+페르소나는 상황(위치/목표/소음)과 무관하므로 긴 TTL로 재사용
+재방문 사용자는 analyze_preference의 LLM 호출을 건너뜀
+키는 입력 이름만으로 결정 (퍼지 해석/학습 상태와 무관하게 같은 입력 → 같은 키)
+PERSONA_PERSIST_PER_USER가 켜져 있으면 키 앞에 user_id를 붙여 사용자별로 저장
+"""
+from typing import List, Optional
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from config import (
+    ARTIST_ALIASES,
+    PERSONA_STORE_PATH,
+    PERSONA_TTL_SECONDS,
+    PERSONA_MAX_ENTRIES,
+    PERSONA_PERSIST_PER_USER,
+)
+from models import ArtistPersona
+from artist_directory import normalize_artist_name
+from local_search import normalize_genre
+
+
+# 정규화 별칭 → 별칭 그룹 대표 (설정의 고정 별칭만 사용, "아이유"/"IU" 같은 키)
+_ALIAS_HEADS = {
+    normalize_artist_name(alias): normalize_artist_name(group[0])
+    for group in ARTIST_ALIASES
+    for alias in group
+}
+
+
+def persona_key(
+    preferred_artists: List[str],
+    preferred_genres: List[str],
+    user_id: Optional[str] = None
+) -> str:
+    """정규화 아티스트 이름(고정 별칭은 대표 이름) + 장르 집합 키 (사용자별 저장 시 user_id 접두)"""
+    artists = sorted({
+        _ALIAS_HEADS.get(normalize_artist_name(name), normalize_artist_name(name))
+        for name in preferred_artists
+    } - {""})
+    genres = sorted({normalize_genre(genre) for genre in preferred_genres})
+    material = json.dumps({"artists": artists, "genres": genres}, ensure_ascii=False)
+    key = hashlib.sha256(material.encode("utf-8")).hexdigest()
+    if PERSONA_PERSIST_PER_USER and user_id:
+        return f"{user_id}:{key}"
+    return key
+
+
+class PersonaStore:
+    """SQLite 기반 페르소나 저장소 (선호 조합 키, 만료/개수 상한 삭제)"""
+
+    def __init__(self, path: str = PERSONA_STORE_PATH, max_entries: int = PERSONA_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS personas (key TEXT PRIMARY KEY, payload TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS personas_created ON personas (created)")
+
+    def get(self, key: str) -> Optional[ArtistPersona]:
+        """페르소나 조회 (TTL 초과 시 None)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload, created FROM personas WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row and time.time() - row[1] <= PERSONA_TTL_SECONDS:
+                try:
+                    persona = ArtistPersona.model_validate_json(row[0])
+                except ValueError:
+                    persona = None
+                if persona is not None:
+                    self.hits += 1
+                    return persona
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, persona: ArtistPersona):
+        """페르소나 저장 후 만료 항목 & 개수 상한 초과분 삭제"""
+        payload = persona.model_dump_json()
+        now = time.time()
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO personas VALUES (?, ?, ?)", (key, payload, now))
+            self._conn.execute("DELETE FROM personas WHERE created < ?", (now - PERSONA_TTL_SECONDS,))
+            count = self._conn.execute("SELECT COUNT(*) FROM personas").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM personas WHERE key IN "
+                    "(SELECT key FROM personas ORDER BY created LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+
+# 싱글톤 인스턴스
+_persona_store = None
+
+def get_persona_store() -> PersonaStore:
+    """페르소나 저장소 싱글톤 인스턴스 반환"""
+    global _persona_store
+    if _persona_store is None:
+        _persona_store = PersonaStore()
+    return _persona_store
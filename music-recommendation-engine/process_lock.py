@@ -0,0 +1,70 @@
+"""
+프로세스 간 단일 실행 잠금 - uvicorn 워커 여러 개 중 한 프로세스만 백그라운드 작업/파일 쓰기를 맡도록
+잠금 파일을 프로세스가 살아있는 동안 점유 (프로세스가 죽으면 OS가 자동 해제)
+"""
+from typing import IO, Optional
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def try_acquire(path: str) -> Optional[IO]:
+    """
+    잠금 파일을 비차단으로 점유
+
+    Returns:
+        점유한 파일 핸들 (release로 해제) 또는 다른 프로세스가 점유 중이면 None
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    handle = open(path, "a+")
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        handle.close()
+        return None
+    return handle
+
+
+def acquire(path: str, timeout: float = 30.0, interval: float = 0.1) -> Optional[IO]:
+    """잠금을 얻을 때까지 대기 (timeout 초과 시 None)"""
+    deadline = time.monotonic() + timeout
+    while True:
+        handle = try_acquire(path)
+        if handle is not None or time.monotonic() >= deadline:
+            return handle
+        time.sleep(interval)
+
+
+def release(handle: Optional[IO]):
+    """점유한 잠금 해제"""
+    if handle is None or handle.closed:
+        return
+    try:
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+        else:
+            handle.seek(0)
+            msvcrt.locking(handle.fileno(), msvcrt.LK_UNLCK, 1)
+    except OSError:
+        pass
+    handle.close()
+
+
+if __name__ == "__main__":
+    import tempfile
+
+    path = os.path.join(tempfile.gettempdir(), "process_lock_demo.lock")
+    first = try_acquire(path)
+    second = try_acquire(path)
+    print(f"첫 번째 점유: {first is not None}, 두 번째 점유: {second is not None}")
+    release(first)
+    print(f"해제 후 다시 점유: {try_acquire(path) is not None}")
@@ -1,8 +1,133 @@
 """
 프롬프트 템플릿 - 우선순위 기반 추천 시스템
 우선순위: 1) 소음도 2) 목표 3) 위치
+
+요청마다 크게 반복되는 프롬프트는 버전 관리되는 PromptTemplate으로 등록
+(지시문/예시/출력 형식 = 바이트 단위로 고정된 접두사, 요청별 값 = 접미사)
+→ 제공자 측 프롬프트 접두사 캐시가 요청 간에 재사용됨
+"""
+from typing import Dict, Optional
+from dataclasses import dataclass, field
+import hashlib
+
+from config import (
+    LOCATIONS,
+    GOALS,
+    DECIBEL_LEVELS,
+    DECIBEL_MUSIC_PROFILES,
+    GOAL_MUSIC_PROFILES,
+    LOCATION_MODIFIERS,
+)
+
+
+@dataclass
+class PromptTemplate:
+    """
+    고정 접두사 + 요청별 접미사 템플릿
+
+    접두사는 format하지 않으므로 중괄호를 그대로 쓰고 요청별 값을 넣으면 안 됨
+    (접두사를 바꾸면 version을 올려 캐시 적중률 변화를 추적)
+    """
+    name: str
+    version: int
+    prefix: str
+    suffix: str
+    prefix_hash: str = field(init=False)
+
+    def __post_init__(self):
+        self.prefix_hash = hashlib.sha256(self.prefix.encode("utf-8")).hexdigest()[:12]
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}@v{self.version}"
+
+    def format(self, **values) -> str:
+        return self.prefix + self.suffix.format(**values)
+
+
+PROMPT_REGISTRY: Dict[str, PromptTemplate] = {}
+
+
+def register_prompt(template: PromptTemplate) -> PromptTemplate:
+    PROMPT_REGISTRY[template.name] = template
+    return template
+
+
+def identify_prompt(text: str) -> Optional[PromptTemplate]:
+    """프롬프트 본문 → 등록된 템플릿 (접두사 일치, 없으면 None)"""
+    for template in PROMPT_REGISTRY.values():
+        if text.startswith(template.prefix):
+            return template
+    return None
+
+
+def prompt_suffix(text: str) -> str:
+    """등록된 템플릿으로 만든 프롬프트면 요청별 접미사만, 아니면 그대로"""
+    template = identify_prompt(text)
+    return text[len(template.prefix):] if template else text
+
+
+# === 상황 프로필 (소음도/목표/위치) ===
+def _render_decibel_profile(decibel: str) -> str:
+    decibel_profile = DECIBEL_MUSIC_PROFILES[decibel]
+    return f"""
+에너지 범위: {decibel_profile['energy_range']}
+볼륨 키워드: {', '.join(decibel_profile['volume_keywords'])}
+피해야 할: {', '.join(decibel_profile['avoid_keywords'])}
+템포 범위: {decibel_profile['tempo_range']} BPM
+보컬 선호: {decibel_profile['vocal_preference']}
+"""
+
+
+def _render_goal_profile(goal: str) -> str:
+    goal_profile = GOAL_MUSIC_PROFILES[goal]
+    return f"""
+설명: {goal_profile['description']}
+분위기: {', '.join(goal_profile['mood'])}
+특성: {', '.join(goal_profile['characteristics'])}
+추천 장르: {', '.join(goal_profile['suggested_genres'])}
+에너지 레벨: {goal_profile['energy_level']}
+피해야 할: {', '.join(goal_profile.get('avoid', []))}
+"""
+
+
+def _render_location_profile(location: str) -> str:
+    location_mod = LOCATION_MODIFIERS[location]
+    return f"""
+분위기: {location_mod['atmosphere']}
+보정: {location_mod['modifier']}
+에너지 조정: {location_mod['adjust_energy']:+.1f}
 """
 
+
+def render_context_profiles(location: str, goal: str, decibel: str) -> Dict[str, str]:
+    """소음도/목표/위치 프로필을 프롬프트용 텍스트로 변환"""
+    return {
+        "decibel_profile": _render_decibel_profile(decibel),
+        "goal_profile": _render_goal_profile(goal),
+        "location_modifier": _render_location_profile(location),
+    }
+
+
+def render_profile_reference() -> str:
+    """모든 소음도/목표/위치 프로필 표 (설정에서만 만들어지므로 요청 간 바이트 단위로 동일)"""
+    sections = [
+        ("소음도 프로필 (1순위)", DECIBEL_LEVELS, _render_decibel_profile),
+        ("목표 프로필 (2순위)", GOALS, _render_goal_profile),
+        ("위치 프로필 (3순위)", LOCATIONS, _render_location_profile),
+    ]
+    lines = ["=== 상황 프로필 표 ==="]
+    for title, keys, render in sections:
+        lines.append(f"\n[{title}]")
+        for key in keys:
+            lines.append(f"- {key}:{render(key).rstrip()}")
+    return "\n".join(lines) + "\n"
+
+
+# 상황 분석/트랙 선택 프롬프트가 공유하는 고정 참고 자료 (접두사에 포함)
+SITUATION_PROFILE_REFERENCE = render_profile_reference()
+
+
 # === 아티스트 페르소나 분석 ===
 ANALYZE_PREFERENCE_PROMPT = """당신은 음악 큐레이터입니다. 사용자가 선호하는 아티스트와 장르를 분석하여 음악 취향 페르소나를 파악하세요.
 
@@ -19,35 +144,21 @@ ANALYZE_PREFERENCE_PROMPT = """당신은 음악 큐레이터입니다. 사용자
 """
 
 # === 상황 분석 및 AI 추천 장르 생성 ===
-CONTEXT_ANALYSIS_PROMPT = """당신은 음악 추천 전문가입니다. 사용자의 상황을 분석하여 최적의 음악 장르를 추천하세요.
+# 지시문/예시/출력 형식은 고정 접두사, 상황 정보와 사용자 취향은 접미사
+CONTEXT_ANALYSIS_PROMPT = register_prompt(PromptTemplate(
+    name="context_analysis",
+    version=3,
+    prefix="""당신은 음악 추천 전문가입니다. 사용자의 상황을 분석하여 최적의 음악 장르를 추천하세요.
 
 추천 우선순위:
 1순위 (최우선): 소음도 → 음악의 가청력과 직결
 2순위: 목표 → 사용자가 하고 싶은 행동
 3순위: 위치 → 장소의 심리적 분위기
 
-=== 상황 정보 ===
-위치: {location}
-목표: {goal}
-소음 레벨: {decibel}
-
-=== 소음도 기반 음악 특성 (1순위) ===
-{decibel_profile}
-
-=== 목표 기반 음악 특성 (2순위) ===
-{goal_profile}
-
-=== 위치 기반 분위기 (3순위) ===
-{location_modifier}
-
-=== 사용자 취향 ===
-선호 장르: {preferred_genres}
-음악 취향: {artist_persona_summary}
-
 AI 추천 장르 생성 규칙:
-1. **소음도가 최우선**: {decibel} 환경에 맞는 에너지/볼륨의 음악
-2. **목표가 두 번째**: {goal} 행동에 적합한 분위기/리듬
-3. **위치는 보조적**: {location}의 심리적 분위기 반영
+1. **소음도가 최우선**: 소음 레벨에 맞는 에너지/볼륨의 음악
+2. **목표가 두 번째**: 목표 행동에 적합한 분위기/리듬
+3. **위치는 보조적**: 위치의 심리적 분위기 반영
 4. **사용자 취향과 타협**: AI 추천 장르와 선호 장르를 적절히 조합
 
 예시 1:
@@ -88,30 +199,113 @@ AI 추천:
   → 소음도 우선, 강한 음압으로 소음 차단하면서도 편안한 "chill electronic" 등
 
 출력 형식:
-{{
+{
   "ai_recommended_genres": ["장르1", "장르2", "장르3", "장르4", "장르5"],
   "reasoning": "소음도/목표/위치를 고려한 추천 이유와 선호 장르와의 타협점 (3-4문장)"
-}}
+}
+
+답변을 JSON 형식으로 출력하세요.
+
+""" + SITUATION_PROFILE_REFERENCE,
+    suffix="""
+=== 상황 정보 ===
+위치: {location}
+목표: {goal}
+소음 레벨: {decibel}
+(각 값의 음악 특성은 위 상황 프로필 표 참고)
+
+=== 사용자 취향 ===
+선호 장르: {preferred_genres}
+음악 취향: {artist_persona_summary}
+"""
+))
+
+# === 선호 분석 + 상황 분석 통합 (단일 LLM 호출) ===
+FUSED_ANALYSIS_PROMPT = """당신은 음악 큐레이터이자 상황 기반 음악 추천 전문가입니다.
+두 단계를 차례로 수행하고 결과를 하나의 JSON으로 출력하세요.
+
+=== 1단계: 사용자 취향 페르소나 분석 ===
+선호 아티스트: {preferred_artists}
+선호 장르: {preferred_genres}
+
+다음을 분석하세요 (persona):
+1. 주요 장르 (최대 3개): 선호 아티스트와 선호 장르를 모두 고려
+2. 음악 특성 (3-5개): 템포, 분위기, 악기 구성 등
+3. 유사 아티스트 (3-5명): 비슷한 스타일의 다른 아티스트
+4. 종합 분석 (2-3문장): 사용자의 음악 취향 요약
+
+=== 2단계: 상황 분석 및 AI 추천 장르 (genre_recommendation) ===
+추천 우선순위:
+1순위 (최우선): 소음도 → 음악의 가청력과 직결
+2순위: 목표 → 사용자가 하고 싶은 행동
+3순위: 위치 → 장소의 심리적 분위기
+
+상황 정보: 위치 {location} / 목표 {goal} / 소음 레벨 {decibel}
+
+소음도 기반 음악 특성 (1순위):
+{decibel_profile}
+목표 기반 음악 특성 (2순위):
+{goal_profile}
+위치 기반 분위기 (3순위):
+{location_modifier}
+
+AI 추천 장르 생성 규칙:
+1. **소음도가 최우선**: {decibel} 환경에 맞는 에너지/볼륨의 음악
+2. **목표가 두 번째**: {goal} 행동에 적합한 분위기/리듬
+3. **위치는 보조적**: {location}의 심리적 분위기 반영
+4. **사용자 취향과 타협**: 1단계 페르소나와 선호 장르를 고려하되 상황에 맞지 않으면 대체
+   (예: sleep + metal 선호 → "ambient", "acoustic"로 대체)
+
+genre_recommendation 출력:
+- ai_recommended_genres: 장르 5개
+- reasoning: 소음도/목표/위치를 고려한 추천 이유와 선호 장르와의 타협점 (3-4문장)
+
+답변을 JSON 형식으로 출력하세요.
+"""
+
+# === 상황 분석 테이블 생성 (사용자 취향 없이 상황 조합만) ===
+CONTEXT_TABLE_PROMPT = """당신은 음악 추천 전문가입니다. 주어진 상황에 가장 잘 맞는 음악 장르를 적합도 순으로 정리하세요.
+
+추천 우선순위:
+1순위 (최우선): 소음도 → 음악의 가청력과 직결
+2순위: 목표 → 사용자가 하고 싶은 행동
+3순위: 위치 → 장소의 심리적 분위기
+
+=== 상황 정보 ===
+위치: {location}
+목표: {goal}
+소음 레벨: {decibel}
+
+=== 소음도 기반 음악 특성 (1순위) ===
+{decibel_profile}
+
+=== 목표 기반 음악 특성 (2순위) ===
+{goal_profile}
+
+=== 위치 기반 분위기 (3순위) ===
+{location_modifier}
+
+생성 규칙:
+1. genres: 이 상황에 맞는 장르 8개, 가장 적합한 것부터
+2. avoid_genres: 이 상황에서 피해야 할 장르 (예: quiet + sleep → metal, edm)
+3. reasoning: 소음도/목표/위치를 고려한 추천 이유 (2-3문장)
+
+사용자 취향은 요청 시점에 별도로 반영되므로 상황만 고려하세요.
 
 답변을 JSON 형식으로 출력하세요.
 """
 
 # === 검색 쿼리 생성 (Spotify 필터 문법 활용) ===
-SEARCH_QUERY_PROMPT = """당신은 Spotify Web API /v1/search 의 q 파라미터에 들어갈 "검색 쿼리"만 생성하는 시스템입니다.
+# 문법/규칙/예시는 고정 접두사, 추천 장르와 사용자 상황은 접미사
+SEARCH_QUERY_PROMPT = register_prompt(PromptTemplate(
+    name="search_query",
+    version=2,
+    prefix="""당신은 Spotify Web API /v1/search 의 q 파라미터에 들어갈 "검색 쿼리"만 생성하는 시스템입니다.
 
 목표:
-- 아래 사용자 상황과 AI 추천 장르를 활용해 Spotify Search API에서 노이즈가 적고 재현 가능한 트랙 검색 쿼리 8개를 만드세요.
+- 마지막에 주어지는 사용자 상황과 AI 추천 장르를 활용해 Spotify Search API에서 노이즈가 적고 재현 가능한 트랙 검색 쿼리 8개를 만드세요.
 - Spotify Search API q 문법을 적절히 섞어 사용하세요.
 
-입력: 
-AI 추천 장르: {ai_genres}
-추천 이유: {ai_reasoning}
-
-사용자 상황:
-- 소음: {decibel}
-- 목표: {goal}
-- 위치: {location}
-
 [중요: 금지 규칙]
 - 절대로 아래를 쿼리에 포함하지 마세요: energy:, tempo:, valence:, danceability:, acousticness:, liveness:, speechiness:, instrumentalness:
   (이들은 Search 쿼리 문법이 아니라 오디오 특성값이므로 무효입니다.)
@@ -135,7 +329,7 @@ AI 추천 장르: {ai_genres}
 [쿼리 생성 규칙]
 - 총 8개의 쿼리 생성
 - 각 쿼리는 "필드 필터"를 최소 2개 이상 포함해야 함 (예: genre + year, 또는 genre + artist 등)
-- 8개 중 5개는 AI 추천 장르({ai_genres})를 우선 사용
+- 8개 중 5개는 AI 추천 장르를 우선 사용
 - 8개 중 3개는 한국 음악(genre:"k-pop" / genre:"k-indie" / K-hip-hop 또는 한국 아티스트 artist:) 중심
 - year 범위는 다양하게 섞기 (예: 2021-2025, 2022-2025, 2023-2025, 2024-2025)
 
@@ -168,25 +362,40 @@ AI 추천 장르: {ai_genres}
 
 
 출력 형식:
-{{
+{
   "queries": [
-    {{
+    {
       "query": "genre:lo-fi year:2023-2025",
       "rationale": "최신 로파이 음악 검색 (Spotify 필터 활용)"
-    }},
+    },
     ...
   ]
-}}
+}
+""",
+    suffix="""
+입력: 
+AI 추천 장르: {ai_genres}
+추천 이유: {ai_reasoning}
+
+사용자 상황:
+- 소음: {decibel}
+- 목표: {goal}
+- 위치: {location}
 """
+))
 
 # === 최종 트랙 선택 (10곡, 한국 노래 50%, 인기도 분포) ===
-SELECTION_PROMPT = """10곡을 선택하세요.
+# 선택 기준/비율/규칙/출력 형식은 고정 접두사, 상황과 후보 목록은 접미사
+SELECTION_PROMPT = register_prompt(PromptTemplate(
+    name="selection",
+    version=3,
+    prefix="""10곡을 선택하세요.
 
 선택 기준 (우선순위 순):
-1. **소음도 적합성** ({decibel}): 가장 중요!
-2. **목표 적합성** ({goal}): 두 번째로 중요
-3. **위치 분위기** ({location}): 보조적
-4. **AI 추천 장르 일치**: {ai_genres}
+1. **소음도 적합성**: 가장 중요!
+2. **목표 적합성**: 두 번째로 중요
+3. **위치 분위기**: 보조적
+4. **AI 추천 장르 일치**
 
 필수 비율 (10곡 기준):
 - **선호 아티스트**: 20% (2곡) 필수
@@ -202,20 +411,6 @@ SELECTION_PROMPT = """10곡을 선택하세요.
 - 괄호 안 설명 (예: "(Lofi)", "(Study)", "(Relax)")
 - 플레이리스트/컬렉션 (예: "BEST", "모음", "Playlist")
 
-사용자 상황:
-- 소음: {decibel}
-- 목표: {goal}
-- 위치: {location}
-
-AI 추천 장르: {ai_genres}
-선호 아티스트: {preferred_artists}
-
-후보 트랙 ({num_candidates}곡):
-{candidate_tracks_info}
-
-선호 아티스트의 곡 ({num_preference}곡):
-{preference_tracks_info}
-
 필수 규칙:
 1. 정확히 10곡 선택
 2. 선호 아티스트 2곡 (20%)
@@ -223,6 +418,7 @@ AI 추천 장르: {ai_genres}
 4. 인기도 고르게 분포: 높음 4곡, 중간 4곡, 낮음 2곡
 5. 키워드 스팸 제목 절대 선택 금지
 6. 신곡 2곡 이상 (2021-2025)
+7. 아래 후보 목록에 있는 트랙 번호(t1, t2 ...)만 사용
 
 선택 과정:
 1. 키워드 스팸 트랙 제외
@@ -233,16 +429,35 @@ AI 추천 장르: {ai_genres}
 6. 다양성 확보
 
 출력 형식:
-{{
+{
   "selected_tracks": [
-    {{
-      "track_id": "트랙ID",
+    {
+      "track_id": "트랙 번호 (예: t3)",
       "selection_reason": "선택 이유 (한국 노래/선호 아티스트/인기도/신곡 여부 명시)"
-    }},
+    },
     ...
   ]
-}}
+}
+
+소음도/목표/위치 적합성은 아래 상황 프로필 표로 판단하세요.
+
+""" + SITUATION_PROFILE_REFERENCE,
+    suffix="""
+사용자 상황:
+- 소음: {decibel}
+- 목표: {goal}
+- 위치: {location}
+
+AI 추천 장르: {ai_genres}
+선호 아티스트: {preferred_artists}
+
+후보 트랙 ({num_candidates}곡):
+{candidate_tracks_info}
+
+선호 아티스트의 곡 ({num_preference}곡):
+{preference_tracks_info}
 """
+))
 
 # === 품질 검증 (10곡, 한국 노래, 인기도 분포) ===
 QUALITY_VALIDATOR_PROMPT = """추천 결과의 품질을 검증하세요.
@@ -303,7 +518,7 @@ AI 추천 장르: {ai_genres}
 출력 형식:
 {{
   "recommendations": [
-    {{"track_id": "ID", "reason": "이유"}},
+    {{"track_id": "트랙 번호 (예: t3)", "reason": "이유"}},
     ...
   ]
 }}
@@ -366,8 +581,12 @@ def format_tracks_for_prompt(tracks: list) -> str:
 
 
 if __name__ == "__main__":
+    from track_encoding import estimate_tokens
+
     print("=== 우선순위 기반 프롬프트 시스템 ===")
     print("1순위: 소음도")
     print("2순위: 목표")
     print("3순위: 위치")
-    print("선호 아티스트: 20% 필수 포함")
\ No newline at end of file
+    print("선호 아티스트: 20% 필수 포함")
+    for template in PROMPT_REGISTRY.values():
+        print(f"{template.key}: 접두사 {template.prefix_hash} (약 {estimate_tokens(template.prefix)} 토큰)")
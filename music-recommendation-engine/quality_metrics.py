@@ -0,0 +1,121 @@
+"""
+품질 지표 - 선택된 트랙의 다양성/선호 아티스트/한국 노래/신곡/인기도 분포 계산
+부족분은 기계 판독용 피드백 코드로 변환 (예: "korean:+2", "recent:+1")
+지표와 QUALITY_THRESHOLDS만으로 QualityValidation 생성 (LLM 검증 대체)
+"""
+from typing import Callable, Dict, List, Tuple
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+import math
+
+from config import (
+    QUALITY_THRESHOLDS,
+    POPULARITY_DISTRIBUTION,
+    RECENT_YEARS,
+)
+from models import SpotifyTrack, QualityValidation, PopularityDistribution
+from track_utils import get_popularity_level, is_korean_track, parse_release_date
+
+
+@dataclass
+class QualityMetrics:
+    """선택 결과 품질 지표"""
+    track_count: int
+    unique_artists: int
+    preferred_count: int
+    korean_count: int
+    recent_count: int
+    popularity: Dict[str, int] = field(default_factory=lambda: {"high": 0, "medium": 0, "low": 0})
+
+    @property
+    def diversity_score(self) -> float:
+        return self.unique_artists / self.track_count if self.track_count else 0.0
+
+    @property
+    def preferred_ratio(self) -> float:
+        return self.preferred_count / self.track_count if self.track_count else 0.0
+
+
+def compute_quality_metrics(tracks: List[SpotifyTrack], is_preferred: Callable) -> QualityMetrics:
+    """
+    품질 지표 계산
+
+    Args:
+        tracks: 선택된 트랙
+        is_preferred: 아티스트 → 선호 아티스트 여부
+    """
+    cutoff_date = datetime.now() - timedelta(days=RECENT_YEARS * 365)
+    metrics = QualityMetrics(
+        track_count=len(tracks),
+        unique_artists=len({artist.name for track in tracks for artist in track.artists}),
+        preferred_count=sum(1 for track in tracks for artist in track.artists if is_preferred(artist)),
+        korean_count=sum(1 for track in tracks if is_korean_track(track)),
+        recent_count=0,
+    )
+    for track in tracks:
+        release_date = parse_release_date(track.release_date)
+        if release_date and release_date >= cutoff_date:
+            metrics.recent_count += 1
+        metrics.popularity[get_popularity_level(track.popularity)] += 1
+    return metrics
+
+
+def required_count(ratio: float, count: int) -> int:
+    """비율 기준을 만족하는 최소 곡 수 (부동소수점 오차 보정)"""
+    return math.ceil(ratio * count - 1e-9)
+
+
+def shortfall_codes(metrics: QualityMetrics) -> List[str]:
+    """기준 대비 부족분 피드백 코드 ("지표:+부족 곡 수")"""
+    codes = []
+    count = metrics.track_count
+
+    korean_gap = QUALITY_THRESHOLDS["min_korean_tracks"] - metrics.korean_count
+    if korean_gap > 0:
+        codes.append(f"korean:+{korean_gap}")
+
+    recent_gap = QUALITY_THRESHOLDS["min_recent_tracks"] - metrics.recent_count
+    if recent_gap > 0:
+        codes.append(f"recent:+{recent_gap}")
+
+    preferred_gap = required_count(QUALITY_THRESHOLDS["min_preferred_ratio"], count) - metrics.preferred_count
+    if preferred_gap > 0:
+        codes.append(f"preferred:+{preferred_gap}")
+
+    diversity_gap = required_count(QUALITY_THRESHOLDS["min_diversity"], count) - metrics.unique_artists
+    if diversity_gap > 0:
+        codes.append(f"diversity:+{diversity_gap}")
+
+    for level, spec in POPULARITY_DISTRIBUTION.items():
+        gap = spec["count"] - metrics.popularity[level]
+        if gap > 0:
+            codes.append(f"popularity_{level}:+{gap}")
+
+    return codes
+
+
+HARD_METRICS = ("korean", "recent", "preferred", "diversity")  # 통과 여부를 결정하는 지표 (인기도는 재검색 참고용)
+
+
+def validate_metrics(metrics: QualityMetrics) -> QualityValidation:
+    """지표 → QualityValidation (필수 지표 부족분이 없으면 통과, 피드백은 부족분 코드)"""
+    codes = shortfall_codes(metrics)
+    hard_codes = [code for code in codes if parse_code(code)[0] in HARD_METRICS]
+    return QualityValidation(
+        is_valid=not hard_codes,
+        diversity_score=round(metrics.diversity_score, 3),
+        preferred_artist_ratio=round(metrics.preferred_ratio, 3),
+        recent_tracks_count=metrics.recent_count,
+        korean_tracks_count=metrics.korean_count,
+        popularity_distribution=PopularityDistribution(**metrics.popularity),
+        feedback=", ".join(codes) if hard_codes else None,
+    )
+
+
+def parse_code(code: str) -> Tuple[str, int]:
+    """피드백 코드 → (지표, 부족 곡 수)"""
+    metric, _, amount = code.partition(":")
+    try:
+        return metric, int(amount)
+    except ValueError:
+        return metric, 1
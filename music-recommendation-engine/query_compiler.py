@@ -0,0 +1,141 @@
+"""
+검색 쿼리 컴파일러 - AI 추천 장르 + 상황 프로필 + 쿼터 + 검증 피드백 코드로
+Spotify 필터 문법 쿼리 8개를 결정적으로 생성 (search_query_generator LLM 대체)
+
+슬롯 구성 (기본):
+- 한국 음악: 한국 장르 변형 + 최근 연도
+- 신곡: 좁은 최근 연도 범위
+- 인기도 계층: 연도 없음(인기곡) / 이전 연도(중간) / 분위기 키워드(비주류)
+"""
+from typing import Dict, List, Optional
+from datetime import datetime
+
+from config import (
+    DECIBEL_MUSIC_PROFILES,
+    GOAL_MUSIC_PROFILES,
+    KOREAN_TRACK_RATIO,
+    RECENT_TRACK_RATIO,
+    RECENT_YEARS,
+    KOREAN_GENRE_MAP,
+    QUERY_COMPILER_COUNT,
+)
+from models import SearchQuery
+from local_search import normalize_genre
+from quality_metrics import parse_code
+
+
+def korean_genre(genre: str) -> str:
+    """장르 → 한국 장르 변형 (매핑이 없으면 k-pop)"""
+    key = normalize_genre(genre)
+    if key.startswith("k "):
+        return genre
+    for source, target in KOREAN_GENRE_MAP.items():
+        if normalize_genre(source) in key:
+            return target
+    return "k-pop"
+
+
+def _slot_counts(count: int, codes: List[str]) -> Dict[str, int]:
+    """쿼터 비율로 기본 슬롯 배분 후 피드백 코드만큼 이동"""
+    korean = max(1, round(count * KOREAN_TRACK_RATIO) - 1)
+    recent = max(1, round(count * RECENT_TRACK_RATIO))
+    slots = {"korean": korean, "recent": recent, "preferred": 0, "strata": count - korean - recent}
+
+    # 선호 아티스트 → 한국 → 신곡 순으로 인기도 계층 슬롯을 가져감 (코드당 최대 2개)
+    for metric in ("preferred", "korean", "recent"):
+        for code in codes:
+            name, amount = parse_code(code)
+            if name == metric:
+                moved = min(amount, 2, slots["strata"])
+                slots[metric] += moved
+                slots["strata"] -= moved
+    return slots
+
+
+def compile_queries(
+    ai_genres: List[str],
+    decibel: str,
+    goal: str,
+    preferred_artists: Optional[List[str]] = None,
+    codes: Optional[List[str]] = None,
+    iteration: int = 0,
+    count: int = QUERY_COMPILER_COUNT
+) -> List[SearchQuery]:
+    """
+    쿼리 생성
+
+    Args:
+        ai_genres: AI 추천 장르
+        decibel / goal: 상황 (분위기 키워드 선택용)
+        preferred_artists: 선호 아티스트 (preferred 부족 코드가 있을 때만 사용)
+        codes: 품질 검증 피드백 코드
+        iteration: 재시도 회차 (장르 순환 & 연도 구간 이동으로 다른 결과 유도)
+
+    Returns:
+        SearchQuery 리스트 (중복 없음)
+    """
+    codes = codes or []
+    genres = ai_genres or GOAL_MUSIC_PROFILES[goal]["suggested_genres"]
+    genres = genres[iteration % len(genres):] + genres[:iteration % len(genres)]
+    metrics = {parse_code(code)[0] for code in codes}
+
+    this_year = datetime.now().year
+    recent_start = this_year - RECENT_YEARS + 1
+    narrow_start = this_year - 1 - iteration % 2
+    moods = DECIBEL_MUSIC_PROFILES[decibel]["volume_keywords"][:1] + GOAL_MUSIC_PROFILES[goal]["mood"]
+    mood = moods[iteration % len(moods)]
+
+    slots = _slot_counts(count, codes)
+    queries: List[SearchQuery] = []
+
+    def add(query: str, rationale: str):
+        if all(q.query != query for q in queries):
+            queries.append(SearchQuery(query=query, rationale=rationale))
+
+    # 선호 아티스트 보강 (preferred 부족 시)
+    for artist in (preferred_artists or [])[:slots["preferred"]]:
+        add(f'artist:"{artist}" year:{recent_start}-{this_year}', "선호 아티스트 신곡 보강")
+
+    # 한국 음악 (신곡 쿼터와 겹치도록 최근 연도)
+    for i in range(slots["korean"]):
+        genre = korean_genre(genres[i % len(genres)])
+        start = recent_start if i % 2 == 0 else narrow_start
+        add(f'genre:"{genre}" year:{start}-{this_year}', f"한국 음악 ({genre})")
+
+    # 신곡 (좁은 연도 범위)
+    for i in range(slots["recent"]):
+        genre = genres[(i + 1) % len(genres)]
+        add(f'genre:"{genre}" year:{narrow_start}-{this_year}', f"최신 {genre}")
+
+    # 인기도 계층: 부족한 계층을 먼저
+    strata = ["high", "medium", "low"]
+    strata.sort(key=lambda level: f"popularity_{level}" not in metrics)
+    older_start = recent_start - 10 + iteration
+    for i in range(slots["strata"]):
+        genre = genres[i % len(genres)]
+        level = strata[i % len(strata)]
+        if level == "high":
+            add(f'genre:"{genre}"', f"{genre} 대표 인기곡")
+        elif level == "medium":
+            add(f'genre:"{genre}" year:{older_start}-{recent_start - 1}', f"{genre} 스테디셀러")
+        else:
+            add(f'genre:"{genre}" {mood}', f"{genre} + 분위기 키워드 ({mood})")
+
+    # 중복으로 모자라면 남은 장르로 채움
+    for genre in genres:
+        if len(queries) >= count:
+            break
+        add(f'genre:"{genre}" year:{recent_start}-{this_year}', f"{genre} 보충")
+
+    return queries[:count]
+
+
+if __name__ == "__main__":
+    for query in compile_queries(["lo-fi", "ambient", "instrumental", "classical", "jazz"], "quiet", "focus"):
+        print(f"{query.query:45s} # {query.rationale}")
+    print()
+    for query in compile_queries(
+        ["lo-fi", "ambient", "instrumental", "classical", "jazz"], "quiet", "focus",
+        preferred_artists=["IU"], codes=["korean:+2", "preferred:+1", "popularity_low:+1"], iteration=1
+    ):
+        print(f"{query.query:45s} # {query.rationale}")
@@ -0,0 +1,163 @@
+"""
+추천 이유 캐시 - (트랙 ID, 상황 키, 페르소나 클러스터, 선호 아티스트 여부) → 추천 이유
+같은 상황의 인기곡은 사용자마다 거의 같은 이유를 받으므로 재사용
+캐시에 없는 곡만 LLM 한 번에 묶어 요청하고, 템플릿 이유는 트랙 특성 + 상황 프로필 키워드로 조합
+"""
+from typing import Dict, Iterable, Optional
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from config import (
+    GOAL_MUSIC_PROFILES,
+    LOCATION_MODIFIERS,
+    REASON_CACHE_PATH,
+    REASON_CACHE_TTL_SECONDS,
+    REASON_CACHE_MAX_ENTRIES,
+    REASON_PERSONA_CLUSTER_GENRES,
+)
+from models import ArtistPersona
+from local_search import normalize_genre
+
+
+def persona_cluster(persona: Optional[ArtistPersona]) -> str:
+    """페르소나 클러스터 (정규화한 주요 장르 상위 N개, 없으면 general)"""
+    if persona is None or not persona.dominant_genres:
+        return "general"
+    genres = sorted({normalize_genre(g) for g in persona.dominant_genres[:REASON_PERSONA_CLUSTER_GENRES]})
+    return "+".join(genres)
+
+
+def reason_key(track_id: str, location: str, goal: str, decibel: str, cluster: str, is_preferred: bool) -> str:
+    """캐시 키 (선호 아티스트 곡은 "당신이 좋아하는" 문구가 들어가므로 구분)"""
+    return f"{track_id}|{location}|{goal}|{decibel}|{cluster}|{int(is_preferred)}"
+
+
+# === 템플릿 이유 ===
+
+_DECIBEL_PHRASES = {
+    "quiet": ["조용한 공간을 방해하지 않는 잔잔한 사운드", "작은 볼륨에서도 또렷한 부드러운 사운드"],
+    "moderate": ["적당한 주변 소음과 자연스럽게 어우러지는 사운드", "편하게 흘려 듣기 좋은 균형 잡힌 사운드"],
+    "loud": ["시끄러운 주변 소음을 뚫고 들리는 힘 있는 사운드", "소음 속에서도 존재감이 확실한 강렬한 사운드"],
+}
+_POPULARITY_NOUNS = {"high": "인기곡", "medium": "스테디셀러", "low": "숨은 명곡"}
+
+
+def _has_batchim(word: str) -> bool:
+    last = word[-1] if word else ""
+    return "가" <= last <= "힣" and (ord(last) - ord("가")) % 28 != 0
+
+
+def template_reason(
+    seed: str,
+    artist: str,
+    location: str,
+    goal: str,
+    decibel: str,
+    is_preferred: bool = False,
+    is_korean: bool = False,
+    is_recent: bool = False,
+    popularity_level: str = "medium"
+) -> str:
+    """
+    트랙 특성(선호/한국/신곡/인기도) + 소음도·목표·위치 키워드로 2문장 이유 조합
+
+    Args:
+        seed: 문구 변형 선택용 문자열 (트랙 ID 등 - 같은 곡은 항상 같은 문구)
+    """
+    variant = int(hashlib.md5(seed.encode("utf-8")).hexdigest(), 16)
+    phrases = _DECIBEL_PHRASES[decibel]
+    sound = phrases[variant % len(phrases)]
+    modifier = LOCATION_MODIFIERS[location]["modifier"]
+
+    reason = f"{sound}로, {GOAL_MUSIC_PROFILES[goal]['description']}으로 잘 어울립니다."
+    recency = "최신 " if is_recent else ""
+    if is_preferred:
+        reason += f" 당신이 좋아하는 {artist}의 {recency}곡이라 {modifier} 분위기를 만들어줍니다."
+    else:
+        noun = ("한국 " if is_korean else "") + _POPULARITY_NOUNS.get(popularity_level, "곡")
+        copula = "이라" if _has_batchim(noun) else "라"
+        reason += f" {artist}의 {recency}{noun}{copula} {modifier} 분위기를 더해줍니다."
+    return reason
+
+
+class ReasonCache:
+    """SQLite 기반 추천 이유 캐시 (TTL, 개수 상한, 스레드 안전)"""
+
+    def __init__(self, path: str = REASON_CACHE_PATH, max_entries: int = REASON_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS reasons (key TEXT PRIMARY KEY, reason TEXT NOT NULL, created REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS reasons_created ON reasons (created)")
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        """여러 키 조회 (TTL 이내 항목만)"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, reason FROM reasons WHERE key IN ({placeholders}) AND created >= ?",
+                (*keys, time.time() - REASON_CACHE_TTL_SECONDS)
+            ).fetchall()
+            found = dict(rows)
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, reasons: Dict[str, str]):
+        """여러 이유 저장 후 만료 항목 & 개수 상한 초과분 삭제"""
+        if not reasons:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO reasons VALUES (?, ?, ?)",
+                [(key, reason, now) for key, reason in reasons.items()]
+            )
+            self._conn.execute("DELETE FROM reasons WHERE created < ?", (now - REASON_CACHE_TTL_SECONDS,))
+            count = self._conn.execute("SELECT COUNT(*) FROM reasons").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM reasons WHERE key IN "
+                    "(SELECT key FROM reasons ORDER BY created LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def report(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+
+# 싱글톤 인스턴스
+_reason_cache = None
+
+def get_reason_cache() -> ReasonCache:
+    """추천 이유 캐시 싱글톤 인스턴스 반환"""
+    global _reason_cache
+    if _reason_cache is None:
+        _reason_cache = ReasonCache()
+    return _reason_cache
+
+
+if __name__ == "__main__":
+    for level in ("high", "medium", "low"):
+        print(template_reason("0VjIjW4GlUZAMYd2vXMi3b", "IU", "library", "focus", "quiet", is_korean=True, popularity_level=level))
+    print(template_reason("3AJwUDP919kvQ9QcozQPxg", "IU", "cafe", "relax", "moderate", is_preferred=True, is_recent=True))
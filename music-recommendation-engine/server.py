@@ -12,7 +12,10 @@ from config import (
     DECIBEL_LEVELS,
     AVAILABLE_GENRES,
     SCENARIO_PRESETS,
-    PREFERRED_ARTIST_TRACK_RATIO
+    PREFERRED_ARTIST_TRACK_RATIO,
+    GENRE_POOL_ENABLED,
+    NODE_MODES,
+    NODE_MODE_CHOICES
 )
 from models import (
     RecommendationRequest,
@@ -20,6 +23,19 @@ from models import (
     TrackRecommendation
 )
 from graph import run_recommendation
+from nodes import is_preferred_artist
+from track_store import get_track_store
+from catalog_snapshot import write_snapshot
+from genre_pools import get_genre_pools
+from artist_directory import get_artist_directory
+from artist_graph import get_artist_graph
+from llm_cache import get_llm_cache
+from llm_router import get_llm_router
+from llm_runtime import get_llm_runtime
+from output_repair import get_repair_metrics
+from reason_cache import get_reason_cache
+from usage_ledger import get_usage_metrics
+from context_table import get_context_table
 
 app = FastAPI(
     title="상황 기반 음악 추천 API",
@@ -40,6 +56,14 @@ app.add_middleware(
 async def startup_event():
     try:
         validate_config()
+        if GENRE_POOL_ENABLED:
+            if get_genre_pools().start():
+                print("🔄 장르 풀 백그라운드 갱신 시작")
+            else:
+                print("📂 장르 풀: 다른 워커가 갱신 중 → 공유 파일 사용")
+        if NODE_MODES.get("context_analysis") == "table" and not get_context_table().is_current():
+            # 워커마다 168개 조합을 생성하지 않도록 생성은 오프라인에서 한 번만
+            print("⚠️ 상황 테이블 없음/구버전 → 빠진 조합은 LLM 분석 (python context_table.py 로 생성)")
         print("✅ 서버 시작 완료")
         print(f"🎯 우선순위: 1)소음 2)목표 3)위치")
         print(f"⭐ 선호 아티스트: {PREFERRED_ARTIST_TRACK_RATIO*100}% 필수")
@@ -48,6 +72,22 @@ async def startup_event():
         raise
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    get_genre_pools().stop()
+    get_artist_directory().save()
+    get_artist_graph().save()
+    
+    # 새로 수집된 트랙이 있으면 카탈로그 스냅샷 갱신 (워커들이 잠금을 잡고 차례로 병합 저장)
+    store = get_track_store()
+    if store.new_track_count() > 0:
+        try:
+            count = write_snapshot(store)
+            print(f"💾 카탈로그 스냅샷 저장: {count}곡")
+        except Exception as e:
+            print(f"❌ 카탈로그 스냅샷 저장 오류: {str(e)}")
+
+
 @app.get("/")
 async def root():
     return {
@@ -68,7 +108,12 @@ async def root():
             "POST /recommend": "음악 추천",
             "GET /contexts": "컨텍스트 조회",
             "GET /genres": "장르 목록",
-            "GET /scenarios": "시나리오 프리셋"
+            "GET /scenarios": "시나리오 프리셋",
+            "GET /llm-cache": "LLM 응답 캐시 통계",
+            "GET /llm-tiers": "LLM 티어별 호출/지연/토큰 통계",
+            "GET /llm-usage": "노드별 LLM 토큰/비용 누적 & 요청당 토큰 분포",
+            "GET /llm-runtime": "노드별 LLM 대기열 대기 시간 & 레이트 리밋/일시적 오류 재시도",
+            "GET /llm-repairs": "노드별 구조화 출력 보정 통계"
         }
     }
 
@@ -135,9 +180,9 @@ async def get_scenarios():
 
 
 @app.post("/recommend", response_model=RecommendationResponse)
-async def recommend_music(request: RecommendationRequest):
+def recommend_music(request: RecommendationRequest):
     """
-    음악 추천 실행
+    음악 추천 실행 (동기 그래프 실행이 이벤트 루프를 막지 않도록 스레드풀에서 실행되는 def 엔드포인트)
     
     우선순위:
     1. 소음도 (decibel) - 가청력과 직결
@@ -170,6 +215,13 @@ async def recommend_music(request: RecommendationRequest):
                 detail="최소 1명의 선호 아티스트가 필요합니다."
             )
         
+        for node, mode in (request.node_modes or {}).items():
+            if mode not in NODE_MODE_CHOICES.get(node, []):
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"유효하지 않은 노드 실행 방식입니다. 가능: {NODE_MODE_CHOICES}"
+                )
+        
         # 추천 실행
         print(f"\n{'='*60}")
         print(f"📋 추천 요청")
@@ -183,16 +235,22 @@ async def recommend_music(request: RecommendationRequest):
             goal=request.goal,
             decibel=request.decibel,
             preferred_artists=request.preferred_artists,
-            preferred_genres=request.preferred_genres
+            preferred_genres=request.preferred_genres,
+            user_id=request.user_id,
+            node_modes=request.node_modes
         )
         
         # 응답 생성
         recommendations = []
-        preferred_set = set(request.preferred_artists)
+        # 🆕 입력 이름 또는 해석된 아티스트 ID 기준 (표기가 달라도 ⭐ 표시)
+        preferred = {
+            "preferred_artists": request.preferred_artists,
+            "preferred_artist_ids": result["preferred_artist_ids"]
+        }
         
         for track in result["final_tracks"]:
             is_preferred = any(
-                artist.name in preferred_set
+                is_preferred_artist(artist, preferred)
                 for artist in track.artists
             )
             
@@ -248,7 +306,9 @@ async def recommend_music(request: RecommendationRequest):
             context_summary=context_summary,
             ai_recommended_genres=result["ai_recommended_genres"],
             iteration_count=result["iteration_count"],
-            quality_scores=quality_scores
+            quality_scores=quality_scores,
+            llm_usage=result["llm_usage"],
+            degraded=bool(result["llm_usage"]["degraded_nodes"])
         )
     
     except HTTPException:
@@ -263,6 +323,36 @@ async def recommend_music(request: RecommendationRequest):
         )
 
 
+@app.get("/llm-cache")
+async def llm_cache_stats():
+    """노드별 LLM 응답 캐시 적중률 & 절약 시간 (+ 추천 이유 캐시)"""
+    return {"nodes": get_llm_cache().report(), "reasons": get_reason_cache().report()}
+
+
+@app.get("/llm-tiers")
+async def llm_tier_stats():
+    """LLM 티어별 호출 수 / 평균 지연 / 토큰 사용량 & 노드별 지연 EWMA"""
+    return get_llm_router().report()
+
+
+@app.get("/llm-usage")
+async def llm_usage_stats():
+    """노드별 LLM 토큰/지연/비용 누적 & 요청당 토큰 분포 (토큰 상한 초과 요청 수 포함)"""
+    return get_usage_metrics().report()
+
+
+@app.get("/llm-runtime")
+async def llm_runtime_stats():
+    """동시 호출 상한, 진행 중 호출 수, 노드별 대기열 대기 시간 & 레이트 리밋/일시적 오류 재시도"""
+    return get_llm_runtime().report()
+
+
+@app.get("/llm-repairs")
+async def llm_repair_stats():
+    """노드별 구조화 출력 보정 (정확/유사 복원, 제외, 빈 자리 채움, 쿼터 교체, LLM 재호출)"""
+    return get_repair_metrics().report()
+
+
 @app.get("/health")
 async def health_check():
     return {
@@ -11,9 +11,17 @@ from concurrent.futures import ThreadPoolExecutor
 from config import (
     SPOTIFY_CLIENT_ID,
     SPOTIFY_CLIENT_SECRET,
-    CANDIDATE_TRACKS_COUNT
+    CANDIDATE_TRACKS_COUNT,
+    LOCAL_SEARCH_ENABLED,
+    SPOTIFY_BACKEND
 )
 from models import SpotifyTrack, SpotifyArtist
+from track_utils import song_fingerprint
+from track_store import get_track_store
+from local_search import extract_genres, get_local_search_engine
+from artist_directory import get_artist_directory
+from artist_graph import get_artist_graph
+from local_spotify import LocalSpotifyClient
 
 
 class SpotifyClient:
@@ -27,22 +35,36 @@ class SpotifyClient:
         )
         self.sp = spotipy.Spotify(auth_manager=auth_manager)
         self.executor = ThreadPoolExecutor(max_workers=5)
+        self.track_store = get_track_store()
+        self.local_search = get_local_search_engine() if LOCAL_SEARCH_ENABLED else None
+        self.artist_directory = get_artist_directory()
+        self.track_store.subscribe(self.artist_directory)
+        self.artist_graph = get_artist_graph()
+        self.track_store.subscribe(self.artist_graph)
     
     def search_tracks(
         self,
         query: str,
-        limit: int = 10
+        limit: int = 10,
+        use_local: bool = True
     ) -> List[SpotifyTrack]:
         """
-        트랙 검색
+        트랙 검색 (로컬 카탈로그 우선, 부족분만 Spotify 검색)
         
         Args:
             query: 검색 쿼리
             limit: 결과 개수
+            use_local: False면 로컬 카탈로그를 건너뛰고 Spotify만 검색
         
         Returns:
             검색된 트랙 리스트
         """
+        local_tracks = []
+        if self.local_search is not None and use_local:
+            local_tracks = self.local_search.search_tracks(query, limit)
+            if len(local_tracks) >= limit:
+                return local_tracks
+        
         try:
             results = self.sp.search(q=query, type='track', limit=limit)
             tracks = []
@@ -52,16 +74,64 @@ class SpotifyClient:
                 if track:
                     tracks.append(track)
             
-            return tracks
+            # 쿼리의 genre: 필터를 수집 트랙의 장르 태그로 기록
+            self.track_store.tag_genres(
+                [t.id for t in tracks],
+                extract_genres(query)
+            )
+            # 같은 검색 결과에 함께 등장한 아티스트 연결
+            self.artist_graph.add_cooccurrence(tracks)
+            
+            # 로컬 결과를 앞에 두고 Spotify 결과로 빈자리 채우기
+            local_ids = {t.id for t in local_tracks}
+            tracks = local_tracks + [t for t in tracks if t.id not in local_ids]
+            return tracks[:limit]
         
         except Exception as e:
             print(f"검색 오류 ({query}): {str(e)}")
-            return []
+            return local_tracks
+    
+    def resolve_artist_id(self, artist_name: str) -> Optional[str]:
+        """
+        아티스트명 → Spotify 아티스트 ID
+        
+        로컬 디렉터리에서 정확/별칭 일치로 먼저 찾고, 없을 때만 Spotify 검색 1회 후 별칭 학습
+        (로컬 퍼지 후보는 바로 쓰지 않고 Spotify 검색으로 확인 - 검색이 실패했을 때만 퍼지 후보 사용)
+        
+        Args:
+            artist_name: 자유 입력 아티스트 이름
+        
+        Returns:
+            아티스트 ID 또는 None
+        """
+        artist_id = self.artist_directory.resolve(artist_name, fuzzy=False)
+        if artist_id:
+            return artist_id
+        fuzzy_id = self.artist_directory.fuzzy_match(artist_name)
+        
+        try:
+            artist_results = self.sp.search(
+                q=f'artist:{artist_name}',
+                type='artist',
+                limit=1
+            )
+        except Exception as e:
+            print(f"아티스트 검색 오류 ({artist_name}): {str(e)}")
+            return fuzzy_id
+        
+        if not artist_results['artists']['items']:
+            return None
+        
+        artist = artist_results['artists']['items'][0]
+        self.artist_directory.learn(artist_name, artist['id'], artist['name'])
+        self.artist_directory.learn(artist['name'], artist['id'], artist['name'])
+        return artist['id']
     
     def search_artist_tracks(
         self,
         artist_name: str,
-        limit: int = 10
+        limit: int = 10,
+        artist_id: Optional[str] = None
     ) -> List[SpotifyTrack]:
         """
         특정 아티스트의 인기 트랙 검색
@@ -69,24 +139,18 @@ class SpotifyClient:
         Args:
             artist_name: 아티스트 이름
             limit: 결과 개수
+            artist_id: 미리 해석한 아티스트 ID (없으면 이름으로 해석)
         
         Returns:
             아티스트의 인기 트랙 리스트
         """
         try:
-            # 아티스트 검색
-            artist_results = self.sp.search(
-                q=f'artist:{artist_name}',
-                type='artist',
-                limit=1
-            )
+            artist_id = artist_id or self.resolve_artist_id(artist_name)
             
-            if not artist_results['artists']['items']:
+            if not artist_id:
                 print(f"아티스트를 찾을 수 없음: {artist_name}")
                 return []
             
-            artist_id = artist_results['artists']['items'][0]['id']
-            
             # 아티스트의 상위 트랙 가져오기
             top_tracks = self.sp.artist_top_tracks(artist_id)
             tracks = []
@@ -105,7 +169,8 @@ class SpotifyClient:
     def get_artist_recent_tracks(
         self,
         artist_name: str,
-        months: int = 48  #(4년)
+        months: int = 48,  #(4년)
+        artist_id: Optional[str] = None
     ) -> List[SpotifyTrack]:
         """
         아티스트의 최신 트랙 검색 (특정 기간 내)
@@ -113,23 +178,17 @@ class SpotifyClient:
         Args:
             artist_name: 아티스트 이름
             months: 검색할 최근 개월 수 (기본 48개월 = 4년)
+            artist_id: 미리 해석한 아티스트 ID (없으면 이름으로 해석)
         
         Returns:
             최신 트랙 리스트
         """
         try:
-            # 아티스트 검색
-            artist_results = self.sp.search(
-                q=f'artist:{artist_name}',
-                type='artist',
-                limit=1
-            )
+            artist_id = artist_id or self.resolve_artist_id(artist_name)
             
-            if not artist_results['artists']['items']:
+            if not artist_id:
                 return []
             
-            artist_id = artist_results['artists']['items'][0]['id']
-            
             # 아티스트 앨범 검색
             albums = self.sp.artist_albums(
                 artist_id,
@@ -178,10 +237,14 @@ class SpotifyClient:
     def parallel_search(
         self,
         queries: List[str],
-        limit_per_query: int = 10
+        limit_per_query: int = 10,
+        scorer=None
     ) -> List[SpotifyTrack]:
         """
         병렬 검색 실행 (동기 방식 내에서 안전하게 실행)
+        
+        scorer(CandidateScorer)가 주어지면 도착하는 트랙을 바로 채점해
+        도착 순서가 아닌 점수 상위 k곡을 반환
         """
         import concurrent.futures
 
@@ -202,11 +265,16 @@ class SpotifyClient:
                     track_list = future.result()
                     for track in track_list:
                         if track.id not in seen_ids:
-                            all_tracks.append(track)
                             seen_ids.add(track.id)
+                            if scorer is not None:
+                                scorer.push(track)
+                            else:
+                                all_tracks.append(track)
                 except Exception as e:
                     print(f"병렬 검색 중 개별 쿼리 오류: {str(e)}")
 
+        if scorer is not None:
+            return scorer.result()
         return all_tracks[:CANDIDATE_TRACKS_COUNT]
     
     def _parse_track(self, track_data: dict) -> Optional[SpotifyTrack]:
@@ -229,7 +297,7 @@ class SpotifyClient:
                 for artist in track_data['artists']
             ]
             
-            return SpotifyTrack(
+            track = SpotifyTrack(
                 id=track_data['id'],
                 name=track_data['name'],
                 artists=artists,
@@ -240,6 +308,9 @@ class SpotifyClient:
                 preview_url=track_data.get('preview_url'),
                 external_url=track_data['external_urls']['spotify']
             )
+            track.fingerprint = song_fingerprint(track)
+            self.track_store.add(track)
+            return track
         
         except Exception as e:
             print(f"트랙 파싱 오류: {str(e)}")
@@ -267,10 +338,10 @@ class SpotifyClient:
 _spotify_client = None
 
 def get_spotify_client() -> SpotifyClient:
-    """Spotify 클라이언트 싱글톤 인스턴스 반환"""
+    """Spotify 클라이언트 싱글톤 인스턴스 반환 (SPOTIFY_BACKEND="local"이면 로컬 대체 클라이언트)"""
     global _spotify_client
     if _spotify_client is None:
-        _spotify_client = SpotifyClient()
+        _spotify_client = LocalSpotifyClient() if SPOTIFY_BACKEND == "local" else SpotifyClient()
     return _spotify_client
 
 
@@ -0,0 +1,5 @@
+"""테스트에서 엔진 모듈을 바로 import 할 수 있도록 패키지 디렉터리를 경로에 추가"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,26 @@
+"""테스트용 트랙 생성 헬퍼 (스코어러/솔버 테스트 공용)"""
+from typing import Optional
+
+from models import SpotifyArtist, SpotifyTrack
+
+
+def make_track(
+    track_id: str,
+    artist_id: Optional[str] = None,
+    popularity: int = 65,
+    release_date: str = "2015-01-01",
+    name: Optional[str] = None,
+    fingerprint: Optional[str] = None,
+) -> SpotifyTrack:
+    artist_id = artist_id or f"artist-{track_id}"
+    return SpotifyTrack(
+        id=track_id,
+        name=name or f"Song {track_id}",
+        artists=[SpotifyArtist(id=artist_id, name=artist_id)],
+        album_name="Album",
+        release_date=release_date,
+        duration_ms=200000,
+        popularity=popularity,
+        external_url=f"https://open.spotify.com/track/{track_id}",
+        fingerprint=fingerprint,
+    )
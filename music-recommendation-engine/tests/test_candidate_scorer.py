@@ -0,0 +1,71 @@
+"""
+스트리밍 후보 스코어러 테스트 - 상위 k 유지, 밀려난 곡의 중복 버전 차단,
+버킷 빈자리 보충 & 밀려난 곡 기록 상한
+"""
+from candidate_scorer import CandidateScorer, ScoringContext
+from factories import make_track
+
+
+def song(track_id: str, fingerprint: str, popularity: int, **kwargs):
+    return make_track(track_id, f"artist-{fingerprint}", popularity, fingerprint=fingerprint, **kwargs)
+
+
+def scorer(k: int = 2) -> CandidateScorer:
+    return CandidateScorer(ScoringContext(decibel="quiet", goal="focus", location="library"), k=k)
+
+
+def test_keeps_top_k():
+    s = scorer(k=2)
+    for i, popularity in enumerate([10, 90, 50, 70]):
+        s.push(song(f"t{i}", f"fp{i}", popularity))
+    assert [track.id for track in s.result()] == ["t1", "t3"]
+
+
+def test_evicted_song_does_not_return_as_lower_version():
+    s = scorer(k=1)
+    s.push(song("low", "song-a", 20))
+    s.push(song("high", "song-b", 90))
+    s.push(song("other", "song-c", 80))  # song-a는 overflow에서도 밀려남
+
+    assert s.push(song("low-remaster", "song-a", 15)) is False
+    assert s.rejected_duplicates == 1
+    assert "low-remaster" not in {track.id for track in s.result()}
+
+
+def test_preferred_artist_ids_raise_score():
+    context = ScoringContext(
+        decibel="quiet", goal="focus", location="library", preferred_artist_ids=["artist-fp1"]
+    )
+    s = CandidateScorer(context, k=1)
+    s.push(song("t0", "fp0", 60))
+    s.push(song("t1", "fp1", 60))
+    assert [track.id for track in s.result()] == ["t1"]
+
+
+def test_replaced_bucket_member_is_refilled_from_overflow():
+    # k=4 → 버킷 용량 한국 2 / 신곡 1 / 기타 1
+    s = scorer(k=4)
+    for i, popularity in enumerate([95, 90, 85, 80]):
+        s.push(song(f"kr{i}", f"kr{i}", popularity, name=f"노래 {i}"))  # 한국 2곡 버킷, 2곡 overflow
+    s.push(song("other-high", "other-a", 90))
+    s.push(song("other-low", "other-b", 40))  # 기타 버킷이 차서 overflow
+    s.push(song("recent", "recent-a", 30, release_date="2024-01-01"))
+
+    # 기타 버킷 곡의 더 좋은 신곡 버전 → 기타 버킷 빈자리는 overflow의 기타 곡으로 보충
+    s.push(song("other-high-remaster", "other-a", 99, release_date="2024-06-01"))
+
+    result = [track.id for track in s.result()]
+    assert len(result) == 4
+    assert "other-high-remaster" in result
+    assert "other-low" in result
+    assert sum(track_id.startswith("kr") for track_id in result) == 2
+
+
+def test_evicted_fingerprints_are_bounded_by_k():
+    s = scorer(k=3)
+    for i in range(200):
+        s.push(song(f"t{i}", f"fp{i}", i % 100))
+
+    assert len(s._evicted) <= s.k
+    assert len(s._retained) <= 2 * s.k
+    assert len(s.result()) == 3
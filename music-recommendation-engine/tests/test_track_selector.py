@@ -0,0 +1,146 @@
+"""
+트랙 선택 솔버 테스트 - 쿼터 충족, 후보 부족 시 미충족 쿼터 보고,
+시드 선택의 교체 보정 & 선호 판별 콜백
+"""
+from candidate_scorer import TrackFeatures
+from factories import make_track
+from track_selector import SelectionQuotas, TrackSelector
+
+
+POPULARITY = {"high": 90, "medium": 65, "low": 30}
+
+
+def make_feature(
+    index: int,
+    score: float,
+    artist: str = None,
+    korean: bool = False,
+    recent: bool = False,
+    preferred: bool = False,
+    level: str = "medium",
+) -> TrackFeatures:
+    track = make_track(
+        f"track{index}",
+        artist or f"artist{index}",
+        POPULARITY[level],
+        release_date="2024-01-01" if recent else "2015-01-01",
+    )
+    return TrackFeatures(
+        track=track,
+        is_korean=korean,
+        is_recent=recent,
+        is_spam=False,
+        is_preferred=preferred,
+        popularity_level=level,
+        context_fit=score,
+        score=score,
+    )
+
+
+def table(features):
+    return {f.track.id: f for f in features}
+
+
+def rich_pool():
+    """모든 쿼터를 채울 수 있는 후보 (높은 점수는 쿼터와 무관한 해외 곡)"""
+    levels = ["low", "medium", "high", "medium", "low", "high", "medium", "high", "medium", "high"]
+    features = [make_feature(i, 10.0 - i * 0.1, level=levels[i % 10]) for i in range(20)]
+    features += [
+        make_feature(100 + i, 1.0 - i * 0.01, korean=True, level=levels[i]) for i in range(10)
+    ]
+    features += [
+        make_feature(200 + i, 0.5, recent=True, level=level)
+        for i, level in enumerate(["high", "medium", "low", "medium"])
+    ]
+    features += [
+        make_feature(300 + i, 0.2, preferred=True, level=level)
+        for i, level in enumerate(["high", "medium", "low"])
+    ]
+    return features
+
+
+def test_default_quotas_follow_config_ratios():
+    quotas = SelectionQuotas.default(10)
+    assert (quotas.preferred, quotas.korean, quotas.recent) == (2, 5, 2)
+    assert quotas.popularity == {"high": 4, "medium": 4, "low": 2}
+
+
+def test_select_satisfies_all_quotas():
+    selector = TrackSelector(table(rich_pool()))
+    result = selector.select()
+    selected = [selector.features[track.id] for track in result.tracks]
+
+    assert len(result.tracks) == 10
+    assert result.unmet == []
+    assert sum(f.is_preferred for f in selected) >= 2
+    assert sum(f.is_korean for f in selected) >= 5
+    assert sum(f.is_recent for f in selected) >= 2
+    assert len({f.track.artists[0].id for f in selected}) >= selector.quotas.min_artists
+    for level, target in selector.quotas.popularity.items():
+        assert sum(f.popularity_level == level for f in selected) == target
+
+
+def test_max_per_artist_is_respected():
+    features = [make_feature(i, 10.0 - i, artist="same") for i in range(5)]
+    features += [make_feature(10 + i, 1.0, korean=True) for i in range(10)]
+    result = TrackSelector(table(features)).select()
+    assert sum(track.artists[0].id == "same" for track in result.tracks) <= 2
+
+
+def test_popularity_shortfall_is_reported():
+    # 저인기 곡이 없어 low 구간 목표(2곡)를 채울 수 없음
+    features = [
+        feature for feature in rich_pool() if feature.popularity_level != "low"
+    ]
+    result = TrackSelector(table(features)).select()
+
+    assert len(result.tracks) == 10
+    assert "popularity_low:+2" in result.unmet
+
+
+def test_quota_and_count_shortfalls_are_reported():
+    # 한국 노래 / 선호 아티스트 곡이 없고 후보도 10곡 미만
+    features = [make_feature(i, 5.0 - i * 0.1, level=level) for i, level in enumerate(
+        ["high", "high", "medium", "medium", "low", "low"]
+    )]
+    result = TrackSelector(table(features)).select()
+
+    assert len(result.tracks) == 6
+    assert "preferred:+2" in result.unmet
+    assert "korean:+5" in result.unmet
+    assert "count:+4" in result.unmet
+    assert "popularity_high:+2" in result.unmet
+
+
+def test_seed_tracks_are_kept_in_order():
+    features = rich_pool()
+    seed = ["track100", "track300", "track5"]
+    result = TrackSelector(table(features)).select(seed=seed)
+    assert [track.id for track in result.tracks[:3]] == seed
+    assert len(result.tracks) == 10
+
+
+def test_seeded_selection_is_repaired_by_swapping():
+    # LLM이 해외 기존곡만 고른 경우 → 점수가 낮은 시드 곡을 쿼터 곡과 교체
+    features = rich_pool()
+    seed = [f"track{i}" for i in range(10)]
+    result = TrackSelector(table(features)).select(seed=seed)
+    selected = [f for f in features if f.track in result.tracks]
+
+    assert len(result.tracks) == 10
+    assert sum(f.is_korean for f in selected) >= 5
+    assert sum(f.is_preferred for f in selected) >= 2
+    assert not any(gap.startswith(("korean", "preferred", "recent")) for gap in result.unmet)
+    kept = [track.id for track in result.tracks if track.id in seed]
+    assert kept and kept == [track_id for track_id in seed if track_id in kept]  # 남은 시드 곡은 순서 유지
+
+
+def test_is_preferred_callback_overrides_feature_flag():
+    # 특성의 선호 플래그 대신 해석된 아티스트 ID 기준 판별 사용
+    features = rich_pool()
+    preferred_ids = {"artist5", "artist6"}
+    selector = TrackSelector(table(features), is_preferred=lambda t: t.artists[0].id in preferred_ids)
+    result = selector.select()
+
+    assert sum(track.artists[0].id in preferred_ids for track in result.tracks) == 2
+    assert not any(gap.startswith("preferred") for gap in result.unmet)
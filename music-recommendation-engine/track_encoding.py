@@ -0,0 +1,138 @@
+"""
+프롬프트용 트랙 압축 인코딩 - 22자 Spotify ID 대신 요청별 짧은 번호(t1, t2 ...)와
+축약 필드 + 미리 계산한 플래그(한국/신곡/선호/인기도)를 사용
+노드별 토큰 예산을 넘으면 도착 순서가 아닌 적합도 점수 순으로 잘라냄 (최종 곡 목록은 자르지 않음)
+LLM 응답의 번호는 decode()로 원래 트랙 ID로 복원
+"""
+from typing import Callable, Dict, List, Optional
+import re
+
+from config import PROMPT_TOKEN_BUDGETS
+from models import SpotifyTrack
+from candidate_scorer import ScoringContext, TrackFeatures, build_features
+
+
+TRACK_FORMAT_LEGEND = "형식: 번호|제목|아티스트|연도|인기도|플래그 (K=한국 노래, N=신곡, P=선호 아티스트, H/M/L=인기도 높음/중간/낮음)"
+
+_INDEX_PATTERN = re.compile(r"^\[?t(\d+)\]?$", re.IGNORECASE)
+
+
+def estimate_tokens(text: str) -> int:
+    """토큰 수 근사 (ASCII 4자당 1토큰, 한글 등 비ASCII는 글자당 1토큰)"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) + 1
+
+
+def _shorten(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+class TrackEncoder:
+    """요청(프롬프트) 단위 트랙 인코더 - 번호 ↔ 트랙 ID 매핑 & 토큰 예산 관리"""
+
+    def __init__(
+        self,
+        node: str,
+        context: Optional[ScoringContext] = None,
+        is_preferred: Optional[Callable[[SpotifyTrack], bool]] = None
+    ):
+        self.node = node
+        self.context = context
+        self.is_preferred = is_preferred
+        self.remaining = PROMPT_TOKEN_BUDGETS.get(node)  # None이면 예산 제한 없음
+        self.index_to_id: Dict[str, str] = {}
+        self.id_to_index: Dict[str, str] = {}
+        self.dropped = 0
+
+    def _index(self, track: SpotifyTrack) -> str:
+        if track.id not in self.id_to_index:
+            index = f"t{len(self.index_to_id) + 1}"
+            self.index_to_id[index] = track.id
+            self.id_to_index[track.id] = index
+        return self.id_to_index[track.id]
+
+    def _line(self, track: SpotifyTrack, features: Optional[TrackFeatures]) -> str:
+        flags = []
+        if features is not None:
+            if features.is_korean:
+                flags.append("K")
+            if features.is_recent:
+                flags.append("N")
+            preferred = self.is_preferred(track) if self.is_preferred else features.is_preferred
+            if preferred:
+                flags.append("P")
+            flags.append(features.popularity_level[0].upper())
+
+        artists = ", ".join(a.name for a in track.artists[:2])
+        return "|".join([
+            self._index(track),
+            _shorten(track.name, 40),
+            _shorten(artists, 30),
+            track.release_date[:4],
+            str(track.popularity),
+            "".join(flags),
+        ])
+
+    def encode(self, tracks: List[SpotifyTrack], keep_order: bool = False) -> str:
+        """
+        트랙 목록 인코딩
+
+        Args:
+            tracks: 인코딩할 트랙
+            keep_order: True면 입력 순서 유지 & 예산과 무관하게 전부 포함 (최종 곡 목록 등),
+                False면 적합도 점수 순
+
+        남은 토큰 예산을 넘는 곡은 점수가 낮은 것부터 제외 (제외된 곡 수는 dropped에 누적)
+        """
+        if not tracks:
+            return "없음"
+
+        features = {
+            track.id: build_features(track, self.context) if self.context else None
+            for track in tracks
+        }
+        ordered = list(tracks)
+        if self.context and not keep_order:
+            ordered.sort(key=lambda t: -features[t.id].score)
+
+        lines = []
+        for track in ordered:
+            line = self._line(track, features[track.id])
+            cost = estimate_tokens(line)
+            if self.remaining is not None:
+                if cost > self.remaining and not keep_order:
+                    self.dropped += 1
+                    continue
+                self.remaining = max(self.remaining - cost, 0)
+            lines.append(line)
+
+        return "\n".join([TRACK_FORMAT_LEGEND] + lines)
+
+    def decode(self, track_ref: str) -> str:
+        """LLM 응답의 트랙 번호 → 트랙 ID (원래 ID를 그대로 돌려준 경우도 허용)"""
+        ref = track_ref.strip()
+        match = _INDEX_PATTERN.match(ref)
+        if match:
+            return self.index_to_id.get(f"t{match.group(1)}", ref)
+        return ref
+
+
+if __name__ == "__main__":
+    from models import SpotifyArtist
+
+    track = SpotifyTrack(
+        id="0VjIjW4GlUZAMYd2vXMi3b",
+        name="Blinding Lights",
+        artists=[SpotifyArtist(id="1Xyo4u8uXC1ZmMpatF05PJ", name="The Weeknd")],
+        album_name="After Hours",
+        release_date="2019-11-29",
+        duration_ms=200040,
+        popularity=92,
+        external_url="https://open.spotify.com/track/0VjIjW4GlUZAMYd2vXMi3b",
+    )
+    encoder = TrackEncoder("selection", ScoringContext(decibel="loud", goal="active", location="gym"))
+    text = encoder.encode([track])
+    original = f"1. [{track.id}] {track.name} - The Weeknd (발매: {track.release_date}, 인기도: {track.popularity})"
+    print(text)
+    print(f"토큰: {estimate_tokens(original)} → {estimate_tokens(text.splitlines()[1])}")
+    print(f"복원: t1 → {encoder.decode('t1')}")
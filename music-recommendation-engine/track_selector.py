@@ -0,0 +1,265 @@
+"""
+트랙 선택 솔버 - 피처 테이블 위에서 상황 적합도 점수 합을 최대화하면서
+선호 아티스트 / 한국 노래 / 신곡 / 인기도 분포 / 다양성 쿼터를 만족하는 10곡 선택
+(탐욕 선택 + 교체 보정, selection LLM 대체)
+"""
+from typing import Callable, Dict, List, Optional
+from collections import Counter
+from dataclasses import dataclass, field
+
+from config import (
+    FINAL_RECOMMENDATIONS_COUNT,
+    PREFERRED_ARTIST_TRACK_RATIO,
+    KOREAN_TRACK_RATIO,
+    RECENT_TRACK_RATIO,
+    POPULARITY_DISTRIBUTION,
+    QUALITY_THRESHOLDS,
+    SELECTION_MAX_PER_ARTIST,
+)
+from models import SpotifyTrack
+from candidate_scorer import ScoringContext, TrackFeatures, build_feature_table
+from quality_metrics import required_count
+
+
+@dataclass
+class SelectionQuotas:
+    """선택 쿼터 (최소 곡 수, 인기도는 상한 겸 목표)"""
+    count: int
+    preferred: int
+    korean: int
+    recent: int
+    popularity: Dict[str, int]
+    min_artists: int
+    max_per_artist: int
+
+    @classmethod
+    def default(cls, count: int = FINAL_RECOMMENDATIONS_COUNT) -> "SelectionQuotas":
+        return cls(
+            count=count,
+            preferred=round(count * PREFERRED_ARTIST_TRACK_RATIO),
+            korean=round(count * KOREAN_TRACK_RATIO),
+            recent=round(count * RECENT_TRACK_RATIO),
+            popularity={level: spec["count"] for level, spec in POPULARITY_DISTRIBUTION.items()},
+            min_artists=required_count(QUALITY_THRESHOLDS["min_diversity"], count),
+            max_per_artist=SELECTION_MAX_PER_ARTIST,
+        )
+
+
+@dataclass
+class SelectionResult:
+    tracks: List[SpotifyTrack]
+    score: float
+    unmet: List[str] = field(default_factory=list)  # 후보 부족으로 못 채운 쿼터 (인기도 구간 / 곡 수 포함)
+
+
+class TrackSelector:
+    """쿼터 제약 트랙 선택기"""
+
+    def __init__(
+        self,
+        features: Dict[str, TrackFeatures],
+        is_preferred: Optional[Callable[[SpotifyTrack], bool]] = None,
+        quotas: Optional[SelectionQuotas] = None
+    ):
+        self.features = features
+        self.quotas = quotas or SelectionQuotas.default()
+        self.preferred = {
+            track_id: (is_preferred(f.track) if is_preferred else f.is_preferred)
+            for track_id, f in features.items()
+        }
+        self.ranked = sorted(features.values(), key=lambda f: (-f.score, f.track.id))
+        # 여러 쿼터를 한 번에 채우는 곡 우선 (남은 쿼터 실현 가능성 검사용)
+        self._by_coverage = sorted(
+            features.values(),
+            key=lambda f: (-(self.preferred[f.track.id] + f.is_korean + f.is_recent), -f.score, f.track.id)
+        )
+
+    # --- 쿼터 계산 ---
+
+    @staticmethod
+    def _artist(feature: TrackFeatures) -> str:
+        return feature.track.artists[0].id if feature.track.artists else feature.track.id
+
+    def _counts(self, selected: List[TrackFeatures]) -> Dict[str, int]:
+        return {
+            "preferred": sum(self.preferred[f.track.id] for f in selected),
+            "korean": sum(f.is_korean for f in selected),
+            "recent": sum(f.is_recent for f in selected),
+            "artists": len({self._artist(f) for f in selected}),
+        }
+
+    def _needs(self, selected: List[TrackFeatures]) -> Dict[str, int]:
+        counts = self._counts(selected)
+        return {
+            "preferred": max(0, self.quotas.preferred - counts["preferred"]),
+            "korean": max(0, self.quotas.korean - counts["korean"]),
+            "recent": max(0, self.quotas.recent - counts["recent"]),
+            "artists": max(0, self.quotas.min_artists - counts["artists"]),
+        }
+
+    def _popularity_gaps(self, selected: List[TrackFeatures]) -> Dict[str, int]:
+        """인기도 구간별 목표 대비 부족한 곡 수"""
+        levels = Counter(f.popularity_level for f in selected)
+        return {
+            f"popularity_{level}": max(0, target - levels[level])
+            for level, target in self.quotas.popularity.items()
+        }
+
+    def _satisfies(self, feature: TrackFeatures, need: str, selected: List[TrackFeatures]) -> bool:
+        if need == "artists":
+            return self._artist(feature) not in {self._artist(f) for f in selected}
+        if need == "preferred":
+            return self.preferred[feature.track.id]
+        return getattr(feature, f"is_{need}")
+
+    def _fits(self, feature: TrackFeatures, selected: List[TrackFeatures], strict: bool) -> bool:
+        """아티스트 상한 & (strict이면) 인기도 상한 & 남은 쿼터 실현 가능성"""
+        artist_counts = Counter(self._artist(f) for f in selected)
+        if artist_counts[self._artist(feature)] >= self.quotas.max_per_artist:
+            return False
+        if not strict:
+            return True
+
+        level = feature.popularity_level
+        if sum(f.popularity_level == level for f in selected) >= self.quotas.popularity.get(level, 0):
+            return False
+
+        after = selected + [feature]
+        slots_left = self.quotas.count - len(after)
+        needs = self._needs(after)
+        return all(need <= slots_left for need in needs.values()) and self._coverable(after, needs, slots_left)
+
+    def _coverable(self, selected: List[TrackFeatures], needs: Dict[str, int], slots_left: int) -> bool:
+        """
+        남은 선호/한국/신곡 쿼터를 남은 자리 안에서 채울 수 있는지 (여러 쿼터를 채우는 곡부터 탐욕 배정)
+        후보가 모자라 어차피 못 채우는 쿼터는 막지 않음 (미충족으로 보고)
+        """
+        remaining = {need: needs[need] for need in ("preferred", "korean", "recent") if needs[need] > 0}
+        chosen = {f.track.id for f in selected}
+        used = 0
+        for feature in self._by_coverage:
+            if not remaining:
+                return True
+            if feature.track.id in chosen:
+                continue
+            covered = [need for need in remaining if self._satisfies(feature, need, selected)]
+            if not covered:
+                if not (self.preferred[feature.track.id] or feature.is_korean or feature.is_recent):
+                    break
+                continue
+            used += 1
+            if used > slots_left:
+                return False
+            for need in covered:
+                remaining[need] -= 1
+                if remaining[need] == 0:
+                    del remaining[need]
+        return True
+
+    # --- 선택 ---
+
+    def _greedy(self, pool: List[TrackFeatures], selected: List[TrackFeatures], strict: bool, limit: int):
+        chosen = {f.track.id for f in selected}
+        for feature in pool:
+            if len(selected) >= limit:
+                break
+            if feature.track.id not in chosen and self._fits(feature, selected, strict):
+                selected.append(feature)
+                chosen.add(feature.track.id)
+
+    def _popularity_deviation(self, selected: List[TrackFeatures]) -> int:
+        """인기도 분포 목표와의 차이 (구간별 |곡 수 - 목표| 합)"""
+        levels = Counter(f.popularity_level for f in selected)
+        return sum(abs(levels[level] - target) for level, target in self.quotas.popularity.items())
+
+    def _swap(self, selected: List[TrackFeatures], incoming: TrackFeatures, need: str, keep_popularity: bool):
+        """incoming과 교체해도 다른 쿼터(keep_popularity면 인기도 분포도)가 나빠지지 않는 가장 낮은 점수 곡 찾기"""
+        before = self._needs(selected)
+        deviation = self._popularity_deviation(selected)
+        for outgoing in sorted(selected, key=lambda f: f.score):
+            trial = [f for f in selected if f is not outgoing] + [incoming]
+            after = self._needs(trial)
+            if after[need] >= before[need] or any(
+                after[other] > before[other] for other in before if other != need
+            ):
+                continue
+            if keep_popularity and self._popularity_deviation(trial) > deviation:
+                continue
+            return trial
+        return None
+
+    def _repair(self, selected: List[TrackFeatures]):
+        """
+        부족한 쿼터를 미선택 곡과의 교체로 보정 (다른 쿼터를 깨지 않는 가장 낮은 점수 곡과 교체)
+        인기도 분포를 유지하는 교체를 먼저 찾고, 없을 때만 점수 순 첫 후보로 교체
+        """
+        for need in ("preferred", "korean", "recent", "artists"):
+            while self._needs(selected)[need] > 0:
+                chosen = {f.track.id for f in selected}
+                candidates = [
+                    f for f in self.ranked
+                    if f.track.id not in chosen and self._satisfies(f, need, selected)
+                    and self._fits(f, selected, strict=False)
+                ]
+                if not candidates:
+                    break
+
+                trial = next(
+                    (t for t in (self._swap(selected, f, need, keep_popularity=True) for f in candidates) if t),
+                    None
+                ) or self._swap(selected, candidates[0], need, keep_popularity=False)
+                if trial is None:
+                    break
+                selected[:] = trial
+
+    def select(self, seed: Optional[List[str]] = None) -> SelectionResult:
+        """
+        쿼터를 만족하는 최고 점수 조합 선택
+
+        Args:
+            seed: 먼저 채워 둘 트랙 ID (LLM 선택 보정용 - 순서 유지, 빈 자리만 채우고 쿼터 부족분만 교체)
+        """
+        quotas = self.quotas
+        selected: List[TrackFeatures] = []
+        for track_id in dict.fromkeys(seed or []):
+            if track_id in self.features and len(selected) < quotas.count:
+                selected.append(self.features[track_id])
+
+        # 1) 선호 아티스트 쿼터를 먼저 채움
+        preferred_pool = [f for f in self.ranked if self.preferred[f.track.id]]
+        # (시드로 자리가 다 찬 경우 추가하지 않고 3)의 교체로 보정)
+        preferred_limit = min(quotas.count, len(selected) + self._needs(selected)["preferred"])
+        self._greedy(preferred_pool, selected, strict=True, limit=preferred_limit)
+        if len(selected) < preferred_limit:
+            self._greedy(preferred_pool, selected, strict=False, limit=preferred_limit)
+
+        # 2) 인기도 상한 & 쿼터 실현 가능성을 지키며 점수 순 탐욕 선택
+        self._greedy(self.ranked, selected, strict=True, limit=quotas.count)
+
+        # 3) 후보가 부족하면 인기도 상한을 풀고 채운 뒤 교체로 쿼터 보정
+        if len(selected) < quotas.count:
+            self._greedy(self.ranked, selected, strict=False, limit=quotas.count)
+        self._repair(selected)
+
+        if seed is None:
+            selected.sort(key=lambda f: -f.score)
+        gaps = {**self._needs(selected), **self._popularity_gaps(selected)}
+        gaps["count"] = quotas.count - len(selected)
+        unmet = [f"{need}:+{gap}" for need, gap in gaps.items() if gap > 0]
+        return SelectionResult(
+            tracks=[f.track for f in selected],
+            score=sum(f.score for f in selected),
+            unmet=unmet,
+        )
+
+
+def select_tracks(
+    tracks: List[SpotifyTrack],
+    context: ScoringContext,
+    is_preferred: Optional[Callable[[SpotifyTrack], bool]] = None,
+    count: int = FINAL_RECOMMENDATIONS_COUNT
+) -> SelectionResult:
+    """후보 트랙 → 피처 테이블 → 쿼터 제약 선택"""
+    features = build_feature_table(tracks, context)
+    features = {track_id: f for track_id, f in features.items() if not f.is_spam}
+    return TrackSelector(features, is_preferred, SelectionQuotas.default(count)).select()
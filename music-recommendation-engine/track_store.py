@@ -0,0 +1,155 @@
+"""
+트랙 저장소 - 검색으로 수집한 트랙 카탈로그
+Spotify 응답을 파싱할 때마다 누적되며, 바이너리 스냅샷(mmap)과 연결해 워커 간 공유
+메모리에는 최근 사용한 TRACK_STORE_MAX_TRACKS곡만 유지 (LRU)
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+from collections import OrderedDict
+import os
+import threading
+
+from config import CATALOG_SNAPSHOT_PATH, TRACK_STORE_MAX_TRACKS
+from models import SpotifyTrack
+from catalog_snapshot import CatalogSnapshot
+
+
+class TrackStore:
+    """수집된 트랙 저장소 (스레드 안전, 메모리 트랙은 LRU)"""
+
+    def __init__(self, max_tracks: int = TRACK_STORE_MAX_TRACKS):
+        self.max_tracks = max_tracks
+        self._tracks: "OrderedDict[str, SpotifyTrack]" = OrderedDict()
+        self._genres: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+        self.snapshot: Optional[CatalogSnapshot] = None  # 읽기 전용 스냅샷 (선택)
+        self._listeners = []  # add_track / add_genres (선택: remove_track) 를 구현한 색인
+        self.evicted = 0
+
+    def subscribe(self, listener):
+        """트랙/장르 추가 알림을 받을 색인 등록"""
+        self._listeners.append(listener)
+
+    def add(self, track: SpotifyTrack, genres: Iterable[str] = ()):
+        """트랙 추가 (장르 태그 병합)"""
+        genres = [g.lower() for g in genres]
+        with self._lock:
+            self._tracks[track.id] = track
+            self._tracks.move_to_end(track.id)
+            self._genres.setdefault(track.id, set()).update(genres)
+            evicted = self._evict()
+        for listener in self._listeners:
+            listener.add_track(track)
+            if genres:
+                listener.add_genres(track.id, genres)
+        self._notify_removed(evicted)
+
+    def _evict(self) -> List[str]:
+        """LRU 초과분 제거 (호출자가 잠금 보유), 스냅샷에도 없는 트랙 ID 반환"""
+        removed = []
+        while len(self._tracks) > self.max_tracks:
+            track_id, _ = self._tracks.popitem(last=False)
+            self._genres.pop(track_id, None)
+            self.evicted += 1
+            if self.snapshot is None or self.snapshot.find(track_id) is None:
+                removed.append(track_id)
+        return removed
+
+    def _notify_removed(self, track_ids: List[str]):
+        """카탈로그에서 사라진 트랙을 색인에서도 제거"""
+        for listener in self._listeners:
+            remove_track = getattr(listener, "remove_track", None)
+            if remove_track is None:
+                continue
+            for track_id in track_ids:
+                remove_track(track_id)
+
+    def add_many(self, tracks: Iterable[SpotifyTrack], genres: Iterable[str] = ()):
+        """여러 트랙 추가"""
+        genres = list(genres)
+        for track in tracks:
+            self.add(track, genres)
+
+    def tag_genres(self, track_ids: Iterable[str], genres: Iterable[str]):
+        """검색 쿼리의 genre: 필터로 찾은 트랙에 장르 태그 부여"""
+        genres = [g.lower() for g in genres]
+        if not genres:
+            return
+        track_ids = list(track_ids)
+        with self._lock:
+            for track_id in track_ids:
+                if track_id in self._genres:
+                    self._genres[track_id].update(genres)
+        for listener in self._listeners:
+            for track_id in track_ids:
+                listener.add_genres(track_id, genres)
+
+    def get(self, track_id: str) -> Optional[SpotifyTrack]:
+        """트랙 조회 (메모리 → 스냅샷 순, 메모리 적중은 LRU 갱신)"""
+        with self._lock:
+            track = self._tracks.get(track_id)
+            if track is not None:
+                self._tracks.move_to_end(track_id)
+        if track is None and self.snapshot is not None:
+            view = self.snapshot.find(track_id)
+            if view is not None:
+                track = view.to_track()
+        return track
+
+    def genres_of(self, track_id: str) -> List[str]:
+        """트랙의 장르 태그"""
+        with self._lock:
+            genres = set(self._genres.get(track_id, ()))
+        if self.snapshot is not None:
+            view = self.snapshot.find(track_id)
+            if view is not None:
+                genres.update(view.genres)
+        return sorted(genres)
+
+    def iter_tracks(self) -> Iterator[SpotifyTrack]:
+        """전체 트랙 순회 (메모리 트랙 + 스냅샷에만 있는 트랙)"""
+        with self._lock:
+            tracks = list(self._tracks.values())
+        yield from tracks
+
+        if self.snapshot is not None:
+            for view in self.snapshot:
+                if view.id not in self._tracks:
+                    yield view.to_track()
+
+    def memory_tracks(self) -> List[SpotifyTrack]:
+        """메모리에 있는 트랙 (스냅샷 병합 저장용)"""
+        with self._lock:
+            return list(self._tracks.values())
+
+    def new_track_count(self) -> int:
+        """스냅샷 이후 새로 수집된 트랙 수"""
+        with self._lock:
+            track_ids = list(self._tracks)
+        if self.snapshot is None:
+            return len(track_ids)
+        return sum(1 for track_id in track_ids if self.snapshot.find(track_id) is None)
+
+    def attach_snapshot(self, snapshot: CatalogSnapshot):
+        """읽기 전용 스냅샷 연결"""
+        self.snapshot = snapshot
+
+    def __len__(self) -> int:
+        if self.snapshot is None:
+            return len(self._tracks)
+        return len(self.snapshot) + self.new_track_count()
+
+
+# 싱글톤 인스턴스
+_track_store = None
+
+def get_track_store() -> TrackStore:
+    """트랙 저장소 싱글톤 인스턴스 반환 (스냅샷 파일이 있으면 연결)"""
+    global _track_store
+    if _track_store is None:
+        _track_store = TrackStore()
+        if os.path.exists(CATALOG_SNAPSHOT_PATH):
+            try:
+                _track_store.attach_snapshot(CatalogSnapshot(CATALOG_SNAPSHOT_PATH))
+            except Exception as e:
+                print(f"카탈로그 스냅샷 로드 오류: {str(e)}")
+    return _track_store
@@ -0,0 +1,157 @@
+"""
+트랙 유틸리티 - 스팸/한국 노래 판별, 곡 동일성 핑거프린트 & 중복 버전 제거
+같은 곡이 싱글/앨범 수록/리마스터 등으로 여러 트랙 ID에 흩어진 경우를 하나로 묶음
+"""
+from typing import List, Optional
+from datetime import datetime
+import re
+import unicodedata
+
+from config import (
+    DEDUP_KEEP_RULE,
+    SPAM_KEYWORDS,
+    KOREAN_INDICATORS,
+)
+from models import SpotifyTrack
+
+
+# 괄호/대시 뒤에 붙는 버전 표기 (이 단어가 포함된 꼬리표만 제거)
+# 리믹스는 다른 곡으로 취급 (버전 표기로 보지 않음)
+VERSION_MARKERS = [
+    "remaster", "remastered", "version", "ver.", "edit", "live",
+    "acoustic", "instrumental", "inst.", "mono", "stereo", "deluxe",
+    "bonus", "single", "album", "demo", "feat.", "feat ", "ft.", "with ",
+    "from ", "explicit", "clean", "original", "anniversary",
+]
+
+_SUFFIX_PATTERN = re.compile(r"\s*[\(\[]([^\)\]]*)[\)\]]|\s+-\s+(.*)$")
+
+
+def parse_release_date(release_date: str) -> Optional[datetime]:
+    """Spotify 발매일 문자열 (YYYY, YYYY-MM, YYYY-MM-DD) 파싱"""
+    try:
+        if len(release_date) == 4:
+            return datetime.strptime(release_date, "%Y")
+        elif len(release_date) == 7:
+            return datetime.strptime(release_date, "%Y-%m")
+        else:
+            return datetime.strptime(release_date, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+
+
+def clean_title(title: str) -> str:
+    """버전 표기를 제거한 정규화 제목"""
+    normalized = unicodedata.normalize("NFKC", title).lower()
+
+    def _strip_version(match: re.Match) -> str:
+        tag = (match.group(1) or match.group(2) or "") + " "
+        if "remix" not in tag and any(marker in tag for marker in VERSION_MARKERS):
+            return ""
+        return match.group(0)
+
+    normalized = _SUFFIX_PATTERN.sub(_strip_version, normalized)
+
+    # 문장부호 제거 (한글/영문/숫자만 유지)
+    normalized = re.sub(r"[^\w\s]", " ", normalized)
+    return " ".join(normalized.split())
+
+
+def is_spam_title(title: str) -> bool:
+    """키워드 스팸 제목 판별"""
+    title_lower = title.lower()
+    
+    # 스팸 키워드 체크
+    for keyword in SPAM_KEYWORDS:
+        if keyword.lower() in title_lower:
+            return True
+    
+    # 숫자+시간 패턴 체크 (1시간, 2 hours 등)
+    if re.search(r'\d+\s*(시간|분|hour|min)', title_lower):
+        return True
+    
+    return False
+
+
+def is_korean_track(track: SpotifyTrack) -> bool:
+    """한국 노래 판별"""
+    # 1. 한글 포함 여부
+    if re.search(r'[가-힣]', track.name):
+        return True
+    
+    # 2. 한국 아티스트 키워드
+    artist_names = track.get_artist_names()
+    for indicator in KOREAN_INDICATORS:
+        if indicator in artist_names:
+            return True
+    
+    # 3. 아티스트 장르에 k-pop, k-indie 등 포함
+    for artist in track.artists:
+        for genre in artist.genres:
+            if 'k-pop' in genre.lower() or 'k-indie' in genre.lower() or 'korean' in genre.lower():
+                return True
+    
+    return False
+
+
+def get_popularity_level(popularity: int) -> str:
+    """인기도 레벨 반환"""
+    if 80 <= popularity <= 100:
+        return "high"
+    elif 50 <= popularity < 80:
+        return "medium"
+    else:
+        return "low"
+
+
+def song_fingerprint(track: SpotifyTrack) -> str:
+    """곡 동일성 핑거프린트: 정규화 제목 + 대표 아티스트 ID"""
+    primary_artist_id = track.artists[0].id if track.artists else ""
+    return f"{primary_artist_id}:{clean_title(track.name)}"
+
+
+def get_fingerprint(track: SpotifyTrack) -> str:
+    """수집 시 계산된 핑거프린트 반환 (없으면 즉시 계산)"""
+    return track.fingerprint or song_fingerprint(track)
+
+
+def _version_rank(track: SpotifyTrack, rule: str) -> tuple:
+    """버전 우선순위 키 (작을수록 우선)"""
+    release_date = parse_release_date(track.release_date) or datetime.max
+
+    if rule == "original":
+        # 최초 발매본 우선, 같으면 인기도
+        return (release_date, -track.popularity)
+
+    # 기본: 인기도 우선, 같으면 최초 발매본
+    return (-track.popularity, release_date)
+
+
+def dedupe_tracks(
+    tracks: List[SpotifyTrack],
+    rule: str = DEDUP_KEEP_RULE
+) -> List[SpotifyTrack]:
+    """
+    핑거프린트 기준 중복 버전 제거
+
+    Args:
+        tracks: 트랙 리스트
+        rule: 대표 버전 선택 규칙 ("popularity" | "original")
+
+    Returns:
+        곡당 1개 버전만 남긴 트랙 리스트 (최초 등장 순서 유지)
+    """
+    best = {}
+    order = []
+
+    for track in tracks:
+        fingerprint = get_fingerprint(track)
+        current = best.get(fingerprint)
+        if current is None:
+            order.append(fingerprint)
+            best[fingerprint] = track
+        elif _version_rank(track, rule) < _version_rank(current, rule):
+            best[fingerprint] = track
+
+    return [best[fingerprint] for fingerprint in order]
+
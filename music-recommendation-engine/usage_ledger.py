@@ -0,0 +1,237 @@
+"""
+LLM 사용량 장부 - 요청 단위로 노드별 LLM 호출의 입력/출력 토큰, 지연 시간, 반복 회차, 비용 기록
+제공자 접두사 캐시 적중 입력 토큰과 (알 수 있으면) 첫 토큰까지 시간도 함께 기록해 캐시 절감액 비교
+요청별 토큰 상한(REQUEST_TOKEN_BUDGET)을 넘으면 품질 재시도를 중단해 최악의 지연/비용을 제한
+프로세스 전체 누적은 UsageMetrics로 집계 (GET /llm-usage)
+"""
+from typing import Deque, Dict, List, Optional
+from collections import defaultdict, deque
+from dataclasses import dataclass
+import threading
+
+from config import LLM_PRICING_PER_1M, REQUEST_TOKEN_BUDGET
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int, cached_input_tokens: int = 0) -> float:
+    """토큰 수 → 비용 (USD, 접두사 캐시 적중 입력은 cached_input 단가, 단가 미등록 모델은 0)"""
+    price = LLM_PRICING_PER_1M.get(model)
+    if not price:
+        return 0.0
+    cached_price = price.get("cached_input", price["input"])
+    return (
+        (input_tokens - cached_input_tokens) * price["input"]
+        + cached_input_tokens * cached_price
+        + output_tokens * price["output"]
+    ) / 1_000_000
+
+
+@dataclass
+class UsageEntry:
+    """LLM 호출 한 건"""
+    node: str
+    model: str
+    tier: str
+    input_tokens: int
+    output_tokens: int
+    latency: float
+    iteration: int  # 품질 재시도 회차 (0 = 첫 실행)
+    cached: bool = False  # 응답 캐시 적중 (토큰 0)
+    cached_input_tokens: int = 0  # 제공자 접두사 캐시 적중 입력 토큰
+    ttft: Optional[float] = None  # 첫 토큰까지 시간 (제공자가 알려줄 때만)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    @property
+    def cost(self) -> float:
+        return estimate_cost(self.model, self.input_tokens, self.output_tokens, self.cached_input_tokens)
+
+    @property
+    def cost_without_cache(self) -> float:
+        return estimate_cost(self.model, self.input_tokens, self.output_tokens)
+
+
+def _round(stat: Dict[str, float]):
+    for key in ("latency", "ttft"):
+        stat[key] = round(stat[key], 3)
+    for key in ("cost", "cost_without_cache"):
+        stat[key] = round(stat[key], 6)
+
+
+def _aggregate(entries: List[UsageEntry]) -> Dict[str, Dict[str, float]]:
+    """노드별 합계"""
+    nodes: Dict[str, Dict[str, float]] = defaultdict(lambda: {
+        "calls": 0, "cached": 0, "input_tokens": 0, "cached_input_tokens": 0, "output_tokens": 0,
+        "latency": 0.0, "ttft": 0.0, "ttft_calls": 0, "cost": 0.0, "cost_without_cache": 0.0, "max_iteration": 0,
+    })
+    for entry in entries:
+        node = nodes[entry.node]
+        node["calls"] += 1
+        node["cached"] += entry.cached
+        node["input_tokens"] += entry.input_tokens
+        node["cached_input_tokens"] += entry.cached_input_tokens
+        node["output_tokens"] += entry.output_tokens
+        node["latency"] += entry.latency
+        if entry.ttft is not None:
+            node["ttft"] += entry.ttft
+            node["ttft_calls"] += 1
+        node["cost"] += entry.cost
+        node["cost_without_cache"] += entry.cost_without_cache
+        node["max_iteration"] = max(node["max_iteration"], entry.iteration)
+    for node in nodes.values():
+        _round(node)
+    return dict(nodes)
+
+
+class UsageLedger:
+    """요청 단위 LLM 사용량 장부 (스레드 안전)"""
+
+    def __init__(self, token_budget: Optional[int] = REQUEST_TOKEN_BUDGET):
+        self.token_budget = token_budget  # None이면 상한 없음
+        self.iteration = 0  # 노드 진입 시 state의 iteration_count로 갱신
+        self.entries: List[UsageEntry] = []
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        node: str,
+        model: str,
+        tier: str,
+        input_tokens: int,
+        output_tokens: int,
+        latency: float,
+        cached: bool = False,
+        cached_input_tokens: int = 0,
+        ttft: Optional[float] = None
+    ):
+        with self._lock:
+            self.entries.append(UsageEntry(
+                node=node,
+                model=model,
+                tier=tier,
+                input_tokens=input_tokens,
+                output_tokens=output_tokens,
+                latency=latency,
+                iteration=self.iteration,
+                cached=cached,
+                cached_input_tokens=cached_input_tokens,
+                ttft=ttft,
+            ))
+
+    @property
+    def total_tokens(self) -> int:
+        with self._lock:
+            return sum(entry.total_tokens for entry in self.entries)
+
+    @property
+    def total_cost(self) -> float:
+        with self._lock:
+            return sum(entry.cost for entry in self.entries)
+
+    @property
+    def degraded_nodes(self) -> List[str]:
+        """저하 모드(오프라인 규칙 백엔드)로 응답한 노드 - 제공자 장애를 응답에 드러내기 위함"""
+        with self._lock:
+            return sorted({entry.node for entry in self.entries if entry.tier == "degraded"})
+
+    def over_budget(self) -> bool:
+        """요청 토큰 상한 초과 여부"""
+        return self.token_budget is not None and self.total_tokens >= self.token_budget
+
+    def summary(self) -> Dict:
+        """API 응답용 요약 (노드별 합계 + 전체)"""
+        with self._lock:
+            entries = list(self.entries)
+        return {
+            "nodes": _aggregate(entries),
+            "total": {
+                "calls": len(entries),
+                "cached": sum(entry.cached for entry in entries),
+                "input_tokens": sum(entry.input_tokens for entry in entries),
+                "cached_input_tokens": sum(entry.cached_input_tokens for entry in entries),
+                "output_tokens": sum(entry.output_tokens for entry in entries),
+                "latency": round(sum(entry.latency for entry in entries), 3),
+                "cost": round(sum(entry.cost for entry in entries), 6),
+                "cost_without_cache": round(sum(entry.cost_without_cache for entry in entries), 6),
+            },
+            "token_budget": self.token_budget,
+            "over_budget": self.over_budget(),
+            "degraded_nodes": self.degraded_nodes,
+        }
+
+    def log_line(self) -> str:
+        """로그 한 줄 요약"""
+        summary = self.summary()
+        total = summary["total"]
+        per_node = ", ".join(
+            f"{node} {stat['input_tokens'] + stat['output_tokens']}"
+            for node, stat in summary["nodes"].items()
+        )
+        line = (
+            f"💰 LLM 사용량: 호출 {total['calls']}회 (캐시 {total['cached']}), "
+            f"토큰 {total['input_tokens']}(캐시 {total['cached_input_tokens']})+{total['output_tokens']}, "
+            f"LLM 지연 {total['latency']:.2f}s, 비용 ${total['cost']:.5f} [{per_node}]"
+        )
+        if summary["degraded_nodes"]:
+            line += f" 🛟 저하 모드 응답: {', '.join(summary['degraded_nodes'])}"
+        return line
+
+
+class UsageMetrics:
+    """프로세스 누적 사용량 (요청 장부를 노드별로 합산, 요청당 토큰은 최근 N건만 보관)"""
+
+    def __init__(self, window: int = 1000):
+        self.requests = 0
+        self.over_budget_requests = 0
+        self.degraded_requests = 0
+        self.request_tokens: Deque[int] = deque(maxlen=window)
+        self.nodes: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, ledger: UsageLedger):
+        with self._lock:
+            self.requests += 1
+            self.over_budget_requests += ledger.over_budget()
+            self.degraded_requests += bool(ledger.degraded_nodes)
+            self.request_tokens.append(ledger.total_tokens)
+            for node, stat in _aggregate(ledger.entries).items():
+                total = self.nodes.setdefault(node, dict.fromkeys(stat, 0))
+                for key, value in stat.items():
+                    total[key] = max(total[key], value) if key == "max_iteration" else total[key] + value
+
+    def report(self) -> Dict:
+        with self._lock:
+            tokens = sorted(self.request_tokens)
+            nodes = {node: dict(stat) for node, stat in self.nodes.items()}
+            requests, over_budget, degraded = self.requests, self.over_budget_requests, self.degraded_requests
+        for stat in nodes.values():
+            _round(stat)
+            stat["avg_ttft"] = round(stat["ttft"] / stat["ttft_calls"], 3) if stat["ttft_calls"] else None
+            stat["cached_input_ratio"] = (
+                round(stat["cached_input_tokens"] / stat["input_tokens"], 3) if stat["input_tokens"] else 0.0
+            )
+        return {
+            "requests": requests,
+            "over_budget_requests": over_budget,
+            "degraded_requests": degraded,
+            "tokens_per_request": {
+                "mean": round(sum(tokens) / len(tokens), 1) if tokens else 0.0,
+                "p95": tokens[min(len(tokens) - 1, int(0.95 * len(tokens)))] if tokens else 0,
+                "max": tokens[-1] if tokens else 0,
+            },
+            "cost": round(sum(stat["cost"] for stat in nodes.values()), 6),
+            "cost_without_cache": round(sum(stat["cost_without_cache"] for stat in nodes.values()), 6),
+            "nodes": nodes,
+        }
+
+
+# 싱글톤 인스턴스
+_usage_metrics = None
+
+def get_usage_metrics() -> UsageMetrics:
+    """누적 사용량 싱글톤 인스턴스 반환"""
+    global _usage_metrics
+    if _usage_metrics is None:
+        _usage_metrics = UsageMetrics()
+    return _usage_metrics
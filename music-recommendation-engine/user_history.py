@@ -0,0 +1,140 @@
+"""
+사용자별 최근 추천 이력 - 세대 교체형 블룸 필터
+사용자당 수백 바이트로 최근 추천 트랙 ID를 기록하여 후보 채점 시 반복 추천 제외
+(DB 조회 없이 한 프로세스에서 수백만 사용자 처리)
+"""
+from typing import Iterable, Optional
+from collections import OrderedDict
+import hashlib
+import threading
+import time
+
+from config import (
+    USER_HISTORY_FILTER_BYTES,
+    USER_HISTORY_HASHES,
+    USER_HISTORY_GENERATION_SIZE,
+    USER_HISTORY_GENERATION_SECONDS,
+    USER_HISTORY_MAX_USERS,
+)
+
+
+class RecentTrackFilter:
+    """
+    2세대 블룸 필터 (현재 세대 + 직전 세대)
+
+    현재 세대가 USER_HISTORY_GENERATION_SIZE곡을 넘거나
+    USER_HISTORY_GENERATION_SECONDS가 지나면 세대 교체 → 오래된 기록은 자연 소멸
+    (시간 기준 교체는 기록할 때뿐 아니라 조회할 때도 적용)
+    """
+
+    __slots__ = ("current", "previous", "count", "started")
+
+    def __init__(self):
+        half = USER_HISTORY_FILTER_BYTES // 2
+        self.current = bytearray(half)
+        self.previous = bytearray(half)
+        self.count = 0
+        self.started = time.time()
+
+    @staticmethod
+    def _positions(track_id: str, bits: int):
+        digest = hashlib.blake2b(track_id.encode("utf-8"), digest_size=USER_HISTORY_HASHES * 4).digest()
+        for i in range(USER_HISTORY_HASHES):
+            yield int.from_bytes(digest[i * 4:(i + 1) * 4], "little") % bits
+
+    def _age(self, by_count: bool = True):
+        """세대 교체 (경과 시간 기준, by_count면 기록 곡 수 기준도 적용)"""
+        now = time.time()
+        elapsed = now - self.started
+        if elapsed >= 2 * USER_HISTORY_GENERATION_SECONDS:
+            # 두 세대 모두 수명 초과 → 전부 소멸
+            self.previous = bytearray(len(self.current))
+            self.current = bytearray(len(self.current))
+            self.count = 0
+            self.started = now
+        elif elapsed >= USER_HISTORY_GENERATION_SECONDS or (by_count and self.count >= USER_HISTORY_GENERATION_SIZE):
+            self.previous = self.current
+            self.current = bytearray(len(self.previous))
+            self.count = 0
+            self.started = now
+
+    def expire(self):
+        """조회 전 경과 시간만큼 세대 교체 (추천이 뜸한 사용자의 오래된 기록도 소멸)"""
+        self._age(by_count=False)
+
+    def add(self, track_id: str):
+        """추천 트랙 기록"""
+        self._age()
+        bits = len(self.current) * 8
+        for position in self._positions(track_id, bits):
+            self.current[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, track_id: str) -> bool:
+        """최근 추천 여부 (거짓 양성 가능, 거짓 음성 없음)"""
+        bits = len(self.current) * 8
+        positions = list(self._positions(track_id, bits))
+        for generation in (self.current, self.previous):
+            if all(generation[p >> 3] & (1 << (p & 7)) for p in positions):
+                return True
+        return False
+
+
+class UserHistoryStore:
+    """사용자 ID → RecentTrackFilter (LRU로 사용자 수 제한)"""
+
+    def __init__(self, max_users: int = USER_HISTORY_MAX_USERS):
+        self.max_users = max_users
+        self._filters: "OrderedDict[str, RecentTrackFilter]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: Optional[str]) -> Optional[RecentTrackFilter]:
+        """사용자 필터 조회 (기록이 없으면 None, 수명이 지난 세대는 조회 시 교체)"""
+        if not user_id:
+            return None
+        with self._lock:
+            history = self._filters.get(user_id)
+            if history is not None:
+                self._filters.move_to_end(user_id)
+                history.expire()
+            return history
+
+    def record(self, user_id: Optional[str], track_ids: Iterable[str]):
+        """최종 추천 트랙 기록"""
+        if not user_id:
+            return
+        with self._lock:
+            history = self._filters.get(user_id)
+            if history is None:
+                history = RecentTrackFilter()
+                self._filters[user_id] = history
+                if len(self._filters) > self.max_users:
+                    self._filters.popitem(last=False)
+            else:
+                self._filters.move_to_end(user_id)
+            for track_id in track_ids:
+                history.add(track_id)
+
+    def __len__(self) -> int:
+        return len(self._filters)
+
+
+# 싱글톤 인스턴스
+_user_history = None
+
+def get_user_history() -> UserHistoryStore:
+    """사용자 추천 이력 싱글톤 인스턴스 반환"""
+    global _user_history
+    if _user_history is None:
+        _user_history = UserHistoryStore()
+    return _user_history
+
+
+if __name__ == "__main__":
+    store = UserHistoryStore()
+    store.record("user-1", [f"track-{i}" for i in range(10)])
+    history = store.get("user-1")
+    print(f"필터 크기: {USER_HISTORY_FILTER_BYTES} bytes")
+    print(f"track-3 최근 추천: {'track-3' in history}")
+    false_positives = sum(f"other-{i}" in history for i in range(10000))
+    print(f"거짓 양성률: {false_positives / 10000:.4f}")